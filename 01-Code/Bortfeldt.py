@@ -4,29 +4,31 @@
 Class Bortfeldt:
 ===========
 
-  Calculates the Bortfeldt effect for a variety of situations.  Use singleton
-  class so that instance attributes can be used to set the parameters.
+  Calculates the Bortfeldt effect for a variety of situations.  Each instance
+  holds the parameters read from its own file, so that several materials
+  can be used side by side and instances can be pickled, e.g. to pass them
+  to worker processes.
 
 
   Class attributes:
   -----------------
-  __instance : Set on creation of first (and only) instance.
-  __Debug    : boolean ... debug flag      
+  __Log      : Logger "Bortfeldt"; debug output is enabled at run time with
+               logging.getLogger("Bortfeldt").setLevel(logging.DEBUG)
 
   Instance attributes:
   --------------------
    __filename  = Filename from which parameters have been read.  If None
                  then default values are used.
-   _BortfeldtParams  = Pandas data frame instance containing parameters
+   _cntrlParams = BraggParameters record (shared, immutable) holding
+                 the parameters read from the file
    _IssueDate  = date.today(); i.e. date when code is run and resuts are
                  generated 
     
 
   Methods:
   --------
-  Built-in methods __new__, __repr__ and __str__.
-      __new__ : Creates singleton class and prints version, PDG
-                reference, and values of constants used.
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Reads and parses the parameter file.
       __repr__: One liner with call.
       __str__ : Dump of constants
 
@@ -36,56 +38,80 @@ Class Bortfeldt:
   Print methods:
 
 
+  Processing methods:
+      prebragg : Plateau (z < r0-10*sigma) component of the Bragg curve
+      peak     : Peak (r0-10*sigma <= z <= r0+5*sigma) component; D_v
+                 from the tabulated ParabolicCylinderD.pbdv
+      getDerivedConstants:
+                 q = 1/p, Gamma(q) and 1/(rho p alpha^q); computed when the
+                 parameters are parsed and again by setRangeEnergy and
+                 setalpha, so that the components do not recompute them
+      bragg    : Bragg curve at a single depth z
+      bragg_vec: Bragg curve over an array of depths; prebragg and peak
+                 each evaluated once over the masked array, or in one
+                 pass by the compiled kernel of Kernels, if selected
+      prebragg_jac, peak_jac, bragg_jac:
+                 Analytic derivatives of prebragg, peak and bragg_vec
+                 w.r.t. (phi0, epsilon, r0, beta, sigma); shape (len(z),5)
+
 
   
 Created on Thu 13Aug22, Version history:
 ----------------------------------------
  1.0: 13Aug22: First implementation
+ 1.1: 18Oct26: Vectorised bragg_vec; Bragg-curve helpers made methods
+ 1.2: 18Oct26: Analytic Jacobian of the Bragg curve for fitting
+ 1.3: 18Oct26: peak and peak_jac use tabulated parabolic-cylinder functions
+ 1.4: 18Oct26: Gamma(1/p) computed from p, not hardcoded; derived constants
+               cached on parsing and on setRangeEnergy/setalpha
+ 1.5: 18Oct26: Parameters held per instance; no longer a singleton
+ 1.6: 18Oct26: Parameters from the shared BraggParameters registry
+ 1.7: 18Oct26: scipy imported only when first needed
+ 1.8: 18Oct26: Debug output through the logging module
+ 1.9: 18Oct26: Compiled prebragg, peak and bragg_vec when Kernels has
+               a compiled backend
 
 @author: kennethlong
 """
 
+import logging
 import os
 import math   as     mth
-import pandas as     pnds
+import numpy  as     np
 from datetime import date
 
+import BraggParameters    as BP
+import Kernels            as Kernels
+import ParabolicCylinderD as PCD
+
 class Bortfeldt(object):
-    __instance = None
-    __Debug    = True
+    __Log      = logging.getLogger("Bortfeldt")
 
 #--------  "Built-in methods":
-    def __new__(cls, _filename=None):
-
-        if cls.__instance is None:
-            cls.__instance = super(Bortfeldt, cls).__new__(cls)
-        
-            if _filename == None:
-                if  Bortfeldt.__Debug:
-                    print(" Bortfeldt: no filename provided, take defaults.")
-            elif not os.path.isfile(_filename):
-                print(" Bortfeldt: file ", _filename, " does not exist.", \
-                      " Raising exception")
-                raise NonExistantFile('CSV file' + \
-                                      _filename + \
-                                      ' does not exist; execution termimated.')
-
-            #.. Set defaults:
-            cls._filename  = None
-            cls._IssueDate = date.today()
-            cls._BortfeldtParams = None
-
-            #.. Parse control file:
-            if _filename != None:
-                cls._cntrlParams = cls.getBortfeldts(_filename)
-                if cls.__Debug:
-                    print(" Bortfeldt: parameters: \n", \
-                          cls._cntrlParams)
-                cls._p, cls._gamma, cls._alpha, cls._alphaUnit, \
-                    cls._rho, cls._rhoUnit \
-                    = cls.parseBortfeldt()
-        
-        return cls.__instance
+    def __init__(self, _filename=None):
+
+        if _filename == None:
+            self.__Log.debug("no filename provided, take defaults.")
+        elif not os.path.isfile(_filename):
+            print(" Bortfeldt: file ", _filename, " does not exist.", \
+                  " Raising exception")
+            raise NonExistantFile('CSV file' + \
+                                  _filename + \
+                                  ' does not exist; execution termimated.')
+
+        #.. Set defaults:
+        self._filename  = _filename
+        self._IssueDate = date.today()
+        self._BortfeldtParams = None
+
+        #.. Parse control file:
+        if _filename != None:
+            self._cntrlParams = self.getBortfeldts(_filename)
+            self.__Log.debug("parameters:\n%s", self._cntrlParams)
+            self._p, self._gamma, self._alpha, self._alphaUnit, \
+                self._rho, self._rhoUnit, \
+                self._q, self._GammaQ, self._Norm \
+                = self.parseBortfeldt()
 
     def __repr__(self):
         return " Bortfeldt(<filename>)"
@@ -105,49 +131,42 @@ class Bortfeldt(object):
 #--------  I/o methods:
     @classmethod
     def getBortfeldts(cls, _filename):
-        BortfeldtParams = pnds.read_csv(_filename)
+        BortfeldtParams = BP.getParameters(_filename)
         return BortfeldtParams
 
     
-#--------  Extracting data from the WorkPackage pandas dataframe:
-    @classmethod
-    def parseBortfeldt(cls):
-        Rows = cls._cntrlParams.index
-        for i in Rows:
-            if cls.__Debug:
-                print(" Bortfeldt: parseBortfeldt: processing flag: ", \
-                      cls._cntrlParams.iat[i,0])
-            if cls._cntrlParams.iat[i,0].find("range-energy") >= 0:
-                p = cls._cntrlParams.iat[i,1]
-            elif cls._cntrlParams.iat[i,0].find("nonelastic nuc") >= 0:
-                gamma = cls._cntrlParams.iat[i,1]
-            elif cls._cntrlParams.iat[i,0].find("Proportionality factor") >= 0:
-                alpha     = cls._cntrlParams.iat[i,1]
-                alphaUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("Density") >= 0:
-                rho     = cls._cntrlParams.iat[i,1]
-                rhoUnit = cls._cntrlParams.iat[i,2]
-            else:
-                print("    ----> Bortfeldt.parseBortfeldt: ", \
-                      " unprocessed control field:", \
-                      cls._cntrlParams.iat[i,0], cls._cntrlParams.iat[i,1], \
-                      cls._cntrlParams.iat[i,2])
+#--------  Extracting data from the parameter record:
+    def parseBortfeldt(self):
+        P = self._cntrlParams
+        if None in (P.p, P.gamma, P.alpha, P.rho):
+            print("    ----> Bortfeldt.parseBortfeldt: parameter missing from", \
+                  P.filename, " raising exception")
+            raise BadParameters('Parameter missing from ' + P.filename)
+        p               = P.p
+        gamma           = P.gamma
+        alpha, alphaUnit = P.alpha, P.alphaUnit
+        rho,   rhoUnit  = P.rho,  P.rhoUnit
 
         #.. Derived constants:
+        q, GammaQ, Norm = self.getDerivedConstants(p, alpha, rho)
+
+        return p, gamma, alpha, alphaUnit, rho, rhoUnit, q, GammaQ, Norm
 
-        return p, gamma, alpha, alphaUnit, rho, rhoUnit
+    @staticmethod
+    def getDerivedConstants(p, alpha, rho):
+        q      = 1. / p
+        GammaQ = mth.gamma(q)                    #.. (1/p - 1)!
+        Norm   = 1. / (rho * p * alpha**q)
+        return q, GammaQ, Norm
 
 
 #--------  Get/set methods:
     def setIssueDate(self, _IssueDate):
-        if self.__Debug:
-            print(" setIssueDate:", _IssueDate)
+        self.__Log.debug("setIssueDate: %s", _IssueDate)
         if isinstance(_IssueDate, dt.date):
             self._IssueDate = _IssueDate
         else:
-            if self.__Debug:
-                print("     ----> Issue date ", \
-                      " raising exception")
+            self.__Log.debug("Issue date invalid, raising exception.")
             raise BadIssueDate()
         
     def getIssueDate(self):
@@ -156,11 +175,29 @@ class Bortfeldt(object):
     def getRangeEnergy(self):
         return self._p
 
+    def setRangeEnergy(self, _p):
+        self.__Log.debug("setRangeEnergy: %s", _p)
+        if not isinstance(_p, (int, float)) or _p <= 0.:
+            self.__Log.debug("p invalid, raising exception.")
+            raise BadParameters()
+        self._p = float(_p)
+        self._q, self._GammaQ, self._Norm = \
+            self.getDerivedConstants(self._p, self._alpha, self._rho)
+
     def getNonElasFrac(self):
         return self._gamma
         
     def getalpha(self):
         return self._alpha
+
+    def setalpha(self, _alpha):
+        self.__Log.debug("setalpha: %s", _alpha)
+        if not isinstance(_alpha, (int, float)) or _alpha <= 0.:
+            self.__Log.debug("alpha invalid, raising exception.")
+            raise BadParameters()
+        self._alpha = float(_alpha)
+        self._q, self._GammaQ, self._Norm = \
+            self.getDerivedConstants(self._p, self._alpha, self._rho)
         
     def getalphaUnit(self):
         return self._alphaUnit
@@ -170,6 +207,12 @@ class Bortfeldt(object):
     
     def getrhoUnit(self):
         return self._rhoUnit
+
+    def getGammaQ(self):
+        return self._GammaQ
+
+    def getNorm(self):
+        return self._Norm
         
 
 #--------  Print methods:
@@ -177,15 +220,13 @@ class Bortfeldt(object):
 
 #--------  Processing methods:
     def getBortfeldt(self, T=None):
-        if self.__Debug:
-            print(" getBortfeldt; T:", T)
+        if self.__Log.isEnabledFor(logging.DEBUG):
+            self.__Log.debug("getBortfeldt; T: %s", T)
         if T==None:
-            if self.__Debug:
-                print("     ----> T invalid, raising exception.")
+            self.__Log.debug("T invalid, raising exception.")
             raise BadParameters()
         if not isinstance(T, float):
-            if self.__Debug:
-                print("     ----> T invalid, raising exception.")
+            self.__Log.debug("T invalid, raising exception.")
             raise BadParameters()
 
         Bortfeldt = 0.
@@ -196,63 +237,161 @@ class Bortfeldt(object):
     ## Components of Bragg Analytic Curve ##
     ########################################
     def prebragg(self, z, phi0, epsilon, r0, beta):
-        rho = self._rho
         p   = self._p
-        alpha = self._alpha
+        q   = self._q
         gamma = self._gamma
         
-        return phi0/(rho*p*alpha**(1/p)*(1+beta*r0))*((r0-z)**(1/p - 1) \
-               + (beta + gamma*beta*p + epsilon*p/r0)*(r0-z)**(1/p))
+        Jit = Kernels.get()
+        if Jit is not None and np.ndim(z) > 0:
+            return Jit.prebragg(np.asarray(z, dtype=float), r0, q, \
+                                phi0*self._Norm/(1+beta*r0), \
+                                beta + gamma*beta*p + epsilon*p/r0)
+        return phi0*self._Norm/(1+beta*r0)*((r0-z)**(q - 1) \
+               + (beta + gamma*beta*p + epsilon*p/r0)*(r0-z)**q)
 
     def peak(self, z, phi0, epsilon, r0, beta, sigma):
-        rho = self._rho
         p   = self._p
-        alpha = self._alpha
+        q   = self._q
         gamma = self._gamma
 
+        if np.ndim(z) > 0:
+            y = self._braggJit(z, -np.inf, np.inf, phi0, epsilon, r0, beta, \
+                               sigma)
+            if y is not None:
+                return y
         xi = (r0-z)/sigma
-        factorial = 1.57539 # Factorial component (1/p -1)!
-                            # calculated in Mathematica
-        prefactor = phi0*((np.exp(-(xi**2/4))*sigma**(1/p)*factorial) \
-                    /(np.sqrt(2*np.pi)*rho*p*alpha**(1/p)*(1+beta*r0)))
-        return prefactor*(1/sigma * special.pbdv(-1/p, -xi)[0] 
+        prefactor = phi0*np.exp(-(xi**2/4))*sigma**q*self._GammaQ \
+                    *self._Norm/(np.sqrt(2*np.pi)*(1+beta*r0))
+        return prefactor*(1/sigma * PCD.pbdv(-q, -xi)[0] 
                + (beta/p + gamma*beta + \
-                  epsilon/r0)*special.pbdv((-1/p)-1,-xi)[0])
+                  epsilon/r0)*PCD.pbdv(-q-1,-xi)[0])
     
     def bragg(self, z, phi0, epsilon, r0, beta, sigma):
-        rho = self._rho
-        p   = self._p
-        alpha = self._alpha
-        gamma = self._gamma
-
         if z < (r0-10*sigma):
-            return prebragg(z, phi0, epsilon, r0, beta)
+            return self.prebragg(z, phi0, epsilon, r0, beta)
         elif np.logical_and(z >= (r0-10*sigma), z<= (r0+5*sigma)):
-            return peak(z, phi0, epsilon, r0, beta, sigma)
+            return self.peak(z, phi0, epsilon, r0, beta, sigma)
         else:
             return 0  
     
-        def bragg_vec(self, z, phi0, epsilon, r0, beta, sigma):
-            y = np.zeros(z.shape)
-            for i in range(len(y)):
-                y[i]=bragg(z[i], phi0, epsilon, r0, beta, sigma)
+    def bragg_vec(self, z, phi0, epsilon, r0, beta, sigma):
+        z = np.asarray(z, dtype=float)
+        y = self._braggJit(z, r0-10*sigma, r0+5*sigma, phi0, epsilon, r0, \
+                           beta, sigma)
+        if y is not None:
             return y
+        y = np.zeros(z.shape)
+        iPre  = z < (r0-10*sigma)
+        iPeak = np.logical_and(z >= (r0-10*sigma), z <= (r0+5*sigma))
+        y[iPre]  = self.prebragg(z[iPre], phi0, epsilon, r0, beta)
+        y[iPeak] = self.peak(z[iPeak], phi0, epsilon, r0, beta, sigma)
+        return y
+
+    def _braggJit(self, z, zPre, zMax, phi0, epsilon, r0, beta, sigma):
+        #.. Compiled plateau/peak kernel; None if there is none, or if the
+        #   parabolic-cylinder tables do not cover z:
+        Jit = Kernels.get()
+        if Jit is None:
+            return None
+        p   = self._p
+        q   = self._q
+        gamma = self._gamma
 
-        def zeta(self, r0, sigma, z):
-            return (z-r0)/sigma
+        z  = np.asarray(z, dtype=float)
+        y  = np.empty(z.shape)
+        xmin, h, D1, Dd1 = PCD.getTable(-q).getTables()
+        xmin2, h2, D2, Dd2 = PCD.getTable(-q-1).getTables()
+        if xmin2 != xmin or h2 != h or len(D2) != len(D1):
+            return None
+        Pre = phi0*sigma**q*self._GammaQ*self._Norm \
+              /(np.sqrt(2*np.pi)*(1+beta*r0))
+        Ok  = Jit.bragg(np.ravel(z), zPre, zMax, r0, sigma, q, \
+                        phi0*self._Norm/(1+beta*r0), \
+                        beta + gamma*beta*p + epsilon*p/r0, \
+                        Pre, beta/p + gamma*beta + epsilon/r0, \
+                        xmin, h, D1, Dd1, D2, Dd2, y.reshape(-1))
+        if not Ok:
+            return None
+        return y
 
-        def xi(self, r0,R0,sigma,z):
-            return (z-r0-R0)/sigma
+    ########################################
+    ## Derivatives w.r.t. fit parameters  ##
+    ##   columns: phi0, epsilon, r0, beta, sigma
+    ########################################
+    def prebragg_jac(self, z, phi0, epsilon, r0, beta):
+        p   = self._p
+        q   = self._q
+        gamma = self._gamma
 
-        def tParabolicCylinderD(self, r0,R0,sigma,v,z):
-            return np.exp(-(xi(r0,R0,sigma,z)**2)/4)* \
-                special.pbdv(v,xi(r0,R0,sigma,z))[0]-\
-                np.exp(-(zeta(r0,sigma,z)**2)/4)*\
-                special.pbdv(v,zeta(r0,sigma,z))[0]
+        z = np.asarray(z, dtype=float)
+        C = self._Norm
+        N = 1 + beta*r0
+        u = r0 - z
+        B = beta + gamma*beta*p + epsilon*p/r0
+        S = u**(q-1) + B*u**q
+        
+        J = np.zeros(z.shape + (5,))
+        J[...,0] = C/N * S
+        J[...,1] = phi0*C/N * p/r0 * u**q
+        J[...,2] = phi0*C * (-beta/N**2 * S \
+                             + ((q-1)*u**(q-2) + q*B*u**(q-1) \
+                                - epsilon*p/r0**2 * u**q)/N)
+        J[...,3] = phi0*C * (-r0/N**2 * S + (1 + gamma*p)*u**q/N)
+        return J
+
+    def peak_jac(self, z, phi0, epsilon, r0, beta, sigma):
+        p   = self._p
+        q   = self._q
+        gamma = self._gamma
 
-        def fluence(self, phi,sigma,r0,z):
-            return phi/np.sqrt(2*np.pi)*np.exp(-(zeta(r0,sigma,z))**2/4)*\
-                special.pbdv(-1,zeta(r0,sigma,z))[0]
+        z  = np.asarray(z, dtype=float)
+        N  = 1 + beta*r0
+        xi = (r0-z)/sigma
+        E  = np.exp(-(xi**2/4))
+        Pre = self._GammaQ*sigma**q*self._Norm/(np.sqrt(2*np.pi)*N)
+        Bp  = beta/p + gamma*beta + epsilon/r0
+
+        #.. pbdv returns D_v(x) and dD_v/dx; d/dxi D_v(-xi) = -D_v'(-xi):
+        D1, D1d = PCD.pbdv(-q,   -xi)
+        D2, D2d = PCD.pbdv(-q-1, -xi)
+        H    = E*(D1/sigma + Bp*D2)
+        dHdx = -xi/2*H - E*(D1d/sigma + Bp*D2d)
+        f    = phi0*Pre*H
+
+        J = np.zeros(z.shape + (5,))
+        J[...,0] = Pre*H
+        J[...,1] = phi0*Pre*E*D2/r0
+        J[...,2] = -beta/N*f + phi0*Pre*(dHdx/sigma - E*D2*epsilon/r0**2)
+        J[...,3] = -r0/N*f + phi0*Pre*E*D2*(1/p + gamma)
+        J[...,4] = q/sigma*f - phi0*Pre*(dHdx*xi/sigma + E*D1/sigma**2)
+        return J
+
+    def bragg_jac(self, z, phi0, epsilon, r0, beta, sigma):
+        z = np.asarray(z, dtype=float)
+        J = np.zeros(z.shape + (5,))
+        iPre  = z < (r0-10*sigma)
+        iPeak = np.logical_and(z >= (r0-10*sigma), z <= (r0+5*sigma))
+        J[iPre]  = self.prebragg_jac(z[iPre], phi0, epsilon, r0, beta)
+        J[iPeak] = self.peak_jac(z[iPeak], phi0, epsilon, r0, beta, sigma)
+        return J
+
+    def zeta(self, r0, sigma, z):
+        return (z-r0)/sigma
+
+    def xi(self, r0,R0,sigma,z):
+        return (z-r0-R0)/sigma
+
+    def tParabolicCylinderD(self, r0,R0,sigma,v,z):
+        from scipy import special
+        return np.exp(-(self.xi(r0,R0,sigma,z)**2)/4)* \
+            special.pbdv(v,self.xi(r0,R0,sigma,z))[0]-\
+            np.exp(-(self.zeta(r0,sigma,z)**2)/4)*\
+            special.pbdv(v,self.zeta(r0,sigma,z))[0]
+
+    def fluence(self, phi,sigma,r0,z):
+        from scipy import special
+        return phi/np.sqrt(2*np.pi)*np.exp(-(self.zeta(r0,sigma,z))**2/4)*\
+            special.pbdv(-1,self.zeta(r0,sigma,z))[0]
 
 #--------  Exceptions:
 class NonExistantFile(Exception):
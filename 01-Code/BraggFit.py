@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class BraggFit:
+===============
+
+  Fits the Bortfeldt Bragg-curve parameters (phi0, epsilon, r0, beta, sigma)
+  to a batch of depth-dose profiles.  Each profile is fitted with
+  scipy.optimize.curve_fit using the vectorised Bortfeldt.bragg_vec model
+  and its analytic Jacobian, Bortfeldt.bragg_jac.  The fits are
+  distributed over a pool of worker processes; the Bortfeldt instance is
+  built once from the parameter file and passed to each worker by value.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "BraggFit"; debug output is enabled at run time with
+               logging.getLogger("BraggFit").setLevel(logging.DEBUG)
+  ParNames   : Names of the fitted parameters, in fit order
+
+  Instance attributes:
+  --------------------
+   _filename   = Bortfeldt parameter file used by the model
+   _iBortfeldt = Bortfeldt instance built from _filename
+   _nWorkers   = Number of worker processes; None => os.cpu_count(),
+                 1 => fit serially in the calling process
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Checks parameter file and sets number of workers.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+
+  Processing methods:
+      fit     : Fit a single profile; returns popt, pcov
+      fitBatch: Fit N profiles; returns popt (N,5) and pcov (N,5,5).
+                Fits that fail have their rows set to NaN.
+
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Bortfeldt instance passed to workers by value
+ 1.2: 18Oct26: Debug output through the logging module
+ 1.3: 18Oct26: Shared and per-profile p0/bounds told apart by shape;
+               fit no longer sets the worker-process global
+
+@author: kennethlong
+"""
+
+import logging
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy import optimize
+
+import Bortfeldt as BF
+
+class BraggFit(object):
+    __Log      = logging.getLogger("BraggFit")
+    ParNames   = ('phi0', 'epsilon', 'r0', 'beta', 'sigma')
+
+#--------  "Built-in methods":
+    def __init__(self, _filename=None, _nWorkers=None):
+
+        if _filename == None:
+            print(" BraggFit: no parameter file provided,", \
+                  " raising exception")
+            raise NonExistantFile('BraggFit requires a Bortfeldt ' + \
+                                  'parameter file.')
+        elif not os.path.isfile(_filename):
+            print(" BraggFit: file ", _filename, " does not exist.", \
+                  " Raising exception")
+            raise NonExistantFile('CSV file' + \
+                                  _filename + \
+                                  ' does not exist; execution termimated.')
+
+        self._filename   = _filename
+        self._iBortfeldt = BF.Bortfeldt(_filename)
+        self._nWorkers   = _nWorkers
+        BraggFit.__Log.debug("parameter file: %s workers: %s", \
+                             self._filename, self._nWorkers)
+
+    def __repr__(self):
+        return " BraggFit(<filename>, <nWorkers>)"
+
+    def __str__(self):
+        print(" BraggFit settings:")
+        print("     Parameter file:", self.getFilename())
+        print("  Number of workers:", self.getnWorkers())
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getFilename(self):
+        return self._filename
+
+    def getBortfeldt(self):
+        return self._iBortfeldt
+
+    def getnWorkers(self):
+        return self._nWorkers
+
+    def setnWorkers(self, _nWorkers):
+        self._nWorkers = _nWorkers
+
+
+#--------  Processing methods:
+    def fit(self, z, y, p0, bounds=(-np.inf, np.inf)):
+        return _fitOne(self._iBortfeldt, z, y, p0, bounds)
+
+    def fitBatch(self, profiles, p0, bounds=(-np.inf, np.inf)):
+        """
+        profiles: sequence of (z, y) pairs, one per depth-dose profile.
+        p0, bounds: either one starting point/bound pair shared by all
+                    profiles, or one per profile.  A shared p0 has shape
+                    (5,) and shared bounds (2,) or (2, 5); per profile,
+                    nProf such entries.  Anything else raises
+                    BadParameters.
+        """
+        nProf   = len(profiles)
+        nPar    = len(BraggFit.ParNames)
+        p0s     = _perProfile(p0, nProf, ((nPar,),), 'p0')
+        boundss = _perProfile(bounds, nProf, ((2,), (2, nPar)), 'bounds')
+        Tasks   = [(z, y, p0s[i], boundss[i]) \
+                   for i, (z, y) in enumerate(profiles)]
+
+        popt = np.full((nProf, 5), np.nan)
+        pcov = np.full((nProf, 5, 5), np.nan)
+        if nProf == 0:
+            return popt, pcov
+
+        nWorkers = self._nWorkers
+        if nWorkers == None:
+            nWorkers = os.cpu_count()
+        nWorkers = max(1, min(nWorkers, nProf))
+
+        if nWorkers == 1:
+            Results = (_fitOne(self._iBortfeldt, *Task) for Task in Tasks)
+            for i, Res in enumerate(Results):
+                popt[i], pcov[i] = Res
+        else:
+            chunksize = max(1, nProf // (4*nWorkers))
+            with ProcessPoolExecutor(max_workers=nWorkers, \
+                                     initializer=_initWorker, \
+                                     initargs=(self._iBortfeldt,)) as Pool:
+                Results = Pool.map(_fitProfile, Tasks, chunksize=chunksize)
+                for i, Res in enumerate(Results):
+                    popt[i], pcov[i] = Res
+
+        if BraggFit.__Log.isEnabledFor(logging.DEBUG):
+            BraggFit.__Log.debug("fitBatch: %d profiles, %d failed", nProf, \
+                                 np.count_nonzero(np.isnan(popt[:,0])))
+        return popt, pcov
+
+
+#--------  Worker-process functions:
+_iBortfeldt = None
+
+def _initWorker(iBortfeldt):
+    global _iBortfeldt
+    _iBortfeldt = iBortfeldt
+
+def _fitProfile(Task):
+    return _fitOne(_iBortfeldt, *Task)
+
+def _fitOne(iBortfeldt, z, y, p0, bounds):
+    z = np.asarray(z, dtype=float)
+    y = np.asarray(y, dtype=float)
+    try:
+        popt, pcov = optimize.curve_fit(iBortfeldt.bragg_vec, z, y, \
+                                        p0=p0, bounds=bounds, \
+                                        jac=iBortfeldt.bragg_jac)
+    except (RuntimeError, ValueError) as Err:
+        print("    ----> BraggFit: fit failed:", Err)
+        return np.full(5, np.nan), np.full((5, 5), np.nan)
+    return popt, pcov
+
+def _perProfile(Par, nProf, Shapes, Name):
+    #.. Broadcast a shared p0 or bounds to all profiles, or split one given
+    #   per profile.  Told apart by shape: shared has one of Shapes, per
+    #   profile is a sequence of nProf entries each with one of Shapes.
+    if _shape(Par) in Shapes:
+        return [Par] * nProf
+    if _shape(Par) != () and len(Par) == nProf and \
+       all(_shape(Entry) in Shapes for Entry in Par):
+        return list(Par)
+    print("    ----> BraggFit:", Name, "is neither shared, of shape", \
+          " or ".join(str(Shape) for Shape in Shapes) + ",", \
+          "nor one such per profile for", nProf, "profiles")
+    raise BadParameters('Need ' + Name + ' shared by all profiles or ' + \
+                        'one per profile.')
+
+def _shape(Par):
+    try:
+        return np.shape(Par)
+    except ValueError:
+        #.. Ragged:
+        return (len(Par), None)
+
+
+#--------  Exceptions:
+class NonExistantFile(Exception):
+    pass
+
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class BraggLibrary:
+===================
+
+  Library of Bortfeldt depth-dose curves, tabulated once on a fine grid of
+  initial energy E and reduced depth u = z/r0(E), kept on disk and
+  memory-mapped.  Dose at any (E, z) is then bilinear interpolation in
+  (E, u), so no parabolic-cylinder function is evaluated at query time.
+  Tabulating in u rather than z lines the Bragg peaks of neighbouring
+  energies up, so that interpolation across energy does not smear them.
+
+  Each curve is Bortfeldt.bragg_vec(z, 1, _epsilon, r0, _beta, sigma),
+  i.e. dose per unit primary fluence (MeV/cm per proton), with
+      r0(E)    = alpha E^p                         (Bragg-Kleeman)
+      sigma(E) = sqrt(sigma_mono^2 + (_EnergySpread E alpha p E^(p-1))^2)
+      sigma_mono = 0.012 r0^0.935                  (Bortfeldt, water)
+  alpha and p from the parameter file.
+
+  The library is a directory holding Dose.npy (shape (_nE, _nu)) and
+  meta.json (settings, alpha, p and format version).  A library that
+  exists and matches the settings and parameter file is loaded; otherwise
+  it is built (written to a temporary directory, then moved into place).
+  With _filename None an existing library is loaded as it stands.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "BraggLibrary"; debug output is enabled at run time
+               with logging.getLogger("BraggLibrary").setLevel(logging.DEBUG)
+  Version    : Library format version, stored in meta.json
+
+  Instance attributes:
+  --------------------
+   _Library    = Library directory
+   _Meta       = Contents of meta.json: Emin, Emax, nE (MeV), umax, nu,
+                 epsilon, beta, EnergySpread, alpha, p, Version
+   _Dose       = Memory-mapped (nE, nu) table
+   _dE, _du    = Grid spacings
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Loads the library, building it first if needed.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+      getMeta      : Contents of meta.json
+      getEnergies  : Tabulated energies (MeV)
+      getRange     : r0(E) (cm)
+      getSigma     : sigma(E) (cm)
+
+  Processing methods:
+      build        : Tabulate the curves and write the library
+      getDose      : Dose at energies E and depths z (broadcast together);
+                     zero beyond umax*r0
+      getMatrix    : (len(z), len(Energies)) dose of each energy at each
+                     depth; the dose-influence matrix of a spread-out
+                     Bragg peak
+      getSOBP      : Dose at depths z of a spread-out Bragg peak, the sum
+                     of the curves of Energies weighted by Weights (primary
+                     fluence)
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+
+@author: kennethlong
+"""
+
+import logging
+import os
+import json
+import shutil
+import tempfile
+import numpy  as np
+
+import Bortfeldt as Bortfeldt
+
+class BraggLibrary(object):
+    __Log      = logging.getLogger("BraggLibrary")
+    Version    = 1
+
+#--------  "Built-in methods":
+    def __init__(self, _Library=None, _filename=None, _Emin=50., _Emax=250., \
+                 _nE=201, _umax=1.2, _nu=2401, _epsilon=0.1, _beta=0.012, \
+                 _EnergySpread=0.01):
+
+        if _Library == None:
+            print(" BraggLibrary: library directory required,", \
+                  " raising exception")
+            raise BadParameters('BraggLibrary needs a library directory.')
+        if not 0. < _Emin < _Emax or _nE < 2 or _umax <= 1. or _nu < 2:
+            print(" BraggLibrary: bad grid:", _Emin, _Emax, _nE, _umax, \
+                  _nu, " raising exception")
+            raise BadParameters()
+
+        self._Library = _Library
+        MetaFile = os.path.join(_Library, 'meta.json')
+        if _filename == None:
+            if not os.path.isfile(MetaFile):
+                print(" BraggLibrary: library ", _Library, \
+                      " does not exist.  Raising exception")
+                raise NonExistantFile('Library ' + str(_Library) + \
+                                      ' does not exist.')
+        else:
+            iBortfeldt = Bortfeldt.Bortfeldt(_filename)
+            Meta = {'Emin': float(_Emin), 'Emax': float(_Emax), \
+                    'nE': int(_nE), 'umax': float(_umax), 'nu': int(_nu), \
+                    'epsilon': float(_epsilon), 'beta': float(_beta), \
+                    'EnergySpread': float(_EnergySpread), \
+                    'alpha': iBortfeldt.getalpha(), \
+                    'p': iBortfeldt.getRangeEnergy(), \
+                    'Version': BraggLibrary.Version}
+            Old = None
+            if os.path.isfile(MetaFile):
+                with open(MetaFile) as f:
+                    Old = json.load(f)
+            if Old != Meta:
+                self.build(iBortfeldt, Meta)
+
+        with open(MetaFile) as f:
+            self._Meta = json.load(f)
+        self._Dose = np.load(os.path.join(_Library, 'Dose.npy'), \
+                             mmap_mode='r')
+        self._dE = (self._Meta['Emax'] - self._Meta['Emin']) / \
+                   (self._Meta['nE'] - 1)
+        self._du = self._Meta['umax'] / (self._Meta['nu'] - 1)
+
+    def __repr__(self):
+        return " BraggLibrary(<Library>, <filename>, <Emin>, <Emax>, <nE>, " \
+               "<umax>, <nu>, <epsilon>, <beta>, <EnergySpread>)"
+
+    def __str__(self):
+        print(" BraggLibrary settings:")
+        print("     Library:", self._Library)
+        print("     Energies:", self._Meta['Emin'], "to", self._Meta['Emax'], \
+              "MeV,", self._Meta['nE'], "curves")
+        print("     Reduced depth: 0 to", self._Meta['umax'], ",", \
+              self._Meta['nu'], "points")
+        print("     epsilon, beta, energy spread:", self._Meta['epsilon'], \
+              self._Meta['beta'], self._Meta['EnergySpread'])
+        print("     alpha, p:", self._Meta['alpha'], self._Meta['p'])
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getMeta(self):
+        return self._Meta
+
+    def getEnergies(self):
+        return np.linspace(self._Meta['Emin'], self._Meta['Emax'], \
+                           self._Meta['nE'])
+
+    def getRange(self, E):
+        E = np.asarray(E, dtype=float)
+        return self._Meta['alpha'] * E**self._Meta['p']
+
+    def getSigma(self, E):
+        return _sigma(np.asarray(E, dtype=float), self._Meta['alpha'], \
+                      self._Meta['p'], self._Meta['EnergySpread'])
+
+
+#--------  Processing methods:
+    def build(self, iBortfeldt, Meta):
+        E  = np.linspace(Meta['Emin'], Meta['Emax'], Meta['nE'])
+        u  = np.linspace(0., Meta['umax'], Meta['nu'])
+        r0 = Meta['alpha'] * E**Meta['p']
+        Sigma = _sigma(E, Meta['alpha'], Meta['p'], Meta['EnergySpread'])
+
+        TmpDir = tempfile.mkdtemp(prefix='.library-', \
+                     dir=os.path.dirname(os.path.abspath(self._Library)))
+        try:
+            Dose = np.lib.format.open_memmap(os.path.join(TmpDir, \
+                       'Dose.npy'), mode='w+', dtype=np.float64, \
+                       shape=(Meta['nE'], Meta['nu']))
+            for i in range(Meta['nE']):
+                Dose[i] = iBortfeldt.bragg_vec(u*r0[i], 1., Meta['epsilon'], \
+                                               r0[i], Meta['beta'], Sigma[i])
+            Dose.flush()
+            del Dose
+            with open(os.path.join(TmpDir, 'meta.json'), 'w') as f:
+                json.dump(Meta, f)
+            if os.path.isdir(self._Library):
+                shutil.rmtree(self._Library)
+            os.replace(TmpDir, self._Library)
+        except BaseException:
+            shutil.rmtree(TmpDir, ignore_errors=True)
+            raise
+        BraggLibrary.__Log.debug("build: %d curves of %d points in %s", \
+                                 Meta['nE'], Meta['nu'], self._Library)
+
+    def getDose(self, E, z):
+        Meta = self._Meta
+        if np.ndim(E) == 0 and np.ndim(z) == 0:
+            #.. Scalar query without numpy temporaries:
+            t = (E - Meta['Emin']) / self._dE
+            if not 0. <= t <= Meta['nE'] - 1:
+                raise BadParameters('Energy ' + str(E) + \
+                                    ' outside library')
+            i = min(int(t), Meta['nE'] - 2)
+            s = (z / (Meta['alpha'] * E**Meta['p'])) / self._du
+            if not 0. <= s < Meta['nu'] - 1:
+                return 0.
+            j = int(s)
+            t -= i
+            s -= j
+            D = self._Dose.item
+            return (1.-t) * ((1.-s)*D(i, j)   + s*D(i, j+1)) + \
+                   t      * ((1.-s)*D(i+1, j) + s*D(i+1, j+1))
+
+        E, z = np.broadcast_arrays(np.asarray(E, dtype=float), \
+                                   np.asarray(z, dtype=float))
+        t = (E - Meta['Emin']) / self._dE
+        if np.any((t < 0.) | (t > Meta['nE'] - 1)):
+            raise BadParameters('Energies outside library')
+        i = np.minimum(t.astype(np.intp), Meta['nE'] - 2)
+        t = t - i
+        s = (z / (Meta['alpha'] * E**Meta['p'])) / self._du
+        In = (s >= 0.) & (s < Meta['nu'] - 1)
+        j = np.where(In, s, 0.).astype(np.intp)
+        s = s - j
+        Dose = (1.-t) * ((1.-s)*self._Dose[i, j]   + s*self._Dose[i, j+1]) + \
+               t      * ((1.-s)*self._Dose[i+1, j] + s*self._Dose[i+1, j+1])
+        return np.where(In, Dose, 0.)
+
+    def getMatrix(self, Energies, z):
+        Energies = np.asarray(Energies, dtype=float)
+        z        = np.asarray(z, dtype=float)
+        return self.getDose(Energies[None, :], z[:, None])
+
+    def getSOBP(self, Energies, Weights, z):
+        return self.getMatrix(Energies, z) @ np.asarray(Weights, dtype=float)
+
+
+#--------  Range straggling and energy spread (Bortfeldt):
+def _sigma(E, alpha, p, EnergySpread):
+    r0 = alpha * E**p
+    return np.sqrt((0.012 * r0**0.935)**2 + \
+                   (EnergySpread * E * alpha * p * E**(p-1.))**2)
+
+
+#--------  Exceptions:
+class NonExistantFile(Exception):
+    pass
+
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class BraggParameters:
+======================
+
+  Parsed contents of a BraggParameters.csv file (columns Flag, Value,
+  Unit), as an immutable record shared by MCS, dEdx and Bortfeldt.  Each
+  flag is matched once, by the rules the physics classes used to apply
+  row by row, and its value and unit stored in the named field below.
+  Flags that are absent from the file leave their fields as None; flags
+  that match no field are kept in Other.
+
+  Records are obtained through getParameters, which parses each file once
+  and caches the result by absolute path.  The cached record is re-parsed
+  if the file's mtime or size changes.
+
+
+  Record fields:
+  --------------
+   filename             : Absolute path of the file parsed
+   IonE,  IonEUnit      : Ionisation energy (Highland formula)
+   z                    : Charge number of the projectile
+   X0,    X0Unit        : Radiation length
+   me,    meUnit        : Electron mass
+   Mp,    MpUnit        : Projectile mass
+   rho,   rhoUnit       : Density
+   K,     KUnit         : Coefficient for dE/dx
+   Z, A                 : Effective atomic and mass numbers
+   I,     IUnit         : Mean excitation energy
+   p                    : Exponent of range-energy relation
+   gamma                : Fraction of energy released in nonelastic
+                          nuclear interactions absorbed locally
+   alpha, alphaUnit     : Proportionality factor of range-energy relation
+   Other                : Tuple of (Flag, Value, Unit) not matched
+
+
+  Module functions:
+      getParameters : Parsed record for a file, from the cache if current
+      parseFile     : Parse a file into a record (no caching)
+      clearCache    : Empty the cache
+
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Read with the csv module instead of pandas
+
+@author: kennethlong
+"""
+
+import csv
+import os
+from typing import NamedTuple, Optional, Tuple
+
+class BraggParameters(NamedTuple):
+    filename:  str
+    IonE:      Optional[float] = None
+    IonEUnit:  str             = ''
+    z:         Optional[float] = None
+    X0:        Optional[float] = None
+    X0Unit:    str             = ''
+    me:        Optional[float] = None
+    meUnit:    str             = ''
+    Mp:        Optional[float] = None
+    MpUnit:    str             = ''
+    rho:       Optional[float] = None
+    rhoUnit:   str             = ''
+    K:         Optional[float] = None
+    KUnit:     str             = ''
+    Z:         Optional[float] = None
+    A:         Optional[float] = None
+    I:         Optional[float] = None
+    IUnit:     str             = ''
+    p:         Optional[float] = None
+    gamma:     Optional[float] = None
+    alpha:     Optional[float] = None
+    alphaUnit: str             = ''
+    Other:     Tuple           = ()
+
+
+#.. (match, text, value field, unit field); first rule that matches wins:
+_Rules = (
+    ("==",   "Ionisation energy",       "IonE",  "IonEUnit"),
+    ("==",   "Charge number",           "z",     None),
+    ("find", "Radiation length",        "X0",    "X0Unit"),
+    ("find", "Electron mass",           "me",    "meUnit"),
+    ("find", "Projectile mass",         "Mp",    "MpUnit"),
+    ("find", "Density",                 "rho",   "rhoUnit"),
+    ("==",   "Coefficient for dE/dx",   "K",     "KUnit"),
+    ("find", "<Z>",                     "Z",     None),
+    ("find", "<A>",                     "A",     None),
+    ("find", "Mean excitation energy",  "I",     "IUnit"),
+    ("find", "range-energy",            "p",     None),
+    ("find", "nonelastic nuc",          "gamma", None),
+    ("find", "Proportionality factor",  "alpha", "alphaUnit"),
+)
+
+_Cache = {}
+
+
+#--------  Module functions:
+def getParameters(_filename):
+    if _filename == None or not os.path.isfile(_filename):
+        print(" BraggParameters: file ", _filename, " does not exist.", \
+              " Raising exception")
+        raise NonExistantFile('CSV file ' + str(_filename) + \
+                              ' does not exist; execution termimated.')
+    Path = os.path.abspath(_filename)
+    Stat = os.stat(Path)
+    Key  = (Stat.st_mtime_ns, Stat.st_size)
+    Entry = _Cache.get(Path)
+    if Entry is None or Entry[0] != Key:
+        Entry = (Key, parseFile(Path))
+        _Cache[Path] = Entry
+    return Entry[1]
+
+def parseFile(_filename):
+    #.. Plain csv module; the file is a few lines and pandas is slow to import
+    with open(_filename, newline='') as File:
+        Rows = list(csv.reader(File))
+    Fields = {}
+    Other  = []
+    for Row in Rows[1:]:
+        if not Row or not Row[0].strip():
+            continue
+        Row   = (Row + ['', ''])[:3]
+        Flag  = Row[0].strip()
+        Value = Row[1].strip()
+        Unit  = Row[2].strip()
+        for Match, Text, VField, UField in _Rules:
+            if (Match == "==" and Flag == Text) or \
+               (Match == "find" and Flag.find(Text) >= 0):
+                Fields[VField] = float(Value)
+                if UField is not None:
+                    Fields[UField] = Unit
+                break
+        else:
+            print("    ----> BraggParameters.parseFile: ", \
+                  " unprocessed control field:", Flag, Value, Unit)
+            Other.append((Flag, Value, Unit))
+    return BraggParameters(os.path.abspath(_filename), Other=tuple(Other), \
+                           **Fields)
+
+def clearCache():
+    _Cache.clear()
+
+
+#--------  Exceptions:
+class NonExistantFile(Exception):
+    pass
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class DepthGrid:
+================
+
+  Adaptive, non-uniform depth grid for evaluating a curve such as
+  Bortfeldt.bragg_vec.  Starting from a coarse uniform grid, each interval
+  is split at its midpoint while the curve there differs from the straight
+  line between the interval's end points by more than
+      _rtol * max|y|
+  i.e. while linear interpolation (and the trapezoid rule) is not yet
+  accurate to the requested fraction of the peak.  All midpoints of one
+  pass are evaluated in a single call of the (vectorised) curve, and every
+  evaluation is kept in the grid, so points gather around r0 and at the
+  edges of the peak window while the plateau stays coarse.
+
+  A midpoint test cannot see a step inside an interval, so known
+  discontinuities should be passed to getGrid as zBreaks; a grid point is
+  then placed on either side of each.  For Bortfeldt.bragg_vec these are
+  the edges of the peak window, r0-10*sigma and r0+5*sigma.  Intervals
+  narrower than _dzMin are not split, and _nMax bounds the total number of
+  points.
+
+  The grid suits curves that are a function of depth alone.  It is not
+  for braggcurve_basic.bragg_vec1, whose volume element depends on the
+  spacing of the grid it is given.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "DepthGrid"; debug output is enabled at run time with
+               logging.getLogger("DepthGrid").setLevel(logging.DEBUG)
+
+  Instance attributes:
+  --------------------
+   _zmin, _zmax= Depth range (cm)
+   _rtol       = Requested accuracy relative to max|y|
+   _nInit      = Number of points in the initial uniform grid
+   _nMax       = Maximum number of points
+   _dzMin      = Narrowest interval that is split (cm)
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Checks and stores settings.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+
+  Processing methods:
+      getGrid  : (z, y) numpy arrays, z increasing, for the curve f(z);
+                 optional depths zBreaks at which f is discontinuous
+      integrate: Trapezoid integral of f over [_zmin, _zmax] on the grid
+
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+
+@author: kennethlong
+"""
+
+import logging
+import numpy as np
+
+class DepthGrid(object):
+    __Log      = logging.getLogger("DepthGrid")
+
+#--------  "Built-in methods":
+    def __init__(self, _zmin=0., _zmax=30., _rtol=1.E-3, _nInit=64, \
+                 _nMax=20000, _dzMin=None):
+
+        if not _zmin < _zmax or _rtol <= 0. or _nInit < 2 or \
+           _nMax < _nInit:
+            print(" DepthGrid: bad settings:", _zmin, _zmax, _rtol, \
+                  _nInit, _nMax, " raising exception")
+            raise BadParameters()
+
+        self._zmin  = float(_zmin)
+        self._zmax  = float(_zmax)
+        self._rtol  = float(_rtol)
+        self._nInit = int(_nInit)
+        self._nMax  = int(_nMax)
+        if _dzMin is None:
+            _dzMin = (self._zmax - self._zmin) * 1.E-6
+        self._dzMin = float(_dzMin)
+
+    def __repr__(self):
+        return " DepthGrid(<zmin>, <zmax>, <rtol>, <nInit>, <nMax>, <dzMin>)"
+
+    def __str__(self):
+        print(" DepthGrid settings:")
+        print("     Depth range:", self._zmin, "to", self._zmax, "cm")
+        print("     Relative tolerance:", self.getrtol())
+        print("     Initial, maximum points:", self._nInit, self._nMax)
+        print("     Narrowest split interval:", self._dzMin, "cm")
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getrtol(self):
+        return self._rtol
+
+    def setrtol(self, _rtol):
+        if _rtol <= 0.:
+            raise BadParameters()
+        self._rtol = float(_rtol)
+
+
+#--------  Processing methods:
+    def getGrid(self, f, zBreaks=()):
+        z = np.linspace(self._zmin, self._zmax, self._nInit)
+        zBreaks = np.asarray(zBreaks, dtype=float).ravel()
+        zBreaks = zBreaks[(zBreaks > self._zmin) & (zBreaks < self._zmax)]
+        if len(zBreaks) > 0:
+            z = np.unique(np.concatenate((z, zBreaks, \
+                                          np.nextafter(zBreaks, -np.inf))))
+        y = np.asarray(f(z), dtype=float)
+
+        #.. Intervals [z[i], z[i+1]] still to be tested:
+        Wide   = np.diff(z) >= 2.*self._dzMin
+        Left   = z[:-1][Wide]
+        Right  = z[1:][Wide]
+        yLeft  = y[:-1][Wide]
+        yRight = y[1:][Wide]
+        zAll   = [z]
+        yAll   = [y]
+        nPts   = len(z)
+        yMax   = np.max(np.abs(y))
+        nPass  = 0
+        while len(Left) > 0 and nPts < self._nMax:
+            #.. Keep within the point budget, widest intervals first:
+            if nPts + len(Left) > self._nMax:
+                Keep = np.argsort(Left - Right)[:self._nMax - nPts]
+                Left, Right = Left[Keep], Right[Keep]
+                yLeft, yRight = yLeft[Keep], yRight[Keep]
+
+            zMid = 0.5*(Left + Right)
+            yMid = np.asarray(f(zMid), dtype=float)
+            zAll.append(zMid)
+            yAll.append(yMid)
+            nPts += len(zMid)
+            yMax  = max(yMax, np.max(np.abs(yMid)))
+
+            Err   = np.abs(yMid - 0.5*(yLeft + yRight))
+            Split = (Err > self._rtol*yMax) & \
+                    (0.5*(Right - Left) >= self._dzMin)
+            Left   = np.concatenate((Left[Split],  zMid[Split]))
+            Right  = np.concatenate((zMid[Split],  Right[Split]))
+            yLeft  = np.concatenate((yLeft[Split], yMid[Split]))
+            yRight = np.concatenate((yMid[Split],  yRight[Split]))
+            nPass += 1
+
+        z = np.concatenate(zAll)
+        y = np.concatenate(yAll)
+        Order = np.argsort(z, kind='stable')
+        DepthGrid.__Log.debug("getGrid: %d points after %d passes", \
+                              len(z), nPass)
+        return z[Order], y[Order]
+
+    def integrate(self, f, zBreaks=()):
+        z, y = self.getGrid(f, zBreaks)
+        return np.sum(0.5*(y[1:] + y[:-1]) * np.diff(z))
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class HitsFile:
+===============
+
+  Streaming reader for the Geant4 "hits.dat" files written by the fibre
+  tracker simulation.  The file is whitespace delimited with one header
+  line and the nine columns listed in HitsFile.Columns.  Only the columns
+  that are needed are parsed, and the file is read in fixed-size chunks so
+  that peak memory is set by the chunk size and not by the file size.
+
+
+  With _cache=True the StN, EventN, Depth and Edep columns are converted
+  on first read into a columnar binary cache, <filename>.cache/, holding
+  one .npy file per column (int32 StN/EventN, float32 Depth/Edep) and a
+  meta.json.  Later reads memory-map the cache instead of parsing text.
+  The cache is rebuilt whenever the hits file's mtime or size changes.
+  A cache with no hits file beside it (as written by
+  HitsGenerator.writeBinary) is read as it stands.
+
+
+  Class attributes:
+  -----------------
+  __Log        : Logger "HitsFile"; debug output is enabled at run time
+                 with logging.getLogger("HitsFile").setLevel(logging.DEBUG)
+  Columns      : Column names, in file order
+  CacheColumns : Cached columns and their dtypes
+  CacheVersion : Cache format version, stored in meta.json
+
+  Instance attributes:
+  --------------------
+   _filename   = Hits file to be read
+   _chunksize  = Number of rows parsed per chunk
+   _cache      = True to read through the binary cache
+   _StNNames   = Station names indexed by cached StN code
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Checks that the hits file exists.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+
+  Processing methods:
+      readChunks     : Generator yielding pandas data frames holding the
+                       requested columns, _chunksize rows at a time
+      readArrays     : As readChunks but yielding dicts of numpy arrays;
+                       slices of the memory-mapped cache if enabled
+      isCacheValid   : True if the cache matches the hits file
+      loadCache      : Memory-map the cache, (re)writing it if needed
+      writeCache     : Convert the hits file into the cache
+      getStations    : Per-station summary accumulated chunk by chunk and
+                       keyed on station name (StN) or depth.  Returns a
+                       pandas data frame, stations in order of first
+                       appearance, with columns:
+                         Depth    : station depth (mm)
+                         Edep     : total energy deposited (MeV)
+                         nHits    : number of hits
+                         nEvents  : number of events with hits
+                         EdepMean : mean energy deposited per event
+                         EdepStd  : spread of energy deposited per event
+                       Per-event quantities use _nEvents events (default:
+                       all events seen in the file); _spread=False skips
+                       them.  Hits may appear in any order.
+      getStationSums : (Depth, Edep) numpy arrays of total energy deposited
+                       at each station depth; units as in file (mm, MeV).
+
+  Module functions:
+      aggregate      : bincount aggregation of hits by station number, and
+                       by (station, event) pair
+      writeColumns   : Write hit chunks into a cache directory
+      loadColumns    : Memory-map the columns of a cache directory
+      trimNpy        : Shrink a 1-d .npy file in place
+      countLines     : Count the lines in a file
+
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Vectorised station aggregation keyed on StN or depth
+ 1.2: 18Oct26: Binary columnar cache
+ 1.3: 18Oct26: Debug output through the logging module
+ 1.4: 18Oct26: Cache-only hits files
+ 1.5: 18Oct26: Unreadable cache metadata treated as an invalid cache
+
+@author: kennethlong
+"""
+
+import logging
+import os
+import json
+import shutil
+import tempfile
+import numpy  as np
+import pandas as pnds
+
+class HitsFile(object):
+    __Log      = logging.getLogger("HitsFile")
+    Columns    = ['StN', 'EventN', 'FibreHit', 'Edep', \
+                  'RealX', 'RealY', 'RealZ', 'Depth', 'Time']
+    CacheColumns = {'StN': np.int32, 'EventN': np.int32, \
+                    'Depth': np.float32, 'Edep': np.float32}
+    CacheVersion = 1
+
+#--------  "Built-in methods":
+    def __init__(self, _filename=None, _chunksize=1000000, _cache=False):
+
+        if _filename == None or not (os.path.isfile(_filename) or \
+           os.path.isfile(os.path.join(_filename+'.cache', 'meta.json'))):
+            print(" HitsFile: file ", _filename, " does not exist.", \
+                  " Raising exception")
+            raise NonExistantFile('Hits file ' + str(_filename) + \
+                                  ' does not exist; execution termimated.')
+
+        self._filename  = _filename
+        self._chunksize = int(_chunksize)
+        self._cache     = _cache or not os.path.isfile(_filename)
+        self._StNNames  = None
+        HitsFile.__Log.debug("file: %s chunk size: %d cache: %s", \
+                             self._filename, self._chunksize, self._cache)
+
+    def __repr__(self):
+        return " HitsFile(<filename>, <chunksize>)"
+
+    def __str__(self):
+        print(" HitsFile settings:")
+        print("     Hits file:", self.getFilename())
+        print("    Chunk size:", self.getChunksize())
+        print("   Cache in use:", self.getCache())
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getFilename(self):
+        return self._filename
+
+    def getChunksize(self):
+        return self._chunksize
+
+    def getCache(self):
+        return self._cache
+
+    def getCacheDir(self):
+        return self._filename + '.cache'
+
+
+#--------  I/o methods:
+    def readChunks(self, _columns=('Depth', 'Edep')):
+        for Col in _columns:
+            if Col not in HitsFile.Columns:
+                raise BadParameters('Unknown hits-file column ' + Col)
+        Reader = pnds.read_csv(self._filename, sep=r'\s+', \
+                               names=HitsFile.Columns, \
+                               usecols=list(_columns), \
+                               skiprows=1, chunksize=self._chunksize)
+        with Reader:
+            for Chunk in Reader:
+                yield Chunk
+
+    def readArrays(self, _columns=('Depth', 'Edep')):
+        #.. As readChunks, but yields a dict of numpy arrays per chunk.  With
+        #   the cache enabled the arrays are slices of the memory-mapped
+        #   cache; StN is then an int32 code into self._StNNames.
+        if self._cache:
+            try:
+                Cache = self.loadCache()
+            except OSError as Err:
+                print("    ----> HitsFile: cache unusable, reading text:", Err)
+                self._cache = False
+        if self._cache:
+            nRows = len(Cache['Edep'])
+            for i in range(0, nRows, self._chunksize):
+                yield {Col: Cache[Col][i:i+self._chunksize] \
+                       for Col in _columns}
+        else:
+            self._StNNames = None
+            for Chunk in self.readChunks(_columns):
+                yield {Col: Chunk[Col].to_numpy() for Col in _columns}
+
+    def isCacheValid(self):
+        MetaFile = os.path.join(self.getCacheDir(), 'meta.json')
+        if not os.path.isfile(MetaFile):
+            return False
+        try:
+            with open(MetaFile) as f:
+                Meta = json.load(f)
+        except (ValueError, OSError) as Err:
+            #.. Truncated or corrupt; loadCache then rebuilds the cache:
+            HitsFile.__Log.debug("isCacheValid: %s unreadable: %s", \
+                                 MetaFile, Err)
+            return False
+        if not isinstance(Meta, dict):
+            return False
+        if not os.path.isfile(self._filename):
+            return Meta.get('Version') == HitsFile.CacheVersion
+        Stat = os.stat(self._filename)
+        return Meta.get('Version') == HitsFile.CacheVersion and \
+               Meta.get('mtime_ns') == Stat.st_mtime_ns and \
+               Meta.get('size') == Stat.st_size
+
+    def loadCache(self):
+        if not self.isCacheValid():
+            self.writeCache()
+        Cache, self._StNNames = loadColumns(self.getCacheDir())
+        return Cache
+
+    def writeCache(self):
+        Stat     = os.stat(self._filename)
+        CacheDir = self.getCacheDir()
+        TmpDir   = tempfile.mkdtemp(prefix='.cache-', \
+                                    dir=os.path.dirname(CacheDir) or '.')
+        try:
+            writeColumns(TmpDir, self.readChunks(tuple(HitsFile.CacheColumns)),\
+                         countLines(self._filename) - 1, \
+                         {'mtime_ns': Stat.st_mtime_ns, \
+                          'size': Stat.st_size})
+            if os.path.isdir(CacheDir):
+                shutil.rmtree(CacheDir)
+            os.replace(TmpDir, CacheDir)
+        except BaseException:
+            shutil.rmtree(TmpDir, ignore_errors=True)
+            raise
+        HitsFile.__Log.debug("writeCache: written %s", CacheDir)
+
+
+#--------  Processing methods:
+    def getStations(self, _key='StN', _nEvents=None, _spread=True):
+        if _key not in ('StN', 'Depth'):
+            raise BadParameters('Stations keyed on StN or Depth, not ' + \
+                                str(_key))
+        Cols = ['EventN', 'Edep', 'Depth']
+        if _key == 'StN':
+            Cols.insert(0, 'StN')
+
+        Index    = {}                  #.. station key -> station number
+        Depths   = []
+        Sum      = np.zeros(0)
+        nHits    = np.zeros(0, dtype=np.int64)
+        PairKeys = [np.zeros(0, dtype=np.int64)]
+        PairSums = [np.zeros(0)]
+        for Chunk in self.readArrays(Cols):
+            #.. Map this chunk's station keys onto global station numbers,
+            #   numbered in order of first appearance in the file:
+            ChunkCodes, ChunkKeys = pnds.factorize(Chunk[_key])
+            if _key == 'StN' and self._StNNames is not None:
+                ChunkKeys = self._StNNames[ChunkKeys]
+            First = np.unique(ChunkCodes, return_index=True)[1]
+            Depth = Chunk['Depth'].astype(float)
+            for k, Key in enumerate(ChunkKeys):
+                if Key not in Index:
+                    Index[Key] = len(Index)
+                    Depths.append(Depth[First[k]])
+            Lut   = np.array([Index[Key] for Key in ChunkKeys], \
+                             dtype=np.int64)
+            Codes = Lut[ChunkCodes]
+
+            ChunkSum, ChunknHits, ChunkPairKey, ChunkPairSum = \
+                aggregate(Codes, Chunk['Edep'].astype(float), \
+                          Chunk['EventN'] if _spread else None, \
+                          len(Index))
+            Sum   = np.pad(Sum,   (0, len(Index)-len(Sum)))   + ChunkSum
+            nHits = np.pad(nHits, (0, len(Index)-len(nHits))) + ChunknHits
+            if _spread:
+                PairKeys.append(ChunkPairKey)
+                PairSums.append(ChunkPairSum)
+
+        Stations = pnds.DataFrame({'Depth': np.array(Depths, dtype=float), \
+                                   'Edep': Sum, 'nHits': nHits}, \
+                                  index=pnds.Index(list(Index), name=_key))
+        if _spread:
+            #.. Events split across chunk boundaries are merged here:
+            PairKey, Inv = np.unique(np.concatenate(PairKeys), \
+                                     return_inverse=True)
+            PairSum = np.bincount(Inv, weights=np.concatenate(PairSums))
+            St      = PairKey >> 32
+            if _nEvents == None:
+                _nEvents = len(np.unique(PairKey & 0xFFFFFFFF))
+            S1 = np.bincount(St, weights=PairSum,    minlength=len(Index))
+            S2 = np.bincount(St, weights=PairSum**2, minlength=len(Index))
+            Mean = S1 / _nEvents
+            Stations['nEvents']  = np.bincount(St, minlength=len(Index))
+            Stations['EdepMean'] = Mean
+            Stations['EdepStd']  = np.sqrt(np.maximum(S2/_nEvents - Mean**2, \
+                                                      0.))
+
+        HitsFile.__Log.debug("getStations:\n%s", Stations)
+        return Stations
+
+    def getStationSums(self):
+        Stations = self.getStations('Depth', _spread=False)
+        return Stations.index.to_numpy(dtype=float), \
+               Stations['Edep'].to_numpy()
+
+
+#--------  Aggregation of hits; input may be in any order:
+def aggregate(Codes, Edep, EventN=None, nStations=None):
+    """
+    Codes : station number (0 ... nStations-1) of each hit
+    Edep  : energy deposited by each hit
+    EventN: event number of each hit; if given, the energy deposited per
+            (station, event) pair is also returned, keyed on
+            station << 32 | event.
+
+    Returns Sum and nHits per station, and PairKey, PairSum (None if EventN
+    is not given).
+    """
+    if nStations == None:
+        nStations = int(Codes.max()) + 1 if len(Codes) > 0 else 0
+    Sum   = np.bincount(Codes, weights=Edep, minlength=nStations)
+    nHits = np.bincount(Codes, minlength=nStations)
+    if EventN is None:
+        return Sum, nHits, None, None
+
+    Pair = (Codes.astype(np.int64) << 32) | EventN.astype(np.int64)
+    PairKey, Inv = np.unique(Pair, return_inverse=True)
+    PairSum = np.bincount(Inv, weights=Edep, minlength=len(PairKey))
+    return Sum, nHits, PairKey, PairSum
+
+
+#--------  Binary columnar cache; one .npy file per column + meta.json:
+def writeColumns(CacheDir, Chunks, nMax, Meta):
+    """
+    Write the hit chunks (pandas data frames) into memory-mappable .npy
+    files in CacheDir.  nMax is an upper bound on the number of rows; the
+    files are trimmed to the rows actually written.  Meta is stored in
+    meta.json along with the row count and the station names that StN
+    codes refer to.
+    """
+    Arrays = {Col: np.lib.format.open_memmap( \
+                       os.path.join(CacheDir, Col+'.npy'), mode='w+', \
+                       dtype=dt, shape=(max(nMax, 0),)) \
+              for Col, dt in HitsFile.CacheColumns.items()}
+    Names = {}
+    nRows = 0
+    for Chunk in Chunks:
+        m = len(Chunk)
+        if nRows + m > nMax:
+            raise BadParameters('More hits than the ' + str(nMax) + \
+                                ' rows allowed for.')
+        Codes, Keys = pnds.factorize(Chunk['StN'])
+        Lut = np.array([Names.setdefault(Key, len(Names)) for Key in Keys], \
+                       dtype=np.int32)
+        Arrays['StN'][nRows:nRows+m] = Lut[Codes]
+        for Col in ('EventN', 'Depth', 'Edep'):
+            Arrays[Col][nRows:nRows+m] = Chunk[Col].to_numpy()
+        nRows += m
+    for Col, Array in Arrays.items():
+        Array.flush()
+        del Array
+    Arrays.clear()
+    for Col in HitsFile.CacheColumns:
+        trimNpy(os.path.join(CacheDir, Col+'.npy'), nRows)
+
+    Meta = dict(Meta, Version=HitsFile.CacheVersion, nRows=nRows, \
+                StN=[str(Key) for Key in Names])
+    with open(os.path.join(CacheDir, 'meta.json'), 'w') as f:
+        json.dump(Meta, f)
+    return nRows
+
+def loadColumns(CacheDir):
+    with open(os.path.join(CacheDir, 'meta.json')) as f:
+        Meta = json.load(f)
+    Cache = {Col: np.load(os.path.join(CacheDir, Col+'.npy'), mmap_mode='r') \
+             for Col in HitsFile.CacheColumns}
+    return Cache, np.array(Meta['StN'], dtype=object)
+
+def trimNpy(Path, nRows):
+    #.. Shrink a 1-d .npy file in place: rewrite the header with the new
+    #   shape, padded to its original length, and truncate the data.
+    with open(Path, 'r+b') as f:
+        Version = np.lib.format.read_magic(f)
+        if Version == (1, 0):
+            Shape, Fortran, dt = np.lib.format.read_array_header_1_0(f)
+        else:
+            Shape, Fortran, dt = np.lib.format.read_array_header_2_0(f)
+        Offset = f.tell()
+        Header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" \
+                 % (np.lib.format.dtype_to_descr(dt), nRows)
+        Start  = 10 if Version == (1, 0) else 12
+        f.seek(Start)
+        f.write(Header.ljust(Offset - Start - 1).encode('latin1') + b'\n')
+        f.truncate(Offset + nRows*dt.itemsize)
+
+def countLines(Path, BlockSize=1<<24):
+    nLines = 0
+    Last   = b'\n'
+    with open(Path, 'rb') as f:
+        for Block in iter(lambda: f.read(BlockSize), b''):
+            nLines += Block.count(b'\n')
+            Last    = Block[-1:]
+    return nLines + (Last != b'\n')
+
+
+#--------  Exceptions:
+class NonExistantFile(Exception):
+    pass
+
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class HitsGenerator:
+====================
+
+  Synthetic Geant4-style hits files for load-testing HitsFile, the
+  Data_Edep analysis and BraggFit without access to the simulation.  Rows
+  have the nine columns of HitsFile.Columns and are written either as a
+  whitespace-delimited text file or directly as the binary columnar cache
+  that HitsFile reads (<filename>.cache/, no text file).
+
+  Each event is one proton of range r0 (cm) and initial kinetic energy
+  T0 = (r0/alpha)^(1/p) (Bragg-Kleeman).  The proton reaches depth z if
+  both
+      its range, r0 + sigma*N(0,1), exceeds z  (range straggling), and
+      it has not been lost in a nonelastic nuclear interaction, which
+      happens uniformly in depth with probability beta/(1+beta*r0) per cm,
+  so that it crosses a station at depth z with probability
+      Phi(z) = Q((z-r0)/sigma) * (1+beta*(r0-z))/(1+beta*r0)
+  (Q the upper-tail normal probability), the fluence of the Bortfeldt
+  model.  A crossing is recorded with probability _Efficiency.  The proton
+  traverses a fibre of radius FibreRadius at uniformly distributed impact
+  parameter, as for a near-parallel beam, giving chord c with mean
+  pi*FibreRadius/2 = getMeanChord().
+  The energy deposited is Gamma distributed with
+      mean     = c * bragg_vec(z)/Phi(z)
+      variance = c * dEdx.getStraggling(T(z), 1.)
+  the second being Bohr energy-loss straggling at the kinetic energy T(z)
+  of the proton at z.  Summed over events,
+      sum(Edep) / (nEvents * getMeanChord()) = _Efficiency * bragg_vec(z)
+  at each station, with bragg_vec(z) = Bortfeldt.bragg_vec(z, *_Pars).
+  81-Anthea/Data_Edep_Simplify.py divides by the rougher average chord
+  4*FibreRadius/pi instead, so on these files its dE/dx is pi^2/8 (1.234)
+  times _Efficiency * bragg_vec(z).
+
+  RealX, RealY are Gaussian, width SpotSigma added in quadrature to the
+  MCS displacement (MCS.getYplane) over the depth z; FibreHit is the fibre,
+  of pitch FibrePitch, under RealX (stations named *_H) or RealY (*_V).
+  RealZ is Depth + ZOffset and Time the time of flight to the station.
+
+  Events are generated _chunkEvents at a time from seeds spawned off one
+  numpy SeedSequence, so output is reproducible for a given _Seed and
+  chunk size, and peak memory is set by the chunk size.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "HitsGenerator"; debug output is enabled at run time
+               with logging.getLogger("HitsGenerator").setLevel(logging.DEBUG)
+  Stations   : Default stations, name: depth (mm); as 81-Anthea/hits.dat
+  FibreRadius: Fibre radius (cm)
+  FibrePitch : Fibre pitch (mm)
+  nFibres    : Fibres per station
+  SpotSigma  : Beam-spot width at entry (mm)
+  ZOffset    : RealZ - Depth (mm)
+
+  Instance attributes:
+  --------------------
+   _filename   = Parameter file (BraggParameters.csv)
+   _Pars       = Bortfeldt parameters (phi0, epsilon, r0, beta, sigma)
+   _Stations   = Station names and depths (mm)
+   _Efficiency = Probability that a crossing is recorded
+   _Seed       = Seed of the SeedSequence
+   _T0         = Initial kinetic energy (MeV)
+   _Phi, _Smean, _Omega2, _Spot, _Time = per station: crossing probability,
+                 mean dE/dx of crossing protons (MeV/cm), straggling
+                 variance per cm (MeV^2/cm), spot width (mm), time (ns)
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Reads parameters and tabulates the per-station quantities.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+      getExpected   : _Efficiency * bragg_vec at the station depths
+
+  Processing methods:
+      generateChunks: Generator yielding pandas data frames of _chunkEvents
+                      events each, holding _columns (default: all of
+                      HitsFile.Columns) with StN categorical
+      writeText     : Write _nEvents events as a text hits file
+      writeBinary   : Write _nEvents events as a HitsFile binary cache
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Straggling variance from dEdx.getStraggling
+ 1.2: 18Oct26: Document the pi^2/8 between the mean chord, pi r/2, and the
+               4r/pi of the Data_Edep analysis
+
+@author: kennethlong
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import math   as mth
+import numpy  as np
+import pandas as pnds
+
+import Bortfeldt as Bortfeldt
+import dEdx      as dEdx
+import HitsFile  as HitsFile
+import MCS       as MCS
+
+class HitsGenerator(object):
+    __Log       = logging.getLogger("HitsGenerator")
+    Stations    = {'St1_H':  12.2759, 'St1_V':  12.7241, \
+                   'St2_H': 251.776,  'St2_V': 252.224, \
+                   'St3_H': 256.776,  'St3_V': 257.224, \
+                   'St4_H': 261.776,  'St4_V': 262.224}
+    FibreRadius = 0.0125
+    FibrePitch  = 0.4
+    nFibres     = 500
+    SpotSigma   = 3.5
+    ZOffset     = -150.05
+
+#--------  "Built-in methods":
+    def __init__(self, _filename=None, _Pars=(1., 0.1, 27.5, 0.012, 0.35), \
+                 _Stations=None, _Efficiency=1., _Seed=None):
+
+        if _filename == None or not os.path.isfile(_filename):
+            print(" HitsGenerator: file ", _filename, " does not exist.", \
+                  " Raising exception")
+            raise NonExistantFile('CSV file ' + str(_filename) + \
+                                  ' does not exist; execution termimated.')
+        if _Stations == None:
+            _Stations = HitsGenerator.Stations
+        if len(_Pars) != 5 or _Pars[2] <= 0. or _Pars[4] <= 0. or \
+           not 0. < _Efficiency <= 1. or len(_Stations) == 0:
+            print(" HitsGenerator: bad settings:", _Pars, _Efficiency, \
+                  len(_Stations), " raising exception")
+            raise BadParameters()
+
+        self._filename   = _filename
+        self._Pars       = tuple(float(Par) for Par in _Pars)
+        self._Stations   = dict(_Stations)
+        self._Efficiency = float(_Efficiency)
+        self._Seed       = _Seed
+
+        iBortfeldt = Bortfeldt.Bortfeldt(_filename)
+        idEdx      = dEdx.dEdx(_filename)
+        iMCS       = MCS.MCS(_filename)
+        phi0, epsilon, r0, beta, sigma = self._Pars
+        p     = iBortfeldt.getRangeEnergy()
+        alpha = iBortfeldt.getalpha()
+        Mp    = idEdx.getProjectileMass()
+        self._T0 = (r0/alpha)**(1./p)
+
+        #.. Per-station quantities; z in cm:
+        z    = np.array(list(self._Stations.values()), dtype=float) / 10.
+        Tail = np.array([0.5*mth.erfc((zi-r0)/(mth.sqrt(2.)*sigma)) \
+                         for zi in z])
+        self._Phi   = Tail * np.maximum(1. + beta*(r0-z), 0.) / (1.+beta*r0)
+        Dose        = iBortfeldt.bragg_vec(z, 1., epsilon, r0, beta, sigma)
+        self._Smean = np.divide(Dose, self._Phi, out=np.zeros(len(z)), \
+                                where=self._Phi > 0.)
+
+        self._Omega2 = idEdx.getStraggling(_residualT(r0 - z, p, alpha), 1.)
+        Yplane = iMCS.getYplane(z, _residualT(r0 - z/2., p, alpha))
+        self._Spot = np.sqrt(HitsGenerator.SpotSigma**2 + (10.*Yplane)**2)
+
+        #.. Time of flight, integrating 1/v over depth:
+        zGrid = np.linspace(0., z.max(), 2001)
+        TGrid = np.maximum(_residualT(r0 - zGrid, p, alpha), 1.)
+        InvV  = 1. / (299.792458 * np.sqrt(1. - (Mp/(Mp + TGrid))**2))
+        tGrid = np.concatenate(([0.], np.cumsum(0.5*(InvV[1:] + InvV[:-1]) \
+                                                * np.diff(zGrid) * 10.)))
+        self._Time = np.interp(z, zGrid, tGrid)
+
+        if HitsGenerator.__Log.isEnabledFor(logging.DEBUG):
+            HitsGenerator.__Log.debug("T0 %g MeV; z, Phi, Smean, Omega2, " \
+                                      "Spot, Time:\n%s", self._T0, \
+                np.column_stack((z, self._Phi, self._Smean, self._Omega2, \
+                                 self._Spot, self._Time)))
+
+    def __repr__(self):
+        return " HitsGenerator(<filename>, <Pars>, <Stations>, " \
+               "<Efficiency>, <Seed>)"
+
+    def __str__(self):
+        print(" HitsGenerator settings:")
+        print("     Parameter file:", self._filename)
+        print("     Bortfeldt parameters:", self.getPars())
+        print("     Initial kinetic energy:", self.getT0(), "MeV")
+        print("     Stations:", self.getStations())
+        print("     Efficiency:", self.getEfficiency(), " seed:", self._Seed)
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getPars(self):
+        return self._Pars
+
+    def getStations(self):
+        return self._Stations
+
+    def getEfficiency(self):
+        return self._Efficiency
+
+    def getT0(self):
+        return self._T0
+
+    def getMeanChord(self):
+        return mth.pi * HitsGenerator.FibreRadius / 2.
+
+    def getExpected(self):
+        return self._Efficiency * self._Phi * self._Smean
+
+
+
+#--------  Processing methods:
+    def generateChunks(self, _nEvents, _chunkEvents=100000, \
+                       _columns=HitsFile.HitsFile.Columns):
+        Names  = list(self._Stations)
+        Depth  = np.array(list(self._Stations.values()), dtype=float)
+        IsV    = np.array([Name.endswith('_V') for Name in Names])
+        phi0, epsilon, r0, beta, sigma = self._Pars
+        Seeds  = np.random.SeedSequence(self._Seed).spawn( \
+                     -(-int(_nEvents) // int(_chunkEvents)))
+
+        for iChunk, Seed in enumerate(Seeds):
+            Rng    = np.random.default_rng(Seed)
+            First  = iChunk * int(_chunkEvents)
+            m      = min(int(_chunkEvents), int(_nEvents) - First)
+
+            #.. Depth each proton reaches, and the stations it is seen in:
+            Reach  = np.minimum(r0 + sigma*Rng.standard_normal(m), \
+                                Rng.random(m) * (1.+beta*r0)/beta)
+            Hit    = Depth/10. < Reach[:, None]
+            if self._Efficiency < 1.:
+                Hit &= Rng.random(Hit.shape) < self._Efficiency
+            Event, St = np.nonzero(Hit)
+            n      = len(Event)
+
+            #.. Energy deposited along the chord through the fibre:
+            b      = HitsGenerator.FibreRadius * Rng.random(n)
+            Chord  = 2.*np.sqrt(HitsGenerator.FibreRadius**2 - b**2)
+            Mean   = Chord * self._Smean[St]
+            Var    = Chord * self._Omega2[St]
+            Edep   = Rng.gamma(Mean**2/Var, Var/np.maximum(Mean, 1.E-300))
+
+            Chunk  = {'StN'   : pnds.Categorical.from_codes(St, Names), \
+                      'EventN': First + Event, \
+                      'Edep'  : Edep, \
+                      'RealZ' : Depth[St] + HitsGenerator.ZOffset, \
+                      'Depth' : Depth[St], \
+                      'Time'  : self._Time[St]}
+
+            #.. Drawn last, and only if wanted, so that the columns above do
+            #   not depend on _columns:
+            if {'FibreHit', 'RealX', 'RealY'} & set(_columns):
+                X     = self._Spot[St] * Rng.standard_normal(n)
+                Y     = self._Spot[St] * Rng.standard_normal(n)
+                Fibre = np.floor(np.where(IsV[St], Y, X) / \
+                                 HitsGenerator.FibrePitch)
+                Chunk['FibreHit'] = np.clip( \
+                    Fibre + HitsGenerator.nFibres//2, 0, \
+                    HitsGenerator.nFibres-1).astype(np.int64)
+                Chunk['RealX'] = X
+                Chunk['RealY'] = Y
+
+            yield pnds.DataFrame({Col: Chunk[Col] for Col in _columns})
+            HitsGenerator.__Log.debug("chunk %d: %d events, %d hits", \
+                                      iChunk, m, n)
+
+    def writeText(self, _filename, _nEvents, _chunkEvents=100000):
+        nRows = 0
+        Fmt   = '\t%d\t%d\t%.6g\t%.6g\t%.6g\t%.6g\t%.6g\t%.6g'
+        with open(_filename, 'w') as f:
+            f.write('\t'.join(HitsFile.HitsFile.Columns) + '\n')
+            for Chunk in self.generateChunks(_nEvents, _chunkEvents):
+                Values = Chunk.iloc[:, 1:].to_numpy()
+                Codes  = Chunk['StN'].cat.codes.to_numpy()
+                #.. Rows of one station at a time, station name in the format:
+                for Code, Name in enumerate(Chunk['StN'].cat.categories):
+                    np.savetxt(f, Values[Codes == Code], fmt=Name + Fmt)
+                nRows += len(Chunk)
+        return nRows
+
+    def writeBinary(self, _filename, _nEvents, _chunkEvents=100000):
+        #.. Cache only: HitsFile(_filename) reads it without a text file.
+        CacheDir = _filename + '.cache'
+        TmpDir   = tempfile.mkdtemp(prefix='.cache-', \
+                                    dir=os.path.dirname(CacheDir) or '.')
+        Meta     = {'Generator': {'Parameters': self._filename, \
+                                  'Pars': self._Pars, \
+                                  'Stations': self._Stations, \
+                                  'Efficiency': self._Efficiency, \
+                                  'Seed': self._Seed, \
+                                  'nEvents': int(_nEvents)}}
+        Chunks   = self.generateChunks(_nEvents, _chunkEvents, \
+                                       tuple(HitsFile.HitsFile.CacheColumns))
+        try:
+            nRows = HitsFile.writeColumns(TmpDir, Chunks, \
+                        int(_nEvents) * len(self._Stations), Meta)
+            if os.path.isdir(CacheDir):
+                shutil.rmtree(CacheDir)
+            os.replace(TmpDir, CacheDir)
+        except BaseException:
+            shutil.rmtree(TmpDir, ignore_errors=True)
+            raise
+        HitsGenerator.__Log.debug("writeBinary: %d rows to %s", nRows, \
+                                  CacheDir)
+        return nRows
+
+
+#--------  Kinetic energy from residual range (Bragg-Kleeman):
+def _residualT(Range, p, alpha):
+    return (np.maximum(Range, 0.) / alpha)**(1./p)
+
+
+#--------  Exceptions:
+class NonExistantFile(Exception):
+    pass
+
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module Kernels:
+===============
+
+  Optional compiled (numba) versions of the array kernels of MCS, dEdx and
+  Bortfeldt.  Each kernel makes one pass over its input with no temporary
+  arrays, where the numpy expressions in those classes build one temporary
+  per operation.  The classes ask for the kernels with get(); when it
+  returns None they use their numpy code, which stays the reference.
+
+  The backend is chosen at run time:
+    "numpy": no compiled kernels
+    "numba": numba kernels, compiled on first use and cached on disk
+             (cache=True), so later processes load rather than recompile
+    "auto" : numba if it can be imported, numpy otherwise
+  The first call of getBackend or get takes the backend from the
+  environment variable BraggBACKEND (default "numpy"); setBackend changes
+  it.  numba is opted into, as importing it and loading the kernels adds
+  about half a second to the first array call of a process, which short
+  processes cannot afford.  numba is only imported when the numba backend
+  is first used, so importing the physics classes stays cheap.  Worker
+  processes make their own choice, from BraggBACKEND.
+
+  Scalar arguments keep the numpy/math code, for which a compiled call
+  would only add dispatch overhead.  The Bragg-curve kernel interpolates
+  the same ParabolicCylinderD tables as Bortfeldt.peak, and reports back
+  if an argument lies outside them, in which case the caller falls back
+  to numpy (which evaluates D_v exactly there).
+
+
+  Module attributes:
+  ------------------
+  __Log      : Logger "Kernels"; debug output is enabled at run time with
+               logging.getLogger("Kernels").setLevel(logging.DEBUG)
+  Backends   : Backends that may be requested
+
+  Module functions:
+      getBackend  : Name of the backend in use, "numpy" or "numba"
+      setBackend  : Select "numpy", "numba" or "auto"; "numba" raises
+                    BadParameters if numba cannot be imported
+      isAvailable : True if numba can be imported
+      get         : Namespace of compiled kernels, or None for numpy:
+          theta0(x, T, Eta1, Alpha1)              : MCS.getTheta0
+          dedx(T, Prefactor, Alpha1, Mp)          : dEdx.getdEdx
+          prebragg(z, r0, q, A, B)                : Bortfeldt.prebragg,
+              A = phi0 Norm/(1+beta r0), B = beta + gamma beta p
+                  + epsilon p/r0
+          bragg(z, zPre, zMax, r0, sigma, q, A, B, Pre, Bp,
+                xmin, h, D1, Dd1, D2, Dd2, out)   : Bortfeldt.bragg_vec
+              (zPre = r0-10 sigma, zMax = r0+5 sigma) and Bortfeldt.peak
+              (zPre = -inf, zMax = inf), over 1-d z into out;
+              Pre = phi0 sigma^q Gamma(q) Norm/(sqrt(2 pi)(1+beta r0)),
+              Bp = beta/p + gamma beta + epsilon/r0, and xmin, h, D, Dd
+              the grid and tables of ParabolicCylinderD of orders -q
+              (D1) and -q-1 (D2).  Returns False if the tables were
+              left, in which case the caller falls back to numpy
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: numpy the default backend; numba opted into
+
+@author: kennethlong
+"""
+
+import importlib.util
+import logging
+import os
+import types
+import numpy  as np
+
+__Log    = logging.getLogger("Kernels")
+Backends = ('auto', 'numpy', 'numba')
+
+_Backend = None
+_Jit     = None
+
+
+#--------  Backend selection:
+def isAvailable():
+    return importlib.util.find_spec('numba') is not None
+
+def getBackend():
+    if _Backend is None:
+        setBackend(os.getenv('BraggBACKEND', 'numpy'))
+    return _Backend
+
+def setBackend(_Name='numpy'):
+    global _Backend
+    if _Name not in Backends:
+        print(" Kernels: unknown backend", _Name, " raising exception")
+        raise BadParameters('Unknown backend ' + str(_Name))
+    if _Name == 'auto':
+        _Name = 'numba' if isAvailable() else 'numpy'
+    elif _Name == 'numba' and not isAvailable():
+        print(" Kernels: numba backend requested but numba not installed,", \
+              " raising exception")
+        raise BadParameters('numba is not installed.')
+    _Backend = _Name
+    __Log.debug("backend: %s", _Backend)
+
+def get():
+    global _Jit
+    if _Backend is None:
+        getBackend()
+    if _Backend != 'numba':
+        return None
+    if _Jit is None:
+        _Jit = _compile()
+    return _Jit
+
+
+#--------  Kernels; compiled by _compile:
+def _theta0(x, T, Eta1, Alpha1):
+    return Eta1 * (np.sqrt(x) / T) * (1. + 0.038*np.log(Alpha1*x/T))
+
+def _dedx(T, Prefactor, Alpha1, Mp):
+    return Prefactor / T * 0.5 * np.log(Alpha1*T*T - 2.*T/Mp)
+
+def _prebragg(z, r0, q, A, B):
+    u = r0 - z
+    return A * np.exp((q - 1.)*np.log(u)) * (1. + B*u)
+
+def _bragg(z, zPre, zMax, r0, sigma, q, A, B, Pre, Bp, \
+           xmin, h, D1, Dd1, D2, Dd2, out):
+    #.. Plateau below zPre, peak from zPre to zMax, zero beyond.  D_v of
+    #   orders -q (D1) and -q-1 (D2) are cubic-Hermite interpolated, as in
+    #   ParabolicCylinderD.getD, on their common grid:
+    Ok   = True
+    nTab = len(D1)
+    for k in range(z.size):
+        if z[k] < zPre:
+            u = r0 - z[k]
+            out[k] = A * np.exp((q - 1.)*np.log(u)) * (1. + B*u)
+        elif z[k] <= zMax:
+            xi = (r0 - z[k]) / sigma
+            t  = (-xi - xmin) / h
+            if not 0. <= t <= nTab - 1:
+                out[k] = np.nan
+                Ok     = False
+                continue
+            i  = min(int(t), nTab - 2)
+            s  = t - i
+            s2 = s*s
+            s3 = s2*s
+            h00 = 2.*s3 - 3.*s2 + 1.
+            h01 = 1. - h00
+            h10 = h*(s3 - 2.*s2 + s)
+            h11 = h*(s3 - s2)
+            V1  = h00*D1[i] + h01*D1[i+1] + h10*Dd1[i] + h11*Dd1[i+1]
+            V2  = h00*D2[i] + h01*D2[i+1] + h10*Dd2[i] + h11*Dd2[i+1]
+            out[k] = Pre * np.exp(-(xi*xi/4.)) * (V1/sigma + Bp*V2)
+        else:
+            out[k] = 0.
+    return Ok
+
+def _compile():
+    import numba
+    __Log.debug("compiling kernels with numba %s", numba.__version__)
+    return types.SimpleNamespace( \
+        theta0   = numba.vectorize(cache=True)(_theta0), \
+        dedx     = numba.vectorize(cache=True)(_dedx), \
+        prebragg = numba.vectorize(cache=True)(_prebragg), \
+        bragg    = numba.njit(cache=True)(_bragg))
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
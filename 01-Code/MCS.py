@@ -4,29 +4,31 @@
 Class MCS:
 ==========
 
-  Calculates the MCS effect for a variety of situations.  Use singleton
-  class so that instance attributes can be used to set the parameters.
+  Calculates the MCS effect for a variety of situations.  Each instance
+  holds the parameters read from its own file, so that several materials
+  can be used side by side and instances can be pickled, e.g. to pass them
+  to worker processes.
 
 
   Class attributes:
   -----------------
-  __instance : Set on creation of first (and only) instance.
-  __Debug    : boolean ... debug flag      
+  __Log      : Logger "MCS"; debug output is enabled at run time with
+               logging.getLogger("MCS").setLevel(logging.DEBUG)
 
   Instance attributes:
   --------------------
    __filename  = Filename from which parameters have been read.  If None
                  then default values are used.
-   _MCSParams  = Pandas data frame instance containing parameters
+   _cntrlParams = BraggParameters record (shared, immutable) holding
+                 the parameters read from the file
    _IssueDate  = date.today(); i.e. date when code is run and resuts are
                  generated 
     
 
   Methods:
   --------
-  Built-in methods __new__, __repr__ and __str__.
-      __new__ : Creates singleton class and prints version, PDG
-                reference, and values of constants used.
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Reads and parses the parameter file.
       __repr__: One liner with call.
       __str__ : Dump of constants
 
@@ -36,60 +38,69 @@ Class MCS:
   Print methods:
 
 
+  Processing methods:
+      getTheta0: Highland MCS angle for thickness x (cm) and kinetic
+                 energy T (MeV).  x and T may be floats or numpy arrays
+                 (broadcast); arrays are evaluated in one pass.
+      getYplane: Plane displacement x/sqrt(3)*Theta0; same arguments.
+
 
   
 Created on Thu 13Aug22, Version history:
 ----------------------------------------
  1.0: 13Aug22: First implementation
+ 1.1: 18Oct26: getTheta0/getYplane accept numpy arrays
+ 1.2: 18Oct26: Parameters held per instance; no longer a singleton
+ 1.3: 18Oct26: Parameters from the shared BraggParameters registry
+ 1.4: 18Oct26: Debug output through the logging module
+ 1.5: 18Oct26: Compiled getTheta0 for arrays when Kernels has a compiled
+               backend
+ 1.6: 18Oct26: Arguments checked with Utilities.isReal; complex rejected
 
 @author: kennethlong
 """
 
+import logging
 import os
 import math   as mth
-import pandas as pnds
+import numpy  as np
 from datetime import date
 
+import BraggParameters as BP
+import Kernels         as Kernels
+import Utilities       as Utilities
+
 class MCS(object):
-    __instance = None
-    __Debug    = False
+    __Log      = logging.getLogger("MCS")
 
 #--------  "Built-in methods":
-    def __new__(cls, _filename=None):
-
-        if cls.__instance is None:
-            cls.__instance = super(MCS, cls).__new__(cls)
-        
-            if _filename == None:
-                if  MCS.__Debug:
-                    print(" MCS: no filename provided, take defaults.")
-            elif not os.path.isfile(_filename):
-                print(" MCS: file ", _filename, " does not exist.", \
-                      " Raising exception")
-                raise NonExistantFile('CSV file' + \
-                                      _Filename + \
-                                      ' does not exist; execution termimated.')
-
-            #.. Set defaults:
-            cls._filename  = None
-            cls._IssueDate = date.today()
-            cls._MCSParams = None
-
-            #.. Parse control file:
-            if _filename != None:
-                cls._cntrlParams = cls.getMCSs(_filename)
-                if cls.__Debug:
-                    print(" MCS: control parameters: \n", \
-                          cls._cntrlParams)
-                cls._IonE, cls._IonEUnit, \
-                cls._z, \
-                cls._X0, cls._X0Unit, \
-                cls._rho, cls._rhoUnit, \
-                cls._Mp, cls._MpUnit, \
-                cls._Eta1, cls._Eta1Unit, \
-                cls._Alpha1, cls._Alpha1Unit = cls.parseMCS()
-        
-        return cls.__instance
+    def __init__(self, _filename=None):
+
+        if _filename == None:
+            MCS.__Log.debug("no filename provided, take defaults.")
+        elif not os.path.isfile(_filename):
+            print(" MCS: file ", _filename, " does not exist.", \
+                  " Raising exception")
+            raise NonExistantFile('CSV file' + \
+                                  _filename + \
+                                  ' does not exist; execution termimated.')
+
+        #.. Set defaults:
+        self._filename  = _filename
+        self._IssueDate = date.today()
+        self._MCSParams = None
+
+        #.. Parse control file:
+        if _filename != None:
+            self._cntrlParams = self.getMCSs(_filename)
+            MCS.__Log.debug("parameters:\n%s", self._cntrlParams)
+            self._IonE, self._IonEUnit, \
+            self._z, \
+            self._X0, self._X0Unit, \
+            self._rho, self._rhoUnit, \
+            self._Mp, self._MpUnit, \
+            self._Eta1, self._Eta1Unit, \
+            self._Alpha1, self._Alpha1Unit = self.parseMCS()
 
     def __repr__(self):
         return " MCS(<filename>)"
@@ -119,37 +130,22 @@ class MCS(object):
 #--------  I/o methods:
     @classmethod
     def getMCSs(cls, _filename):
-        MCSParams = pnds.read_csv(_filename)
+        MCSParams = BP.getParameters(_filename)
         return MCSParams
 
     
-#--------  Extracting data from the WorkPackage pandas dataframe:
-    @classmethod
-    def parseMCS(cls):
-        Rows = cls._cntrlParams.index
-        for i in Rows:
-            if cls.__Debug:
-                print(" MCS: parseMCS: processing flag: ", \
-                      cls._cntrlParams.iat[i,0])
-            if cls._cntrlParams.iat[i,0] == "Ionisation energy":
-                IonE     = cls._cntrlParams.iat[i,1]
-                IonEUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0] == "Charge number":
-                z = cls._cntrlParams.iat[i,1]
-            elif cls._cntrlParams.iat[i,0].find("Radiation length") >= 0:
-                X0     = cls._cntrlParams.iat[i,1]
-                X0Unit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("Density") >= 0:
-                rho     = cls._cntrlParams.iat[i,1]
-                rhoUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("Projectile mass") >= 0:
-                Mp     = cls._cntrlParams.iat[i,1]
-                MpUnit = cls._cntrlParams.iat[i,2]
-            else:
-                print("    ----> MCS.parseMCS: ", \
-                      " unprocessed control field:", \
-                      cls._cntrlParams.iat[i,0], cls._cntrlParams.iat[i,1], \
-                      cls._cntrlParams.iat[i,2])
+#--------  Extracting data from the parameter record:
+    def parseMCS(self):
+        P = self._cntrlParams
+        if None in (P.IonE, P.z, P.X0, P.rho, P.Mp):
+            print("    ----> MCS.parseMCS: parameter missing from", \
+                  P.filename, " raising exception")
+            raise BadParameters('Parameter missing from ' + P.filename)
+        IonE,  IonEUnit = P.IonE, P.IonEUnit
+        z               = P.z
+        X0,    X0Unit   = P.X0,   P.X0Unit
+        rho,   rhoUnit  = P.rho,  P.rhoUnit
+        Mp,    MpUnit   = P.Mp,   P.MpUnit
 
         #.. Derived constants:
         Eta1       = IonE * z / (2. * mth.sqrt(X0/rho))
@@ -164,14 +160,11 @@ class MCS(object):
 
 #--------  Get/set methods:
     def setIssueDate(self, _IssueDate):
-        if MCS.__Debug:
-            print(" setIssueDate:", _IssueDate)
+        MCS.__Log.debug("setIssueDate: %s", _IssueDate)
         if isinstance(_IssueDate, dt.date):
             self._IssueDate = _IssueDate
         else:
-            if MCS.__Debug:
-                print("     ----> Issue date ", \
-                      " raising exception")
+            MCS.__Log.debug("Issue date invalid, raising exception.")
             raise BadIssueDate()
         
     def getIssueDate(self):
@@ -229,29 +222,43 @@ class MCS(object):
 
 #--------  Processing methods:
     def getTheta0(self, x=None, T=None):
-        if MCS.__Debug:
-            print(" getTheta0; x and T:", x, T)
-        if x==None or T==None:
-            if MCS.__Debug:
-                print("     ----> x or T invalid, raising exception.")
+        Debug = MCS.__Log.isEnabledFor(logging.DEBUG)
+        if Debug:
+            MCS.__Log.debug("getTheta0; x and T: %s %s", x, T)
+        if x is None or T is None:
+            MCS.__Log.debug("x or T invalid, raising exception.")
             raise BadParameters()
-        if not (isinstance(x, float) or isinstance(T, float)):
-            if MCS.__Debug:
-                print("     ----> x or T invalid, raising exception.")
+        if not (Utilities.isReal(x) and Utilities.isReal(T)):
+            MCS.__Log.debug("x or T invalid, raising exception.")
             raise BadParameters()
-        sqrtx = mth.sqrt(x)
-        Theta0 = self.getEta1() * (sqrtx / T) * \
-                 (1. + 0.038*mth.log(self.getAlpha1()*x/T))
-        if MCS.__Debug:
-            print("     ----> Theta0:", Theta0)
+        if np.ndim(x) == 0 and np.ndim(T) == 0:
+            sqrtx = mth.sqrt(x)
+            Theta0 = self.getEta1() * (sqrtx / T) * \
+                     (1. + 0.038*mth.log(self.getAlpha1()*x/T))
+        else:
+            #.. Arrays, broadcast against each other:
+            x = np.asarray(x, dtype=float)
+            T = np.asarray(T, dtype=float)
+            Jit = Kernels.get()
+            if Jit is not None:
+                Theta0 = Jit.theta0(x, T, self.getEta1(), self.getAlpha1())
+            else:
+                Theta0 = self.getEta1() * (np.sqrt(x) / T) * \
+                         (1. + 0.038*np.log(self.getAlpha1()*x/T))
+        if Debug:
+            MCS.__Log.debug("Theta0: %s", Theta0)
         return Theta0
 
     def getYplane(self, x=None, T=None):
-        if MCS.__Debug:
-            print(" getYPlane; x and T:", x, T)
-        Yplane = (x / mth.sqrt(3)) * self.getTheta0(x, T)
-        if MCS.__Debug:
-            print("     ----> Yplane:", Yplane)
+        Debug = MCS.__Log.isEnabledFor(logging.DEBUG)
+        if Debug:
+            MCS.__Log.debug("getYPlane; x and T: %s %s", x, T)
+        Theta0 = self.getTheta0(x, T)
+        if isinstance(Theta0, np.ndarray):
+            x = np.asarray(x, dtype=float)
+        Yplane = (x / mth.sqrt(3)) * Theta0
+        if Debug:
+            MCS.__Log.debug("Yplane: %s", Yplane)
         return Yplane
 
 
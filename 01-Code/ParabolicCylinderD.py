@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class ParabolicCylinderD:
+=========================
+
+  Tabulated parabolic-cylinder function D_v(x), and its derivative, at
+  fixed order v.  D_v and D_v' are evaluated exactly (scipy.special.pbdv)
+  once on a uniform grid in x; between grid points both are cubic-Hermite
+  interpolated, using
+      D_v''(x) = (x^2/4 - v - 1/2) D_v(x)
+  for the slope of D_v'.  Outside the grid pbdv is called directly.
+
+  The default grid, x in [-10, 5], covers the argument -xi of the Bortfeldt
+  peak term over its r0-10*sigma .. r0+5*sigma window.
+
+  The module function pbdv(v, x) is a drop-in replacement for
+  scipy.special.pbdv(v, x); it keeps one table per order v, at most
+  MaxTables of them, in a least-recently-used cache.  getTable(v) returns
+  the cached instance, e.g. for the compiled kernels of Kernels.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "ParabolicCylinderD"; debug output is enabled at run time with
+               logging.getLogger("ParabolicCylinderD").setLevel(logging.DEBUG)
+  MaxTables  : Maximum number of tables held by pbdv
+
+  Instance attributes:
+  --------------------
+   _v          = Order
+   _xmin, _xmax= Range of grid
+   _h          = Grid spacing
+   _D, _Dd, _Ddd = D_v, D_v' and D_v'' at the grid points
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Tabulates D_v and D_v' on the grid.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+      getTables: (xmin, h, D_v, D_v') at the grid points
+
+  Processing methods:
+      getD    : (D_v(x), D_v'(x)) for x a float or numpy array
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: scipy imported only when first needed
+ 1.2: 18Oct26: Debug output through the logging module
+ 1.3: 18Oct26: Tables exposed for the compiled kernels
+
+@author: kennethlong
+"""
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+class ParabolicCylinderD(object):
+    __Log      = logging.getLogger("ParabolicCylinderD")
+    MaxTables  = 16
+
+#--------  "Built-in methods":
+    def __init__(self, _v, _xmin=-10., _xmax=5., _nx=4001):
+
+        if not _xmin < _xmax or _nx < 2:
+            print(" ParabolicCylinderD: bad grid:", _xmin, _xmax, _nx, \
+                  " raising exception")
+            raise BadParameters()
+
+        self._v    = float(_v)
+        self._xmin = float(_xmin)
+        self._xmax = float(_xmax)
+        self._h    = (self._xmax - self._xmin) / (_nx - 1)
+
+        x = np.linspace(self._xmin, self._xmax, _nx)
+        self._D, self._Dd = _pbdvExact(self._v, x)
+        self._Ddd = (x**2/4. - self._v - 0.5) * self._D
+        ParabolicCylinderD.__Log.debug("order %g, %d points", self._v, _nx)
+
+    def __repr__(self):
+        return " ParabolicCylinderD(<v>, <xmin>, <xmax>, <nx>)"
+
+    def __str__(self):
+        print(" ParabolicCylinderD settings:")
+        print("     Order:", self.getOrder())
+        print("     Grid:", len(self._D), "points,", self._xmin, "to", \
+              self._xmax)
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getOrder(self):
+        return self._v
+
+    def getRange(self):
+        return self._xmin, self._xmax
+
+    def getTables(self):
+        return self._xmin, self._h, self._D, self._Dd
+
+
+#--------  Processing methods:
+    def getD(self, x):
+        x   = np.asarray(x, dtype=float)
+        D   = np.empty(x.shape)
+        Dd  = np.empty(x.shape)
+
+        In  = (x >= self._xmin) & (x <= self._xmax)
+        if not np.all(In):
+            D[~In], Dd[~In] = _pbdvExact(self._v, x[~In])
+
+        t = (x[In] - self._xmin) / self._h
+        i = np.minimum(t.astype(np.intp), len(self._D)-2)
+        s = t - i
+        s2 = s*s
+        s3 = s2*s
+        h00 = 2.*s3 - 3.*s2 + 1.
+        h10 = s3 - 2.*s2 + s
+        h01 = 1. - h00
+        h11 = s3 - s2
+        h   = self._h
+        D[In]  = h00*self._D[i]  + h01*self._D[i+1] \
+                 + h*(h10*self._Dd[i]  + h11*self._Dd[i+1])
+        Dd[In] = h00*self._Dd[i] + h01*self._Dd[i+1] \
+                 + h*(h10*self._Ddd[i] + h11*self._Ddd[i+1])
+
+        if x.ndim == 0:
+            return D[()], Dd[()]
+        return D, Dd
+
+
+#--------  scipy.special is imported on first use, not with the module:
+def _pbdvExact(v, x):
+    from scipy import special
+    return special.pbdv(v, x)
+
+
+#--------  Cached evaluation, signature as scipy.special.pbdv:
+_Tables = OrderedDict()
+
+def pbdv(v, x):
+    return getTable(v).getD(x)
+
+def getTable(v):
+    v = float(v)
+    Table = _Tables.get(v)
+    if Table is None:
+        Table = ParabolicCylinderD(v)
+        _Tables[v] = Table
+        if len(_Tables) > ParabolicCylinderD.MaxTables:
+            _Tables.popitem(last=False)
+    else:
+        _Tables.move_to_end(v)
+    return Table
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
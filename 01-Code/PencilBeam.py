@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class PencilBeam:
+=================
+
+  Batched Monte Carlo transport of a proton pencil beam through water (or
+  the material of the MCS and dEdx parameter files).  All protons of a
+  batch are held in numpy arrays and stepped together; protons are dropped
+  from the arrays as they stop.  Each step of path length ds:
+
+    ds     = min(_dx, 0.2*T/(dE/dx)), so that no more than ~20% of the
+             kinetic energy is lost in one step near the end of range;
+    dE     = mean loss, dEdx.getdEdx at the mid-step energy times ds, plus
+             Gaussian Bohr straggling (dEdx.getStraggling), limited to
+             [0, T];
+    angles = Gaussian in x and y.  The variance added is the increase in
+             MCS.getTheta0(s, T)^2, at the mid-step energy, as the path
+             length s travelled grows to s+ds, so that at fixed energy the
+             Highland width of the whole path is recovered whatever the
+             step size.  The lateral displacement in the step is
+             correlated with the angle as in the PDG review
+             (y = z1*ds*theta/sqrt(12) + z2*ds*theta/2);
+    nuclear= with probability _beta*ds the proton is removed by a
+             nonelastic interaction; a fraction _gamma of its kinetic
+             energy is deposited locally (the Bortfeldt model's beta and
+             gamma), the rest is carried off.
+
+  A proton below _Tcut deposits its remaining energy where it is and
+  stops.  Energy is deposited at the mid-point of each step into a uniform
+  (x, y, z) grid, with np.bincount; energy deposited outside the grid is
+  counted in 'Outside'.
+
+  A run of nProtons is split into _nStreams streams, each seeded by a child
+  of np.random.SeedSequence(_Seed).  Streams are run serially or on
+  _nWorkers processes and their results summed in stream order, so the
+  result depends on _Seed and _nStreams but not on _nWorkers.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "PencilBeam"; debug output is enabled at run time
+               with logging.getLogger("PencilBeam").setLevel(logging.DEBUG)
+  MaxSteps   : Safety limit on the number of steps
+  MeVtoJ     : Joules per MeV
+
+  Instance attributes:
+  --------------------
+   _iMCS       = MCS instance providing the MCS parameters
+   _idEdx      = dEdx instance providing the energy-loss parameters
+   _Grid       = ((xmin, xmax, nx), (ymin, ymax, ny), (zmin, zmax, nz)),
+                 cm; the dose grid
+   _dx         = Maximum step length (cm)
+   _Tcut       = Kinetic energy below which a proton is stopped (MeV)
+   _beta       = Nonelastic interaction probability per cm
+   _gamma      = Fraction of the energy of a nonelastic interaction
+                 deposited locally
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Checks and stores settings.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+      getEdges      : Bin edges (x, y, z) of the grid
+
+  Processing methods:
+      run           : Transport nProtons protons of kinetic energy T0 (MeV)
+                      entering at z = 0 with Gaussian spot width _Spot
+                      (cm).  Returns a dict:
+                        Edep    : (nx, ny, nz) energy deposited (MeV)
+                        Range   : depth at which each proton stopped (cm);
+                                  NaN if removed by a nuclear interaction
+                        Outside : energy deposited outside the grid (MeV)
+                        Nuclear : energy carried off by nuclear
+                                  interactions (MeV)
+                        nProtons: number of protons
+      runStream     : Transport one stream, given its SeedSequence
+      getDepthDose  : Energy deposited per cm per proton (MeV/cm) in each
+                      z bin; the units of Bortfeldt.bragg_vec with phi0=1
+      getLateral    : Energy deposited per cm per proton in x (summed over
+                      y) in the z bin containing depth z
+      getDose       : Dose per proton (Gy) in each voxel
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+
+@author: kennethlong
+"""
+
+import logging
+import math as mth
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+class PencilBeam(object):
+    __Log      = logging.getLogger("PencilBeam")
+    MaxSteps   = 100000
+    MeVtoJ     = 1.602176634E-13
+
+#--------  "Built-in methods":
+    def __init__(self, _iMCS=None, _idEdx=None, \
+                 _Grid=((-3., 3., 60), (-3., 3., 60), (0., 35., 350)), \
+                 _dx=0.1, _Tcut=1., _beta=0.012, _gamma=0.6):
+
+        if _iMCS == None or _idEdx == None:
+            print(" PencilBeam: MCS and dEdx instances required,", \
+                  " raising exception")
+            raise BadParameters('PencilBeam needs MCS and dEdx instances.')
+        if len(_Grid) != 3 or \
+           any(not Lo < Hi or n < 1 for Lo, Hi, n in _Grid) or \
+           _dx <= 0. or _Tcut <= 0. or _beta < 0. or not 0. <= _gamma <= 1.:
+            print(" PencilBeam: bad settings:", _Grid, _dx, _Tcut, _beta, \
+                  _gamma, " raising exception")
+            raise BadParameters()
+
+        self._iMCS  = _iMCS
+        self._idEdx = _idEdx
+        self._Grid  = tuple((float(Lo), float(Hi), int(n)) \
+                            for Lo, Hi, n in _Grid)
+        self._dx    = float(_dx)
+        self._Tcut  = float(_Tcut)
+        self._beta  = float(_beta)
+        self._gamma = float(_gamma)
+
+    def __repr__(self):
+        return " PencilBeam(<MCS>, <dEdx>, <Grid>, <dx>, <Tcut>, <beta>, " \
+               "<gamma>)"
+
+    def __str__(self):
+        print(" PencilBeam settings:")
+        print("      MCS instance:", repr(self.getMCS()))
+        print("     dEdx instance:", repr(self.getdEdx()))
+        print("     Grid (cm):", self.getGrid())
+        print("     Maximum step:", self._dx, "cm; cut:", self._Tcut, "MeV")
+        print("     Nuclear beta, gamma:", self._beta, self._gamma)
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getMCS(self):
+        return self._iMCS
+
+    def getdEdx(self):
+        return self._idEdx
+
+    def getGrid(self):
+        return self._Grid
+
+    def getEdges(self):
+        return tuple(np.linspace(Lo, Hi, n+1) for Lo, Hi, n in self._Grid)
+
+
+#--------  Processing methods:
+    def run(self, T0, nProtons, _Seed=None, _Spot=0., _nStreams=8, \
+            _nWorkers=1):
+        nStreams = max(1, min(int(_nStreams), int(nProtons)))
+        Seeds    = np.random.SeedSequence(_Seed).spawn(nStreams)
+        Sizes    = np.diff(np.linspace(0, int(nProtons), nStreams+1) \
+                           .astype(np.int64))
+        Tasks    = [(self, T0, int(n), Seed, _Spot) \
+                    for n, Seed in zip(Sizes, Seeds)]
+
+        nWorkers = max(1, min(int(_nWorkers), nStreams))
+        if nWorkers == 1:
+            Results = list(map(_runStream, Tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=nWorkers) as Pool:
+                Results = list(Pool.map(_runStream, Tasks))
+
+        Result = Results[0]
+        for Res in Results[1:]:
+            Result['Edep']    += Res['Edep']
+            Result['Outside'] += Res['Outside']
+            Result['Nuclear'] += Res['Nuclear']
+            Result['nProtons'] += Res['nProtons']
+        Result['Range'] = np.concatenate([Res['Range'] for Res in Results])
+        PencilBeam.__Log.debug("run: %d protons in %d streams on %d " \
+                               "workers", nProtons, nStreams, nWorkers)
+        return Result
+
+    def runStream(self, T0, nProtons, Seed, _Spot=0.):
+        Rng    = np.random.default_rng(Seed)
+        Lo     = np.array([Grid[0] for Grid in self._Grid])
+        Width  = np.array([(Hi - Lo)/n for Lo, Hi, n in self._Grid])
+        Shape  = tuple(Grid[2] for Grid in self._Grid)
+        nVox   = int(np.prod(Shape))
+
+        Edep    = np.zeros(nVox)
+        Range   = np.full(nProtons, np.nan)
+        Outside = 0.
+        Nuclear = 0.
+        Voxels  = []
+        Weights = []
+        nBuffer = 0
+
+        def deposit(x, y, z, E):
+            #.. Buffer (voxel, energy) pairs; bincount once nVox are held.
+            nonlocal Outside, nBuffer
+            i = np.floor((x - Lo[0]) / Width[0]).astype(np.int64)
+            j = np.floor((y - Lo[1]) / Width[1]).astype(np.int64)
+            k = np.floor((z - Lo[2]) / Width[2]).astype(np.int64)
+            In = (i >= 0) & (i < Shape[0]) & (j >= 0) & (j < Shape[1]) & \
+                 (k >= 0) & (k < Shape[2])
+            Outside += np.sum(E[~In])
+            Voxels.append((i[In]*Shape[1] + j[In])*Shape[2] + k[In])
+            Weights.append(E[In])
+            nBuffer += np.count_nonzero(In)
+            if nBuffer >= nVox:
+                flush()
+
+        def flush():
+            nonlocal nBuffer
+            if nBuffer > 0:
+                Edep[:] += np.bincount(np.concatenate(Voxels), \
+                                       weights=np.concatenate(Weights), \
+                                       minlength=nVox)
+            Voxels.clear()
+            Weights.clear()
+            nBuffer = 0
+
+        Id = np.arange(nProtons)
+        T  = np.full(nProtons, float(T0))
+        x  = _Spot * Rng.standard_normal(nProtons)
+        y  = _Spot * Rng.standard_normal(nProtons)
+        z  = np.zeros(nProtons)
+        tx = np.zeros(nProtons)
+        ty = np.zeros(nProtons)
+        s  = np.zeros(nProtons)
+        nSteps = 0
+        while len(T) > 0:
+            if nSteps >= PencilBeam.MaxSteps:
+                print("    ----> PencilBeam.runStream: step limit reached")
+                break
+            n = len(T)
+
+            #.. Step length and energy loss:
+            S1   = self._idEdx.getdEdx(T)
+            ds   = np.minimum(self._dx, 0.2*T/S1)
+            Tmid = T - 0.5*S1*ds
+            dE   = self._idEdx.getdEdx(Tmid) * ds + \
+                   np.sqrt(self._idEdx.getStraggling(Tmid, ds)) * \
+                   Rng.standard_normal(n)
+            dE   = np.clip(dE, 0., T)
+
+            #.. Multiple scattering:
+            Var    = self._iMCS.getTheta0(s + ds, Tmid)**2
+            Moved  = s > 0.
+            Var[Moved] -= self._iMCS.getTheta0(s[Moved], Tmid[Moved])**2
+            Theta  = np.sqrt(np.maximum(Var, 0.))
+            z1, z2, z3, z4 = Rng.standard_normal((4, n))
+            Cos    = 1. / np.sqrt(1. + tx**2 + ty**2)
+            xNew   = x + ds*Cos*(tx + Theta*(z1/mth.sqrt(12.) + z2/2.))
+            yNew   = y + ds*Cos*(ty + Theta*(z3/mth.sqrt(12.) + z4/2.))
+            zNew   = z + ds*Cos
+            tx    += Theta*z2
+            ty    += Theta*z4
+            s     += ds
+
+            deposit(0.5*(x + xNew), 0.5*(y + yNew), 0.5*(z + zNew), dE)
+            x, y, z = xNew, yNew, zNew
+            T = T - dE
+
+            #.. Nonelastic interactions and stopping protons:
+            Lost = Rng.random(n) < self._beta*ds
+            if np.any(Lost):
+                deposit(x[Lost], y[Lost], z[Lost], self._gamma*T[Lost])
+                Nuclear += (1. - self._gamma) * np.sum(T[Lost])
+            Stop = ~Lost & (T < self._Tcut)
+            if np.any(Stop):
+                deposit(x[Stop], y[Stop], z[Stop], T[Stop])
+                Range[Id[Stop]] = z[Stop]
+            Keep = ~(Lost | Stop)
+            Id, T, x, y, z, tx, ty, s = \
+                Id[Keep], T[Keep], x[Keep], y[Keep], z[Keep], \
+                tx[Keep], ty[Keep], s[Keep]
+            nSteps += 1
+
+        flush()
+        PencilBeam.__Log.debug("runStream: %d protons, %d steps", \
+                               nProtons, nSteps)
+        return {'Edep': Edep.reshape(Shape), 'Range': Range, \
+                'Outside': Outside, 'Nuclear': Nuclear, \
+                'nProtons': nProtons}
+
+    def getDepthDose(self, Result):
+        zLo, zHi, nz = self._Grid[2]
+        return Result['Edep'].sum(axis=(0, 1)) / \
+               (Result['nProtons'] * (zHi - zLo)/nz)
+
+    def getLateral(self, Result, z):
+        xLo, xHi, nx = self._Grid[0]
+        zLo, zHi, nz = self._Grid[2]
+        k = int(np.floor((z - zLo) / ((zHi - zLo)/nz)))
+        if not 0 <= k < nz:
+            raise BadParameters('Depth ' + str(z) + ' outside grid')
+        return Result['Edep'][:, :, k].sum(axis=1) / \
+               (Result['nProtons'] * (xHi - xLo)/nx)
+
+    def getDose(self, Result):
+        Volume = np.prod([(Hi - Lo)/n for Lo, Hi, n in self._Grid])
+        Mass   = self._idEdx.getrho() * Volume * 1.E-3          #.. kg
+        return Result['Edep'] * PencilBeam.MeVtoJ / \
+               (Mass * Result['nProtons'])
+
+
+#--------  Worker-process function:
+def _runStream(Task):
+    iPencilBeam, T0, nProtons, Seed, Spot = Task
+    return iPencilBeam.runStream(T0, nProtons, Seed, Spot)
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class RangeEnergy:
+==================
+
+  Range-energy relation for protons.  Two modes:
+
+    CSDA          : If a dEdx instance is given, the CSDA range
+                      R(T) = int_0^T dT' / (dE/dx)(T')
+                    is tabulated once, on a log-spaced grid of T, by
+                    integrating dEdx.getdEdx.  Below the lowest grid
+                    energy, where the dE/dx parameterisation is not
+                    usable, dE/dx is taken to vary as a power of T
+                    matched at the grid edge.
+    Bragg-Kleeman : Otherwise the Bortfeldt fit R = alpha T^p is used, with
+                    alpha and p from a Bortfeldt instance.
+
+  Lookups in either direction (T -> R and R -> T) accept numpy arrays.  In
+  CSDA mode they are linear interpolations in (log T, log R) by binary
+  search of the table; outside the table the end segments are extended.
+  In Bragg-Kleeman mode they are closed-form.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "RangeEnergy"; debug output is enabled at run time with
+               logging.getLogger("RangeEnergy").setLevel(logging.DEBUG)
+
+  Instance attributes:
+  --------------------
+   _Mode       = "CSDA" or "Bragg-Kleeman"
+   _alpha, _p  = Bragg-Kleeman parameters (Bragg-Kleeman mode)
+   _LogT, _LogR= Tabulated log T and log R (CSDA mode)
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Builds the range table, or stores alpha and p.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+
+  Processing methods:
+      getRange : Range (cm) at kinetic energy T (MeV)
+      getEnergy: Kinetic energy (MeV) for residual range R (cm)
+      getTable : (T, R) numpy arrays of the table (CSDA mode)
+
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Debug output through the logging module
+ 1.2: 18Oct26: Scalar lookups outside the table extended, not rejected
+
+@author: kennethlong
+"""
+
+import logging
+import numpy as np
+
+class RangeEnergy(object):
+    __Log      = logging.getLogger("RangeEnergy")
+
+#--------  "Built-in methods":
+    def __init__(self, _idEdx=None, _iBortfeldt=None, \
+                 _Tmin=1., _Tmax=1000., _nT=2001):
+
+        if _idEdx is not None:
+            self._Mode = "CSDA"
+            self._LogT, self._LogR = self.tabulate(_idEdx, _Tmin, _Tmax, _nT)
+        elif _iBortfeldt is not None:
+            self._Mode  = "Bragg-Kleeman"
+            self._alpha = _iBortfeldt.getalpha()
+            self._p     = _iBortfeldt.getRangeEnergy()
+        else:
+            print(" RangeEnergy: dEdx or Bortfeldt instance required,", \
+                  " raising exception")
+            raise BadParameters('RangeEnergy needs dEdx or Bortfeldt.')
+        RangeEnergy.__Log.debug("mode: %s", self._Mode)
+
+    def __repr__(self):
+        return " RangeEnergy(<dEdx>, <Bortfeldt>)"
+
+    def __str__(self):
+        print(" RangeEnergy settings:")
+        print("     Mode:", self.getMode())
+        if self._Mode == "CSDA":
+            T, R = self.getTable()
+            print("     Table:", len(T), "points,", T[0], "to", T[-1], \
+                  "MeV;", R[0], "to", R[-1], "cm")
+        else:
+            print("     alpha, p:", self._alpha, self._p)
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getMode(self):
+        return self._Mode
+
+    def getTable(self):
+        if self._Mode != "CSDA":
+            return None
+        return np.exp(self._LogT), np.exp(self._LogR)
+
+
+#--------  Processing methods:
+    @staticmethod
+    def tabulate(idEdx, Tmin, Tmax, nT):
+        if not (0. < Tmin < Tmax) or nT < 3:
+            raise BadParameters()
+        LogT = np.linspace(np.log(Tmin), np.log(Tmax), nT)
+        T    = np.exp(LogT)
+        S    = idEdx.getdEdx(T)
+        if not np.all(np.isfinite(S) & (S > 0.)):
+            raise BadParameters('dE/dx not positive over table range.')
+
+        #.. dT/S = (T/S) dlogT; trapezoid rule in log T:
+        f = T / S
+        R = np.concatenate(([0.], np.cumsum(0.5*(f[1:]+f[:-1]) * \
+                                            np.diff(LogT))))
+
+        #.. Range below Tmin, for S ~ T^k with k from the grid edge:
+        k  = (np.log(S[1]) - np.log(S[0])) / (LogT[1] - LogT[0])
+        R += T[0] / (S[0] * (1. - k))
+        return LogT, np.log(R)
+
+    def getRange(self, T):
+        T = np.asarray(T, dtype=float)
+        if self._Mode == "Bragg-Kleeman":
+            return self._alpha * T**self._p
+        return np.exp(_interpLogLog(np.log(T), self._LogT, self._LogR))
+
+    def getEnergy(self, R):
+        R = np.asarray(R, dtype=float)
+        if self._Mode == "Bragg-Kleeman":
+            return (R / self._alpha)**(1./self._p)
+        return np.exp(_interpLogLog(np.log(R), self._LogR, self._LogT))
+
+
+#--------  Interpolation, straight-line extension beyond the table:
+def _interpLogLog(x, xp, fp):
+    x  = np.asarray(x)
+    x1 = np.atleast_1d(x)
+    y  = np.atleast_1d(np.interp(x1, xp, fp)).astype(float)
+    Lo = x1 < xp[0]
+    Hi = x1 > xp[-1]
+    if np.any(Lo):
+        y[Lo] = fp[0] + (x1[Lo]-xp[0]) * (fp[1]-fp[0])/(xp[1]-xp[0])
+    if np.any(Hi):
+        y[Hi] = fp[-1] + (x1[Hi]-xp[-1]) * (fp[-1]-fp[-2])/(xp[-1]-xp[-2])
+    return y[0] if x.ndim == 0 else y.reshape(x.shape)
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class SOBP:
+===========
+
+  Spread-out Bragg peak: the beam energies and weights (primary fluence per
+  energy layer) for which the summed Bortfeldt curves give a flat dose
+  _Dose over the target depths _zMin to _zMax.
+
+  The layers are placed with their ranges r0 evenly spaced from _zMin to
+  _zMax + 2 sigma, since a Bortfeldt peak lies about one sigma short of
+  r0 (sigma the range straggling at _zMax); by default the spacing is
+  sigma.  The dose-influence matrix A (target depths x layers) is
+  interpolated from a BraggLibrary, so no parabolic-cylinder function is
+  evaluated, and the weights w minimise |A w - _Dose|^2 subject to w >= 0.
+  Two solvers are provided:
+    "nnls": scipy.optimize.nnls (active set; exact)
+    "pg"  : accelerated projected gradient on the normal equations, with
+            adaptive restart.  Each iteration costs one (nLayers x nLayers)
+            matrix-vector product, so it scales to many hundreds of layers
+            and many depths.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "SOBP"; debug output is enabled at run time with
+               logging.getLogger("SOBP").setLevel(logging.DEBUG)
+  Methods    : Solvers available
+
+  Instance attributes:
+  --------------------
+   _iLibrary   = BraggLibrary instance
+   _zMin, _zMax= Target depth interval (cm)
+   _Dose       = Prescribed dose in the target, in the units of the library
+                 (MeV/cm per unit primary fluence)
+   _Method     = Solver, one of SOBP.Methods
+   _rMax       = Range of the deepest layer (cm)
+   _Energies   = Layer energies (MeV)
+   _z          = Target depths at which the dose is optimised (cm)
+   _Weights    = Layer weights; None until optimise has been called
+   _nIter      = Iterations used by the last projected-gradient solve
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Checks the target and places the energy layers.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+      getMatrix    : Dose-influence matrix, target depths x layers
+
+  Processing methods:
+      optimise     : Solve for the layer weights; returns them.  The
+                     projected gradient stops when a step changes the
+                     weights by less than _Tolerance (relative), or after
+                     _MaxIter iterations; layers with no dose at the target
+                     depths get zero weight, and BadParameters is raised if
+                     no layer has any
+      getSOBPDose  : Dose of the weighted layers at depths z
+      getFlatness  : (max - min) / mean of the dose over the target depths
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Projected gradient skips layers with no dose in the target
+
+@author: kennethlong
+"""
+
+import logging
+import math  as mth
+import numpy as np
+
+import BraggLibrary as BraggLibrary
+
+class SOBP(object):
+    __Log      = logging.getLogger("SOBP")
+    Methods    = ('nnls', 'pg')
+
+#--------  "Built-in methods":
+    def __init__(self, _iLibrary=None, _zMin=None, _zMax=None, \
+                 _nLayers=None, _Dose=1., _dz=0.05, _Method='nnls'):
+
+        if not isinstance(_iLibrary, BraggLibrary.BraggLibrary):
+            print(" SOBP: BraggLibrary instance required,", \
+                  " raising exception")
+            raise BadParameters('SOBP needs a BraggLibrary instance.')
+        Energies = _iLibrary.getEnergies()
+        rMin, rMax = _iLibrary.getRange([Energies[0], Energies[-1]])
+        if _zMin == None or _zMax == None or \
+           not rMin <= _zMin < _zMax <= rMax:
+            print(" SOBP: target", _zMin, "to", _zMax, \
+                  "cm outside library ranges", rMin, "to", rMax, \
+                  " raising exception")
+            raise BadParameters('SOBP target outside library.')
+        if _Method not in SOBP.Methods or _Dose <= 0. or _dz <= 0.:
+            print(" SOBP: bad method, dose or dz:", _Method, _Dose, _dz, \
+                  " raising exception")
+            raise BadParameters()
+
+        self._iLibrary = _iLibrary
+        self._zMin     = float(_zMin)
+        self._zMax     = float(_zMax)
+        self._Dose     = float(_Dose)
+        self._Method   = _Method
+        self._Weights  = None
+        self._nIter    = 0
+
+        Meta        = _iLibrary.getMeta()
+        Sigma       = _iLibrary.getSigma((self._zMax / Meta['alpha'])** \
+                                         (1./Meta['p']))
+        self._rMax  = min(self._zMax + 2.*Sigma, rMax)
+        if _nLayers == None:
+            _nLayers = mth.ceil((self._rMax - self._zMin) / Sigma) + 1
+        self.setnLayers(_nLayers)
+        nz       = max(2, mth.ceil((self._zMax - self._zMin) / _dz) + 1)
+        self._z  = np.linspace(self._zMin, self._zMax, nz)
+
+    def __repr__(self):
+        return " SOBP(<iLibrary>, <zMin>, <zMax>, <nLayers>, <Dose>, " \
+               "<dz>, <Method>)"
+
+    def __str__(self):
+        print(" SOBP settings:")
+        print("     Target:", self._zMin, "to", self._zMax, "cm, dose", \
+              self._Dose, ",", len(self._z), "depths")
+        print("     Layers:", self.getnLayers(), ", energies", \
+              self._Energies[0], "to", self._Energies[-1], "MeV")
+        print("     Solver:", self._Method)
+        if self._Weights is not None:
+            print("     Flatness:", self.getFlatness())
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getEnergies(self):
+        return self._Energies
+
+    def getnLayers(self):
+        return len(self._Energies)
+
+    def setnLayers(self, _nLayers):
+        if _nLayers < 1:
+            raise BadParameters('SOBP needs at least one layer.')
+        Meta     = self._iLibrary.getMeta()
+        Ranges   = np.linspace(self._zMin, self._rMax, int(_nLayers))
+        Energies = (Ranges / Meta['alpha'])**(1./Meta['p'])
+        #.. Keep the end layers inside the library against rounding:
+        self._Energies = np.clip(Energies, Meta['Emin'], Meta['Emax'])
+        self._Weights  = None
+
+    def getDepths(self):
+        return self._z
+
+    def getDose(self):
+        return self._Dose
+
+    def getMethod(self):
+        return self._Method
+
+    def setMethod(self, _Method):
+        if _Method not in SOBP.Methods:
+            raise BadParameters('Unknown SOBP method ' + str(_Method))
+        self._Method = _Method
+
+    def getWeights(self):
+        return self._Weights
+
+    def getnIter(self):
+        return self._nIter
+
+    def getMatrix(self):
+        return self._iLibrary.getMatrix(self._Energies, self._z)
+
+
+#--------  Processing methods:
+    def optimise(self, _Tolerance=1.E-6, _MaxIter=20000):
+        A = self.getMatrix()
+        b = np.full(len(self._z), self._Dose)
+        if self._Method == 'nnls':
+            from scipy import optimize
+            self._Weights = optimize.nnls(A, b, maxiter=_MaxIter)[0]
+            self._nIter = 0
+        else:
+            self._Weights, self._nIter = _projectedGradient(A, b, \
+                                             _Tolerance, _MaxIter)
+        SOBP.__Log.debug("optimise: %s, %d layers, %d depths, %d " \
+                         "iterations", self._Method, A.shape[1], A.shape[0], \
+                         self._nIter)
+        return self._Weights
+
+    def getSOBPDose(self, z):
+        if self._Weights is None:
+            raise BadParameters('SOBP weights not optimised.')
+        return self._iLibrary.getSOBP(self._Energies, self._Weights, z)
+
+    def getFlatness(self):
+        Dose = self.getSOBPDose(self._z)
+        return (Dose.max() - Dose.min()) / Dose.mean()
+
+
+#--------  Non-negative least squares by accelerated projected gradient:
+def _projectedGradient(A, b, Tolerance, MaxIter):
+    #.. Layers that deposit no dose at the target depths keep zero weight:
+    Norm = np.linalg.norm(A, axis=0)
+    Use  = Norm > 0.
+    if not np.any(Use):
+        print(" SOBP: no layer deposits dose at the target depths,", \
+              " raising exception")
+        raise BadParameters('SOBP dose-influence matrix is zero.')
+    #.. Columns scaled to unit norm (deep layers deposit less per proton),
+    #   which keeps w >= 0 and improves the conditioning:
+    Scale = 1. / Norm[Use]
+    A     = A[:, Use] * Scale
+    #.. Normal equations formed once; an iteration is then O(nLayers^2):
+    AtA = A.T @ A
+    Atb = A.T @ b
+    L   = np.linalg.eigvalsh(AtA)[-1]
+
+    w     = np.full(A.shape[1], b.sum() / A.sum())
+    y     = w.copy()
+    Theta = 1.
+    for Iter in range(1, MaxIter+1):
+        wNew  = np.maximum(y - (AtA @ y - Atb) / L, 0.)
+        Step  = wNew - w
+        #.. Restart the momentum when it points uphill:
+        if np.dot(y - wNew, Step) > 0.:
+            Theta = 1.
+            y     = wNew
+        else:
+            ThetaNew = 0.5 * (1. + mth.sqrt(1. + 4.*Theta*Theta))
+            y        = wNew + ((Theta - 1.) / ThetaNew) * Step
+            Theta    = ThetaNew
+        w = wNew
+        if np.linalg.norm(Step) <= Tolerance * np.linalg.norm(w):
+            break
+    Weights      = np.zeros(len(Use))
+    Weights[Use] = w * Scale
+    return Weights, Iter
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
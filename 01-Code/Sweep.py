@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class Sweep:
+============
+
+  Runs a grid of configurations (energy, material, step size, fit bounds,
+  ...) over a process pool and keeps the results in one Parquet store,
+  indexed by a key computed from the configuration.  Configurations whose
+  key is already in the store are skipped, so an interrupted sweep is
+  resumed by running it again.
+
+  A configuration is a dict with the keys of Sweep.Defaults:
+    T0       : Initial kinetic energy (MeV)
+    Material : "water" (BraggParameters.csv), a name <m> for
+               BraggParameters-<m>.csv in 11-BraggParameters, or the path
+               of a parameter file
+    dx       : Maximum Monte Carlo step and Transport step (cm)
+    Bounds   : Fit bounds as multipliers of the starting point
+               ((lower x 5), (upper x 5)); None for Sweep.DefaultBounds
+    nProtons : Number of Monte Carlo protons
+    Seed     : Seed of the Monte Carlo run
+    zBin     : Depth bin of the Monte Carlo depth-dose curve (cm)
+
+  For each configuration runConfig computes the CSDA range (RangeEnergy),
+  the depth reached by Transport.getTrends, and a PencilBeam depth-dose
+  curve, and fits the Bortfeldt curve to it with BraggFit.  The starting
+  point is (1, 0.1, R, 0.012, 0.012*R^0.935), R the CSDA range.
+
+  The store is a directory of Parquet files, one per batch of _flushEvery
+  results, written as results arrive; pandas.read_parquet(<store>) reads
+  it as one table.  Writing Parquet needs pyarrow (or fastparquet).
+
+
+  Class attributes:
+  -----------------
+  __Log        : Logger "Sweep"; debug output is enabled at run time with
+                 logging.getLogger("Sweep").setLevel(logging.DEBUG)
+  Defaults     : Default configuration
+  DefaultBounds: Default fit bounds, as multipliers of the starting point
+  ParameterDir : Directory of the parameter files
+
+  Instance attributes:
+  --------------------
+   _Store      = Directory holding the Parquet store
+   _nWorkers   = Number of worker processes (None: os.cpu_count())
+   _flushEvery = Results per Parquet file
+   _nRun       = Configurations run (not skipped) by the last call of run
+   _Failed     = {Key: error} of the configurations that raised in the
+                 last call of run; they are not stored, so a later run
+                 retries them
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Stores settings, creating the store directory.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+
+  Processing methods:
+      getResults : pandas data frame of all results in the store, indexed
+                   by Key
+      run        : Run the configurations not yet in the store; returns the
+                   results for all the configurations given, except those
+                   that failed.  A configuration that raises is reported
+                   and the others carry on; on an interrupt the points
+                   not yet started are cancelled and the finished ones
+                   stored
+      flush      : Write result rows to a new file in the store
+
+  Module functions:
+      grid       : Configurations for the Cartesian product of axes, e.g.
+                   grid(T0=[100., 200.], Material=['water', 'PMMA'])
+      configKey  : Key of a configuration
+      canonical  : Configuration with defaults filled in and types fixed
+      parameterFile: Parameter file of a material
+      runConfig  : Run one configuration; returns a dict (one row)
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: A failing configuration no longer stops the sweep
+
+@author: kennethlong
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy  as np
+import pandas as pnds
+
+import BraggFit    as BraggFit
+import MCS         as MCS
+import PencilBeam  as PencilBeam
+import RangeEnergy as RangeEnergy
+import Transport   as Transport
+import dEdx        as dEdx
+
+class Sweep(object):
+    __Log         = logging.getLogger("Sweep")
+    Defaults      = {'T0': 200., 'Material': 'water', 'dx': 0.1, \
+                     'Bounds': None, 'nProtons': 2000, 'Seed': 0, \
+                     'zBin': 0.1}
+    DefaultBounds = ((0., 0., 0.9, 0., 0.2), (100., 10., 1.1, 10., 5.))
+    ParameterDir  = os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+                                 '..', '11-BraggParameters')
+
+#--------  "Built-in methods":
+    def __init__(self, _Store=None, _nWorkers=None, _flushEvery=16):
+
+        if _Store == None or _flushEvery < 1:
+            print(" Sweep: store directory required, flushEvery:", \
+                  _flushEvery, " raising exception")
+            raise BadParameters('Sweep needs a store directory.')
+
+        self._Store      = _Store
+        self._nWorkers   = _nWorkers
+        self._flushEvery = int(_flushEvery)
+        self._nRun       = 0
+        self._Failed     = {}
+        os.makedirs(self._Store, exist_ok=True)
+
+    def __repr__(self):
+        return " Sweep(<Store>, <nWorkers>, <flushEvery>)"
+
+    def __str__(self):
+        print(" Sweep settings:")
+        print("     Store:", self.getStore())
+        print("     Workers:", self.getnWorkers(), \
+              "; results per file:", self._flushEvery)
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getStore(self):
+        return self._Store
+
+    def getnWorkers(self):
+        return self._nWorkers
+
+    def setnWorkers(self, _nWorkers):
+        self._nWorkers = _nWorkers
+
+    def getnRun(self):
+        return self._nRun
+
+    def getFailed(self):
+        return self._Failed
+
+
+#--------  Processing methods:
+    def getResults(self):
+        Parts = sorted(Name for Name in os.listdir(self._Store) \
+                       if Name.endswith('.parquet'))
+        if not Parts:
+            return pnds.DataFrame(index=pnds.Index([], name='Key'))
+        Results = pnds.concat([pnds.read_parquet( \
+                                  os.path.join(self._Store, Part)) \
+                               for Part in Parts])
+        return Results[~Results.index.duplicated(keep='last')]
+
+    def run(self, Configs):
+        Configs = [canonical(Config) for Config in Configs]
+        Keys    = [configKey(Config) for Config in Configs]
+        Done    = set(self.getResults().index)
+        Todo    = {Key: Config for Key, Config in zip(Keys, Configs) \
+                   if Key not in Done}
+        print("    ----> Sweep.run:", len(Todo), "of", len(set(Keys)), \
+              "configurations to run")
+
+        nWorkers = self._nWorkers
+        if nWorkers == None:
+            nWorkers = os.cpu_count()
+        nWorkers = max(1, min(nWorkers, len(Todo)))
+
+        Rows = []
+        self._nRun    = 0
+        self._Failed  = {}
+        try:
+            if nWorkers == 1:
+                for Key, Config in Todo.items():
+                    try:
+                        Rows.append(runConfig(Config))
+                    except Exception as Err:
+                        self._fail(Key, Err)
+                        continue
+                    self._nRun += 1
+                    if len(Rows) >= self._flushEvery:
+                        Rows = self.flush(Rows)
+            elif Todo:
+                with ProcessPoolExecutor(max_workers=nWorkers) as Pool:
+                    Futures = {Pool.submit(runConfig, Config): Key \
+                               for Key, Config in Todo.items()}
+                    try:
+                        for Future in as_completed(Futures):
+                            try:
+                                Rows.append(Future.result())
+                            except Exception as Err:
+                                self._fail(Futures[Future], Err)
+                                continue
+                            self._nRun += 1
+                            if len(Rows) >= self._flushEvery:
+                                Rows = self.flush(Rows)
+                    except BaseException:
+                        #.. Interrupted: do not start points whose results
+                        #   would be lost:
+                        Pool.shutdown(wait=False, cancel_futures=True)
+                        raise
+        finally:
+            #.. Keep what has finished, also when interrupted:
+            self.flush(Rows)
+
+        if self._Failed:
+            print("    ----> Sweep.run:", len(self._Failed), \
+                  "configurations failed:")
+            for Key, Err in self._Failed.items():
+                print("          ", Key, ":", Err)
+        Results = self.getResults()
+        Keys    = [Key for Key in dict.fromkeys(Keys) \
+                   if Key not in self._Failed]
+        return Results.loc[Keys]
+
+    def _fail(self, Key, Err):
+        print("    ----> Sweep.run: configuration", Key, "failed:", \
+              repr(Err))
+        self._Failed[Key] = repr(Err)
+
+    def flush(self, Rows):
+        if not Rows:
+            return []
+        Frame = pnds.DataFrame(Rows).set_index('Key')
+        Part  = os.path.join(self._Store, 'part-%d-%d.parquet' % \
+                             (time.time_ns(), os.getpid()))
+        Frame.to_parquet(Part + '.tmp')
+        os.replace(Part + '.tmp', Part)
+        Sweep.__Log.debug("flush: %d results to %s", len(Rows), Part)
+        return []
+
+
+#--------  Configurations:
+def grid(**Axes):
+    for Name in Axes:
+        if Name not in Sweep.Defaults:
+            raise BadParameters('Unknown sweep axis ' + Name)
+    Names = list(Axes)
+    return [dict(Sweep.Defaults, **dict(zip(Names, Values))) \
+            for Values in itertools.product(*Axes.values())]
+
+def configKey(Config):
+    Text = json.dumps(canonical(Config), sort_keys=True)
+    return hashlib.sha1(Text.encode()).hexdigest()[:16]
+
+def canonical(Config):
+    #.. Defaults filled in and types fixed, so that e.g. T0=200 and
+    #   T0=200. give the same key:
+    Config = dict(Sweep.Defaults, **Config)
+    if set(Config) != set(Sweep.Defaults):
+        raise BadParameters('Unknown configuration keys ' + \
+                            str(set(Config) - set(Sweep.Defaults)))
+    Bounds = Config['Bounds']
+    if Bounds is not None:
+        Bounds = [[float(b) for b in Bound] for Bound in Bounds]
+    return {'T0': float(Config['T0']), 'Material': str(Config['Material']), \
+            'dx': float(Config['dx']), 'Bounds': Bounds, \
+            'nProtons': int(Config['nProtons']), 'Seed': int(Config['Seed']), \
+            'zBin': float(Config['zBin'])}
+
+def parameterFile(Material):
+    if Material.endswith('.csv'):
+        return Material
+    if Material == 'water':
+        return os.path.join(Sweep.ParameterDir, 'BraggParameters.csv')
+    return os.path.join(Sweep.ParameterDir, \
+                        'BraggParameters-' + Material + '.csv')
+
+
+#--------  Worker-process function; one configuration:
+def runConfig(Config):
+    Config = canonical(Config)
+    t0     = time.perf_counter()
+    Row    = dict(Config, Key=configKey(Config), \
+                  Bounds=json.dumps(Config['Bounds']))
+
+    filename = parameterFile(Config['Material'])
+    iMCS     = MCS.MCS(filename)
+    idEdx    = dEdx.dEdx(filename)
+    T0, dx   = Row['T0'], Row['dx']
+
+    Rcsda   = float(RangeEnergy.RangeEnergy(idEdx).getRange(T0))
+    Trends  = Transport.Transport(iMCS, idEdx).getTrends(T0, dx, dx/2.)
+    nSteps  = np.count_nonzero(~np.isnan(Trends['T'][:, 0]))
+    Row['Rcsda']      = Rcsda
+    Row['RTransport'] = float(Trends['x'][nSteps-1, 0] + dx/2.)
+
+    zMax   = 1.2 * Rcsda
+    nz     = max(1, int(round(zMax / Row['zBin'])))
+    iPB    = PencilBeam.PencilBeam(iMCS, idEdx, \
+                 _Grid=((-1.E3, 1.E3, 1), (-1.E3, 1.E3, 1), (0., zMax, nz)), \
+                 _dx=dx)
+    MC     = iPB.run(T0, Row['nProtons'], _Seed=Row['Seed'])
+    Dose   = iPB.getDepthDose(MC)
+    zEdges = iPB.getEdges()[2]
+    z      = 0.5*(zEdges[1:] + zEdges[:-1])
+    Row['RMC']         = float(np.nanmean(MC['Range']))
+    Row['StragglingMC'] = float(np.nanstd(MC['Range']))
+
+    p0     = np.array([1., 0.1, Rcsda, 0.012, 0.012*Rcsda**0.935])
+    Bounds = Config['Bounds'] or Sweep.DefaultBounds
+    Bounds = (p0*np.asarray(Bounds[0], dtype=float), \
+              p0*np.asarray(Bounds[1], dtype=float))
+    popt, pcov = BraggFit.BraggFit(filename, 1).fit(z, Dose, p0, Bounds)
+    perr   = np.sqrt(np.diag(pcov))
+    for i, Name in enumerate(('phi0', 'epsilon', 'r0', 'beta', 'sigma')):
+        Row[Name]          = float(popt[i])
+        Row[Name + 'Err']  = float(perr[i])
+    Row['Time'] = time.perf_counter() - t0
+    return Row
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
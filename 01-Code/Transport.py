@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Class Transport:
+================
+
+  Steps a set of protons, one per initial kinetic energy, through depth in
+  fixed steps dx.  All energies are advanced together with numpy; a
+  proton is masked out once it has stopped (T <= 0), or once the mean
+  energy loss is no longer positive or finite.  At each step the kinetic
+  energy, beta*gamma, MCS plane displacement (MCS.getYplane) and energy
+  loss (dEdx.getdEdx * dx) are recorded for every proton.
+
+
+  Class attributes:
+  -----------------
+  __Log      : Logger "Transport"; debug output is enabled at run time with
+               logging.getLogger("Transport").setLevel(logging.DEBUG)
+  MaxSteps   : Safety limit on the number of steps
+
+  Instance attributes:
+  --------------------
+   _iMCS       = MCS instance providing the MCS parameters
+   _idEdx      = dEdx instance providing the energy-loss parameters
+
+
+  Methods:
+  --------
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Stores MCS and dEdx instances.
+      __repr__: One liner with call.
+      __str__ : Dump of settings
+
+
+  Get/set methods:   <-------- believed to be "self documenting"!
+
+  Processing methods:
+      getTrends: Step protons with initial kinetic energies T0 (MeV) from
+                 depth x0 (cm) in steps of dx (cm).  Returns a dict of
+                 (nSteps, len(T0)) numpy arrays:
+                   x, T, E, P, beta, gamma, betagamma, yPlane, dE
+                 Entries after a proton has stopped are NaN.
+                 _table=True takes dE/dx from dEdx.getdEdxInterp.
+
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation
+ 1.1: 18Oct26: Use array-aware MCS.getYplane and dEdx.getdEdx
+ 1.2: 18Oct26: Debug output through the logging module
+
+@author: kennethlong
+"""
+
+import logging
+import numpy as np
+
+class Transport(object):
+    __Log      = logging.getLogger("Transport")
+    MaxSteps   = 1000000
+
+#--------  "Built-in methods":
+    def __init__(self, _iMCS=None, _idEdx=None):
+
+        if _iMCS == None or _idEdx == None:
+            print(" Transport: MCS and dEdx instances required,", \
+                  " raising exception")
+            raise BadParameters('Transport needs MCS and dEdx instances.')
+
+        self._iMCS  = _iMCS
+        self._idEdx = _idEdx
+
+    def __repr__(self):
+        return " Transport(<MCS>, <dEdx>)"
+
+    def __str__(self):
+        print(" Transport settings:")
+        print("      MCS instance:", repr(self.getMCS()))
+        print("     dEdx instance:", repr(self.getdEdx()))
+        return "     <---- Done."
+
+
+#--------  Get/set methods:
+    def getMCS(self):
+        return self._iMCS
+
+    def getdEdx(self):
+        return self._idEdx
+
+
+#--------  Processing methods:
+    def getTrends(self, T0, dx=0.1, x0=0.05, _table=False):
+        T0 = np.atleast_1d(np.asarray(T0, dtype=float))
+        Mp = self._idEdx.getProjectileMass()
+
+        Names  = ('x', 'T', 'E', 'P', 'beta', 'gamma', 'betagamma', \
+                  'yPlane', 'dE')
+        Tables = {Name: [] for Name in Names}
+
+        T      = T0.copy()
+        x      = x0
+        Active = T > 0.
+        nSteps = 0
+        while np.any(Active):
+            if nSteps >= Transport.MaxSteps:
+                print("    ----> Transport.getTrends: step limit reached")
+                break
+            Ta = T[Active]
+
+            Row = {Name: np.full(T0.shape, np.nan) for Name in Names}
+            E   = Mp + Ta
+            P   = np.sqrt(E**2 - Mp**2)
+            Row['x'][Active]         = x
+            Row['T'][Active]         = Ta
+            Row['E'][Active]         = E
+            Row['P'][Active]         = P
+            Row['beta'][Active]      = P / E
+            Row['gamma'][Active]     = E / Mp
+            Row['betagamma'][Active] = P / Mp
+            Row['yPlane'][Active]    = self._iMCS.getYplane(x, Ta)
+            if _table:
+                dE = self._idEdx.getdEdxInterp(Ta) * dx
+            else:
+                dE = self._idEdx.getdEdx(Ta) * dx
+            Row['dE'][Active]        = dE
+            for Name in Names:
+                Tables[Name].append(Row[Name])
+
+            #.. Increment x and energy; stop protons that have ranged out:
+            T[Active] = Ta - dE
+            Stopped   = np.zeros(T0.shape, dtype=bool)
+            Stopped[Active] = ~(np.isfinite(dE) & (dE > 0.))
+            Active    = Active & ~Stopped & (T > 0.)
+            x        += dx
+            nSteps   += 1
+
+        Transport.__Log.debug("getTrends: %d energies, %d steps", \
+                              len(T0), nSteps)
+        return {Name: np.array(Tables[Name]).reshape(nSteps, len(T0)) \
+                for Name in Names}
+
+
+#--------  Exceptions:
+class BadParameters(Exception):
+    pass
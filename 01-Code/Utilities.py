@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Module Utilities:
+=================
+
+  Small helpers shared by the physics classes.
+
+
+  Module functions:
+      isReal     : True if Val is a real number or array of them (integer
+                   or floating dtype); bool, complex, strings and objects
+                   are rejected
+
+
+Created on Sat 18Oct26, Version history:
+----------------------------------------
+ 1.0: 18Oct26: First implementation; isReal replaces the _isNumeric
+               copies in MCS and dEdx
+
+@author: kennethlong
+"""
+
+import numpy as np
+
+def isReal(Val):
+    Type = np.asarray(Val).dtype
+    return (np.issubdtype(Type, np.integer) or \
+            np.issubdtype(Type, np.floating)) and not isinstance(Val, bool)
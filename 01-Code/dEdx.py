@@ -4,29 +4,31 @@
 Class dEdx:
 ===========
 
-  Calculates the dEdx effect for a variety of situations.  Use singleton
-  class so that instance attributes can be used to set the parameters.
+  Calculates the dEdx effect for a variety of situations.  Each instance
+  holds the parameters read from its own file, so that several materials
+  can be used side by side and instances can be pickled, e.g. to pass them
+  to worker processes.
 
 
   Class attributes:
   -----------------
-  __instance : Set on creation of first (and only) instance.
-  __Debug    : boolean ... debug flag      
+  __Log      : Logger "dEdx"; debug output is enabled at run time with
+               logging.getLogger("dEdx").setLevel(logging.DEBUG)
 
   Instance attributes:
   --------------------
    __filename  = Filename from which parameters have been read.  If None
                  then default values are used.
-   _dEdxParams  = Pandas data frame instance containing parameters
+   _cntrlParams = BraggParameters record (shared, immutable) holding
+                 the parameters read from the file
    _IssueDate  = date.today(); i.e. date when code is run and resuts are
                  generated 
     
 
   Methods:
   --------
-  Built-in methods __new__, __repr__ and __str__.
-      __new__ : Creates singleton class and prints version, PDG
-                reference, and values of constants used.
+  Built-in methods __init__, __repr__ and __str__.
+      __init__: Reads and parses the parameter file.
       __repr__: One liner with call.
       __str__ : Dump of constants
 
@@ -36,60 +38,76 @@ Class dEdx:
   Print methods:
 
 
+  Processing methods:
+      getdEdx      : Mean energy loss per unit length at kinetic energy T
+                     (MeV).  T may be a float or a numpy array.  The
+                     constant prefactor K z^2 Z/A Mp rho/2 is computed once,
+                     in parsedEdx.
+      setdEdxTable : Tabulate getdEdx on a log-spaced grid of T
+      getdEdxInterp: Fast getdEdx by interpolation in the table
+      getStraggling: Bohr variance (MeV^2) of the energy lost over a path
+                     dx (cm) at kinetic energy T (MeV),
+                       K z^2 Z/A rho me dx (1 - beta^2/2)/(1 - beta^2)
+
 
   
 Created on Thu 13Aug22, Version history:
 ----------------------------------------
  1.0: 13Aug22: First implementation
+ 1.1: 18Oct26: Array-aware getdEdx; precomputed prefactor; lookup table
+ 1.2: 18Oct26: Parameters held per instance; no longer a singleton
+ 1.3: 18Oct26: Parameters from the shared BraggParameters registry
+ 1.4: 18Oct26: Debug output through the logging module
+ 1.5: 18Oct26: Bohr energy-loss straggling
+ 1.6: 18Oct26: Compiled getdEdx for arrays when Kernels has a compiled
+               backend
+ 1.7: 18Oct26: Arguments checked with Utilities.isReal; complex rejected
 
 @author: kennethlong
 """
 
+import logging
 import os
 import math   as     mth
-import pandas as     pnds
+import numpy  as     np
 from datetime import date
 
+import BraggParameters as BP
+import Kernels         as Kernels
+import Utilities       as Utilities
+
 class dEdx(object):
-    __instance = None
-    __Debug    = True
+    __Log      = logging.getLogger("dEdx")
 
 #--------  "Built-in methods":
-    def __new__(cls, _filename=None):
-
-        if cls.__instance is None:
-            cls.__instance = super(dEdx, cls).__new__(cls)
-        
-            if _filename == None:
-                if  dEdx.__Debug:
-                    print(" dEdx: no filename provided, take defaults.")
-            elif not os.path.isfile(_filename):
-                print(" dEdx: file ", _filename, " does not exist.", \
-                      " Raising exception")
-                raise NonExistantFile('CSV file' + \
-                                      _filename + \
-                                      ' does not exist; execution termimated.')
-
-            #.. Set defaults:
-            cls._filename  = None
-            cls._IssueDate = date.today()
-            cls._dEdxParams = None
-
-            #.. Parse control file:
-            if _filename != None:
-                cls._cntrlParams = cls.getdEdxs(_filename)
-                if cls.__Debug:
-                    print(" dEdx: parameters: \n", \
-                          cls._cntrlParams)
-                cls._K, cls._KUnit, cls._Z, cls._A, cls._z, \
-                    cls._Mp, cls._MpUnit, \
-                    cls._me, cls._meUnit, \
-                    cls._rho, cls._rhoUnit, cls._I, cls._IUnit, \
-                    cls._Eta1, cls._Eta1Unit, \
-                    cls._Alpha1 \
-                    = cls.parsedEdx()
-        
-        return cls.__instance
+    def __init__(self, _filename=None):
+
+        if _filename == None:
+            dEdx.__Log.debug("no filename provided, take defaults.")
+        elif not os.path.isfile(_filename):
+            print(" dEdx: file ", _filename, " does not exist.", \
+                  " Raising exception")
+            raise NonExistantFile('CSV file' + \
+                                  _filename + \
+                                  ' does not exist; execution termimated.')
+
+        #.. Set defaults:
+        self._filename  = _filename
+        self._IssueDate = date.today()
+        self._dEdxParams = None
+
+        #.. Parse control file:
+        if _filename != None:
+            self._cntrlParams = self.getdEdxs(_filename)
+            dEdx.__Log.debug("parameters:\n%s", self._cntrlParams)
+            self._K, self._KUnit, self._Z, self._A, self._z, \
+                self._Mp, self._MpUnit, \
+                self._me, self._meUnit, \
+                self._rho, self._rhoUnit, self._I, self._IUnit, \
+                self._Eta1, self._Eta1Unit, \
+                self._Alpha1, self._Prefactor \
+                = self.parsedEdx()
+        self._dEdxTable = None
 
     def __repr__(self):
         return " dEdx(<filename>)"
@@ -116,65 +134,43 @@ class dEdx(object):
 #--------  I/o methods:
     @classmethod
     def getdEdxs(cls, _filename):
-        dEdxParams = pnds.read_csv(_filename)
+        dEdxParams = BP.getParameters(_filename)
         return dEdxParams
 
     
-#--------  Extracting data from the WorkPackage pandas dataframe:
-    @classmethod
-    def parsedEdx(cls):
-        Rows = cls._cntrlParams.index
-        for i in Rows:
-            if cls.__Debug:
-                print(" dEdx: parsedEdx: processing flag: ", \
-                      cls._cntrlParams.iat[i,0])
-            if cls._cntrlParams.iat[i,0] == "Coefficient for dE/dx":
-                K     = cls._cntrlParams.iat[i,1]
-                KUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("<Z>") >= 0:
-                Z = cls._cntrlParams.iat[i,1]
-            elif cls._cntrlParams.iat[i,0].find("<A>") >= 0:
-                A = cls._cntrlParams.iat[i,1]
-            elif cls._cntrlParams.iat[i,0] == "Charge number":
-                z = cls._cntrlParams.iat[i,1]
-            elif cls._cntrlParams.iat[i,0].find("Projectile mass") >= 0:
-                Mp     = cls._cntrlParams.iat[i,1]
-                MpUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("Electron mass") >= 0:
-                me     = cls._cntrlParams.iat[i,1]
-                meUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("Density") >= 0:
-                rho     = cls._cntrlParams.iat[i,1]
-                rhoUnit = cls._cntrlParams.iat[i,2]
-            elif cls._cntrlParams.iat[i,0].find("Mean excitation energy") >= 0:
-                I     = cls._cntrlParams.iat[i,1]
-                IUnit = cls._cntrlParams.iat[i,2]
-            else:
-                print("    ----> dEdx.parsedEdx: ", \
-                      " unprocessed control field:", \
-                      cls._cntrlParams.iat[i,0], cls._cntrlParams.iat[i,1], \
-                      cls._cntrlParams.iat[i,2])
+#--------  Extracting data from the parameter record:
+    def parsedEdx(self):
+        P = self._cntrlParams
+        if None in (P.K, P.Z, P.A, P.z, P.Mp, P.me, P.rho, P.I):
+            print("    ----> dEdx.parsedEdx: parameter missing from", \
+                  P.filename, " raising exception")
+            raise BadParameters('Parameter missing from ' + P.filename)
+        K,     KUnit    = P.K,    P.KUnit
+        Z, A            = P.Z,    P.A
+        z               = P.z
+        Mp,    MpUnit   = P.Mp,   P.MpUnit
+        me,    meUnit   = P.me,   P.meUnit
+        rho,   rhoUnit  = P.rho,  P.rhoUnit
+        I,     IUnit    = P.I,    P.IUnit
 
         #.. Derived constants:
         Eta1     = K * z**2 * Z/A
         Eta1Unit = "Need to work unit out"
         R        = me / Mp
         Alpha1   = 8. * R**2 / I**2
+        Prefactor = K * z**2 * Z/A * Mp / 2. * rho     #.. dE/dx * T / log-term
 
         return K, KUnit, Z, A, z, Mp, MpUnit, me, meUnit, \
-            rho, rhoUnit, I, IUnit, Eta1, Eta1Unit, Alpha1 
+            rho, rhoUnit, I, IUnit, Eta1, Eta1Unit, Alpha1, Prefactor
 
 
 #--------  Get/set methods:
     def setIssueDate(self, _IssueDate):
-        if dEdx.__Debug:
-            print(" setIssueDate:", _IssueDate)
+        dEdx.__Log.debug("setIssueDate: %s", _IssueDate)
         if isinstance(_IssueDate, dt.date):
             self._IssueDate = _IssueDate
         else:
-            if dEdx.__Debug:
-                print("     ----> Issue date ", \
-                      " raising exception")
+            dEdx.__Log.debug("Issue date invalid, raising exception.")
             raise BadIssueDate()
         
     def getIssueDate(self):
@@ -228,33 +224,91 @@ class dEdx(object):
     def getIUnit(self):
         return self._IUnit
     
+    def getPrefactor(self):
+        return self._Prefactor
+
+    def getdEdxTable(self):
+        return self._dEdxTable
+
+    def setdEdxTable(self, Tmin=1., Tmax=1000., nT=4001):
+        #.. Stopping power on a log-spaced grid of T, for getdEdxInterp:
+        if not (0. < Tmin < Tmax) or nT < 2:
+            raise BadParameters()
+        T = np.geomspace(Tmin, Tmax, nT)
+        dEdxT = self.getdEdx(T)
+        self._dEdxTable = (T, dEdxT, np.diff(dEdxT))
+        dEdx.__Log.debug("setdEdxTable: %d points from %g to %g MeV", \
+                         nT, Tmin, Tmax)
+    
 
 #--------  Print methods:
 
 
 #--------  Processing methods:
     def getdEdx(self, T=None):
-        if dEdx.__Debug:
-            print(" getdEdx; T:", T)
-        if T==None:
-            if dEdx.__Debug:
-                print("     ----> T invalid, raising exception.")
+        if dEdx.__Log.isEnabledFor(logging.DEBUG):
+            dEdx.__Log.debug("getdEdx; T: %s", T)
+        if T is None:
+            dEdx.__Log.debug("T invalid, raising exception.")
             raise BadParameters()
-        if not isinstance(T, float):
-            if dEdx.__Debug:
-                print("     ----> T invalid, raising exception.")
+        if not Utilities.isReal(T):
+            dEdx.__Log.debug("T invalid, raising exception.")
             raise BadParameters()
 
+        if np.ndim(T) > 0:
+            T = np.asarray(T, dtype=float)
+            Jit = Kernels.get()
+            if Jit is not None:
+                return Jit.dedx(T, self._Prefactor, self._Alpha1, self._Mp)
         
-        Ans = self.getK() * self.getChargeNumber()**2 * \
-               self.getZ()/self.getA() * self.getProjectileMass() \
-               / 2. / T * self.getrho()
+        Ans = self._Prefactor / T
 
-        Beta2 = 2. * T / self.getProjectileMass()
+        Beta2 = 2. * T / self._Mp
 
-        Ans *= 0.5 * mth.log( self.getAlpha1() * T**2 - Beta2)
+        if np.ndim(T) == 0:
+            Ans *= 0.5 * mth.log( self._Alpha1 * T**2 - Beta2)
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                Ans *= 0.5 * np.log( self._Alpha1 * T**2 - Beta2)
         
         return Ans
+
+    def getdEdxInterp(self, T=None):
+        #.. Linear interpolation in log(T) on the table from setdEdxTable
+        #   (default table built on first use); exact outside the table.
+        if self._dEdxTable is None:
+            self.setdEdxTable()
+        if T is None or not Utilities.isReal(T):
+            raise BadParameters()
+        Tgrid, dEdxgrid, Slope = self._dEdxTable
+        T    = np.asarray(T, dtype=float)
+        LogT = np.log(T / Tgrid[0])
+        LogT *= (len(Tgrid)-1) / mth.log(Tgrid[-1] / Tgrid[0])
+        if LogT.min(initial=0.) >= 0. and LogT.max(initial=0.) < len(Tgrid)-1:
+            i   = LogT.astype(np.intp)
+            Ans = dEdxgrid[i] + (LogT - i)*Slope[i]
+        else:
+            In  = (LogT >= 0.) & (LogT < len(Tgrid)-1)
+            i   = LogT[In].astype(np.intp)
+            Ans = np.empty(T.shape)
+            Ans[In]  = dEdxgrid[i] + (LogT[In] - i)*Slope[i]
+            Ans[~In] = self.getdEdx(T[~In])
+        if Ans.ndim == 0:
+            return float(Ans)
+        return Ans
+
+    def getStraggling(self, T=None, dx=None):
+        if T is None or dx is None or \
+           not (Utilities.isReal(T) and Utilities.isReal(dx)):
+            dEdx.__Log.debug("T or dx invalid, raising exception.")
+            raise BadParameters()
+        Gamma2 = ((self._Mp + np.asarray(T, dtype=float)) / self._Mp)**2
+        Beta2  = 1. - 1./Gamma2
+        Ans    = self._Eta1 * self._rho * self._me * dx * \
+                 (1. - Beta2/2.) * Gamma2
+        if np.ndim(Ans) == 0:
+            return float(Ans)
+        return Ans
     
 
 #--------  Exceptions:
@@ -9,6 +9,8 @@ Test script for "Bortfeldt" class ... initialisation and get methods
 """
 
 import os
+import pickle
+import numpy as np
 
 import Bortfeldt as Bortfeldt
 
@@ -16,19 +18,26 @@ import Bortfeldt as Bortfeldt
 ##! Start:
 print("========  Bortfeldt: tests start  ========")
 
-##! Test singleton class feature:
+##! Test that instances hold their own parameters:
 BortfeldtTest = 1
 print()
-print("BortfeldtTest:", BortfeldtTest, " check if class is a singleton.")
+print("BortfeldtTest:", BortfeldtTest, " check instances are independent.")
 BraggPATH = os.getenv('BraggPATH')
 print(BraggPATH)
 filename  = os.path.join(BraggPATH, \
                          '11-BraggParameters/BraggParameters.csv')
+filePMMA  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters-PMMA.csv')
 iBortfeldt  = Bortfeldt.Bortfeldt(filename)
-iBortfeldt1 = Bortfeldt.Bortfeldt(filename)
-print("    iBortfeldt singleton test -- OK if 0:", id(iBortfeldt)-id(iBortfeldt1))
-if iBortfeldt != iBortfeldt1:
-    raise Exception("Bortfeldt is not a singleton class!")
+iBortfeldt1 = Bortfeldt.Bortfeldt(filePMMA)
+print("    ---> water, PMMA getalpha:", iBortfeldt.getalpha(), \
+      iBortfeldt1.getalpha())
+if iBortfeldt is iBortfeldt1 or \
+   iBortfeldt.getalpha() == iBortfeldt1.getalpha():
+    raise Exception("Bortfeldt instances share parameters!")
+iBortfeldt2 = pickle.loads(pickle.dumps(iBortfeldt))
+if iBortfeldt2.getalpha() != iBortfeldt.getalpha():
+    raise Exception("Bortfeldt parameters lost on pickling!")
 
 
 ##! Check built-in methods:
@@ -50,6 +59,44 @@ Ans = iBortfeldt.getBortfeldt(T)
 print("     ---> T =", T, " MeV: Bortfeldt =", Ans)
 
 
+##! Check vectorised Bragg curve against point-by-point evaluation:
+BortfeldtTest += 1
+print()
+print("BortfeldtTest:", BortfeldtTest, " check vectorised Bragg curve.")
+z    = np.linspace(0., 30., num=1000)
+Pars = (1., 0.1, 27.5, 0.012, 0.35)
+yVec = iBortfeldt.bragg_vec(z, *Pars)
+yScl = np.array([iBortfeldt.bragg(zi, *Pars) for zi in z])
+print("     ---> max |bragg_vec - bragg|:", np.max(np.abs(yVec-yScl)))
+if not np.allclose(yVec, yScl, rtol=1.E-12, atol=0.):
+    raise Exception("Bortfeldt.bragg_vec does not reproduce Bortfeldt.bragg!")
+
+
+##! Check derived constants and change of range-energy exponent:
+BortfeldtTest += 1
+print()
+print("BortfeldtTest:", BortfeldtTest, " check derived constants.")
+p = iBortfeldt.getRangeEnergy()
+print("     ---> p =", p, ": Gamma(1/p) =", iBortfeldt.getGammaQ())
+if abs(iBortfeldt.getGammaQ() - 1.57539) > 1.E-5:
+    raise Exception("Gamma(1/p) disagrees with (1/p - 1)! for p = 1.77!")
+iBortfeldt.setRangeEnergy(1.5)
+print("     ---> p = 1.5 : Gamma(1/p) =", iBortfeldt.getGammaQ())
+if not np.isclose(iBortfeldt.getGammaQ(), 1.354117939426400) or \
+   not np.isclose(iBortfeldt.getNorm(), \
+                  1./(iBortfeldt.getrho()*1.5*iBortfeldt.getalpha()**(1/1.5))):
+    raise Exception("Derived constants not updated by setRangeEnergy!")
+try:
+    iBortfeldt.setRangeEnergy(-1.)
+except Bortfeldt.BadParameters:
+    print("     ---> p = -1 : exception raised.")
+else:
+    raise Exception("Negative range-energy exponent accepted!")
+iBortfeldt.setRangeEnergy(p)
+if not np.allclose(iBortfeldt.bragg_vec(z, *Pars), yVec, rtol=1.E-12):
+    raise Exception("Bragg curve not restored with original p!")
+
+
 ##! Complete:
 print()
 print("========  Bortfeldt: tests complete  ========")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "BraggFit" class ... batch fitting of Bragg curves
+===========================
+
+  BraggFit.py -- set "relative" path to code
+
+"""
+
+import os
+import numpy as np
+
+import Bortfeldt as Bortfeldt
+import BraggFit  as BraggFit
+
+
+##! Start:
+print("========  BraggFit: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+iBortfeldt = Bortfeldt.Bortfeldt(filename)
+
+##! Check analytic Jacobian against finite differences:
+BraggFitTest = 1
+print()
+print("BraggFitTest:", BraggFitTest, " check analytic Jacobian.")
+Pars = np.array([1., 0.1, 27.5, 0.012, 0.35])
+z    = np.linspace(0., 29., num=300)
+J    = iBortfeldt.bragg_jac(z, *Pars)
+Jnum = np.zeros(J.shape)
+for k in range(5):
+    h = 1.E-6 * Pars[k]
+    Pp = Pars.copy(); Pp[k] += h
+    Pm = Pars.copy(); Pm[k] -= h
+    Jnum[:,k] = (iBortfeldt.bragg_vec(z, *Pp) - \
+                 iBortfeldt.bragg_vec(z, *Pm)) / (2.*h)
+RelErr = np.max(np.abs(J-Jnum), axis=0) / np.max(np.abs(Jnum), axis=0)
+print("     ---> relative error per parameter:", RelErr)
+if np.any(RelErr > 1.E-5):
+    raise Exception("Bortfeldt.bragg_jac disagrees with finite differences!")
+
+##! Fit a batch of synthetic profiles:
+BraggFitTest += 1
+print()
+print("BraggFitTest:", BraggFitTest, " batch fit of synthetic profiles.")
+rng   = np.random.default_rng(1234)
+r0s   = np.array([10., 15., 20., 25.])
+True_ = [np.array([1., 0.1, r0, 0.012, 0.012*r0**0.935]) for r0 in r0s]
+Profiles = []
+p0       = []
+bounds   = []
+for Par in True_:
+    zP = np.linspace(0., Par[2]+0.5, num=200)
+    yP = iBortfeldt.bragg_vec(zP, *Par)
+    yP = yP * (1. + 0.002*rng.standard_normal(yP.shape))
+    Profiles.append((zP, yP))
+    p0.append(Par * np.array([1.1, 0.8, 1.01, 1.1, 1.1]))
+    bounds.append(((0., 0., Par[2]-1., 0., 0.5*Par[4]), \
+                   (10., 0.5, Par[2]+1., 0.1, 2.*Par[4])))
+iFit = BraggFit.BraggFit(filename, 2)
+print(iFit)
+popt, pcov = iFit.fitBatch(Profiles, p0, bounds)
+#.. phi0, epsilon and beta are strongly correlated; check range, width
+#   and that the fitted curve reproduces the input profile:
+for i, Par in enumerate(True_):
+    zP, yP = Profiles[i]
+    yFit   = iBortfeldt.bragg_vec(zP, *popt[i])
+    Dev    = np.max(np.abs(yFit-yP)) / np.max(yP)
+    print("     ---> true:", Par, "\n          fit: ", popt[i], \
+          "\n          max deviation / peak:", Dev)
+    if abs(popt[i][2]-Par[2]) > 1.E-3*Par[2] or \
+       abs(popt[i][4]-Par[4]) > 5.E-2*Par[4] or Dev > 1.E-2:
+        raise Exception("BraggFit did not recover input profile!")
+if pcov.shape != (len(Profiles), 5, 5):
+    raise Exception("BraggFit covariance has wrong shape!")
+
+##! Serial path gives the same answer:
+BraggFitTest += 1
+print()
+print("BraggFitTest:", BraggFitTest, " serial fit matches pool fit.")
+iFit.setnWorkers(1)
+popt1, pcov1 = iFit.fitBatch(Profiles, p0, bounds)
+print("     ---> max |serial - pool|:", np.max(np.abs(popt1-popt)))
+if not np.allclose(popt1, popt):
+    raise Exception("BraggFit serial and pool fits differ!")
+
+##! Shared and per-profile p0/bounds told apart by shape:
+BraggFitTest += 1
+print()
+print("BraggFitTest:", BraggFitTest, " shared and per-profile p0/bounds.")
+#.. As many profiles as parameters:
+Profiles5 = Profiles + Profiles[:1]
+p05       = np.array(p0 + p0[:1])
+Shared    = (np.zeros(5), np.array([10., 1., 50., 1., 5.]))
+popt5, pcov5 = iFit.fitBatch(Profiles5, p05, Shared)
+Pairs     = [(0., np.inf)] * 5
+poptP, pcovP = iFit.fitBatch(Profiles5, p05[0], Pairs)
+print("     ---> per-profile p0, shared bounds:", popt5[:, 2])
+print("     ---> shared p0, per-profile scalar bounds:", poptP[:, 2])
+if popt5.shape != (5, 5) or np.any(np.isnan(popt5)) or \
+   poptP.shape != (5, 5) or BraggFit._iBortfeldt is not None:
+    raise Exception("BraggFit p0/bounds shapes not handled!")
+for Bad in ({'p0': p05[:3]}, {'p0': p05[0], 'bounds': Pairs[:3]}):
+    try:
+        iFit.fitBatch(Profiles5, Bad['p0'], Bad.get('bounds', Shared))
+    except BraggFit.BadParameters:
+        print("     ---> mismatched shape: exception raised.")
+    else:
+        raise Exception("BraggFit accepted mismatched p0/bounds!")
+
+
+##! Complete:
+print()
+print("========  BraggFit: tests complete  ========")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "BraggLibrary" class ... pre-tabulated depth-dose curves
+===========================
+
+  BraggLibrary.py -- set "relative" path to code
+
+"""
+
+import os
+import shutil
+import tempfile
+import timeit
+import numpy as np
+
+import Bortfeldt    as Bortfeldt
+import BraggLibrary as BraggLibrary
+
+
+##! Start:
+print("========  BraggLibrary: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+TmpDir    = tempfile.mkdtemp()
+Library   = os.path.join(TmpDir, 'Library')
+
+##! Check built-in methods:
+BraggLibraryTest = 1
+print()
+print("BraggLibraryTest:", BraggLibraryTest, " check built-in methods.")
+try:
+    BraggLibrary.BraggLibrary(Library)
+except BraggLibrary.NonExistantFile:
+    print("     ---> missing library: exception raised.")
+else:
+    raise Exception("BraggLibrary loaded missing library!")
+iLibrary = BraggLibrary.BraggLibrary(Library, filename)
+print("    ----> __repr__:")
+print(repr(iLibrary))
+print("    ----> __str__:")
+print(iLibrary)
+
+##! Check interpolation against direct evaluation:
+BraggLibraryTest += 1
+print()
+print("BraggLibraryTest:", BraggLibraryTest, " check interpolation.")
+iBortfeldt = Bortfeldt.Bortfeldt(filename)
+for E in (50., 100.5, 137.3, 200., 250.):
+    r0   = iLibrary.getRange(E)
+    z    = np.linspace(0., 1.15*r0, 5001)
+    Ref  = iBortfeldt.bragg_vec(z, 1., 0.1, r0, 0.012, iLibrary.getSigma(E))
+    Dose = iLibrary.getDose(E, z)
+    Err  = np.max(np.abs(Dose - Ref)) / np.max(Ref)
+    print("     ---> E =", E, " MeV: r0 =", r0, " max error / peak:", Err)
+    if Err > 2.E-3 or iLibrary.getDose(E, z[2500]) != Dose[2500]:
+        raise Exception("BraggLibrary interpolation wrong!")
+if iLibrary.getDose(100., 1.3*iLibrary.getRange(100.)) != 0.:
+    raise Exception("BraggLibrary dose beyond the table not zero!")
+try:
+    iLibrary.getDose(260., 10.)
+except BraggLibrary.BadParameters:
+    print("     ---> energy outside library: exception raised.")
+else:
+    raise Exception("BraggLibrary accepted energy outside library!")
+
+##! Check query time and reloading:
+BraggLibraryTest += 1
+print()
+print("BraggLibraryTest:", BraggLibraryTest, " check query time and reload.")
+Time = timeit.timeit(lambda: iLibrary.getDose(137.3, 12.), \
+                     number=10000) / 1.E4
+print("     ---> scalar query:", Time*1.E6, "us")
+Mtime    = os.path.getmtime(os.path.join(Library, 'Dose.npy'))
+iLibrary = BraggLibrary.BraggLibrary(Library, filename)
+if Time > 1.E-4 or not isinstance(iLibrary._Dose, np.memmap) or \
+   os.path.getmtime(os.path.join(Library, 'Dose.npy')) != Mtime:
+    raise Exception("BraggLibrary query slow or library rebuilt!")
+iLibrary = BraggLibrary.BraggLibrary(Library, filename, _EnergySpread=0.)
+print("     ---> energy spread changed, sigma at 200 MeV:", \
+      iLibrary.getSigma(200.))
+if iLibrary.getMeta()['EnergySpread'] != 0.:
+    raise Exception("BraggLibrary not rebuilt on change of settings!")
+
+##! Check spread-out Bragg peak:
+BraggLibraryTest += 1
+print()
+print("BraggLibraryTest:", BraggLibraryTest, " check spread-out Bragg peak.")
+Energies = np.linspace(150., 180., 16)
+Weights  = np.linspace(0.2, 1., 16)
+z        = np.linspace(0., 25., 501)
+SOBP     = iLibrary.getSOBP(Energies, Weights, z)
+Sum      = sum(w*iLibrary.getDose(E, z) for E, w in zip(Energies, Weights))
+print("     ---> peak dose:", SOBP.max(), " matrix shape:", \
+      iLibrary.getMatrix(Energies, z).shape)
+if not np.allclose(SOBP, Sum, rtol=1.E-12, atol=0.):
+    raise Exception("BraggLibrary spread-out Bragg peak wrong!")
+
+shutil.rmtree(TmpDir)
+
+
+##! Complete:
+print()
+print("========  BraggLibrary: tests complete  ========")
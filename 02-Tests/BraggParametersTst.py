@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "BraggParameters" ... shared parameter registry
+===========================
+
+  BraggParameters.py -- set "relative" path to code
+
+"""
+
+import os
+import shutil
+import tempfile
+
+import BraggParameters as BP
+import MCS             as MCS
+import dEdx            as dEdx
+import Bortfeldt       as Bortfeldt
+
+
+##! Start:
+print("========  BraggParameters: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+
+##! Check parsing:
+BraggParametersTest = 1
+print()
+print("BraggParametersTest:", BraggParametersTest, " check parsing.")
+P = BP.getParameters(filename)
+print(P)
+if P.rho != 1. or P.p != 1.77 or P.Mp != 938.27 or P.MpUnit != "MeV" or \
+   P.alphaUnit != "cm MeV^(-p)" or P.Other != ():
+    raise Exception("BraggParameters parsed wrong values!")
+try:
+    P.rho = 2.
+except AttributeError:
+    print("     ---> record is immutable.")
+else:
+    raise Exception("BraggParameters record is mutable!")
+try:
+    BP.getParameters(filename + ".missing")
+except BP.NonExistantFile:
+    print("     ---> missing file: exception raised.")
+else:
+    raise Exception("BraggParameters accepted missing file!")
+
+##! Check that the file is parsed once and shared:
+BraggParametersTest += 1
+print()
+print("BraggParametersTest:", BraggParametersTest, " check cache.")
+if BP.getParameters(filename) is not P:
+    raise Exception("BraggParameters re-parsed an unchanged file!")
+if MCS.MCS(filename)._cntrlParams is not P or \
+   dEdx.dEdx(filename)._cntrlParams is not P or \
+   Bortfeldt.Bortfeldt(filename)._cntrlParams is not P:
+    raise Exception("Physics classes do not share the parsed record!")
+
+TmpDir  = tempfile.mkdtemp()
+TmpFile = os.path.join(TmpDir, 'BraggParameters.csv')
+shutil.copy(filename, TmpFile)
+P1 = BP.getParameters(TmpFile)
+with open(TmpFile) as File:
+    Text = File.read()
+with open(TmpFile, 'w') as File:
+    File.write(Text.replace("Density (water),1,", "Density (water),1.05,"))
+P2 = BP.getParameters(TmpFile)
+print("     ---> density before, after edit:", P1.rho, P2.rho)
+shutil.rmtree(TmpDir)
+if P2 is P1 or P2.rho != 1.05:
+    raise Exception("BraggParameters did not re-parse a changed file!")
+
+
+##! Complete:
+print()
+print("========  BraggParameters: tests complete  ========")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "DepthGrid" class ... adaptive depth grid
+===========================
+
+  DepthGrid.py -- set "relative" path to code
+
+"""
+
+import os
+import numpy as np
+
+import Bortfeldt as Bortfeldt
+import DepthGrid as DepthGrid
+
+
+##! Start:
+print("========  DepthGrid: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+iBortfeldt = Bortfeldt.Bortfeldt(filename)
+Pars   = (1., 0.1, 27.5, 0.012, 0.35)
+Breaks = (Pars[2] - 10.*Pars[4], Pars[2] + 5.*Pars[4])
+def Curve(z):
+    return iBortfeldt.bragg_vec(z, *Pars)
+
+##! Check built-in methods:
+DepthGridTest = 1
+print()
+print("DepthGridTest:", DepthGridTest, " check built-in methods.")
+iGrid = DepthGrid.DepthGrid(0., 30., 1.E-3)
+print("    ----> __repr__:")
+print(repr(iGrid))
+print("    ----> __str__:")
+print(iGrid)
+try:
+    DepthGrid.DepthGrid(30., 0.)
+except DepthGrid.BadParameters:
+    print("     ---> inverted range: exception raised.")
+else:
+    raise Exception("DepthGrid accepted inverted range!")
+
+##! Compare with a uniform grid:
+DepthGridTest += 1
+print()
+print("DepthGridTest:", DepthGridTest, " compare with uniform grid.")
+zFine = np.linspace(0., 30., 300001)
+yFine = Curve(zFine)
+yMax  = np.max(yFine)
+z, y  = iGrid.getGrid(Curve, Breaks)
+ErrAd = np.max(np.abs(np.interp(zFine, z, y) - yFine)) / yMax
+zU    = np.linspace(0., 30., 1000)
+ErrU  = np.max(np.abs(np.interp(zFine, zU, Curve(zU)) - yFine)) / yMax
+print("     ---> adaptive:", len(z), "points, max relative error", ErrAd)
+print("     ---> uniform :", len(zU), "points, max relative error", ErrU)
+nPeak = np.count_nonzero(np.abs(z - Pars[2]) < 2.)
+DensPeak  = nPeak / 4.
+DensPlat  = (len(z) - nPeak) / 26.
+print("     ---> points per cm within 2 cm of r0, elsewhere:", \
+      DensPeak, DensPlat)
+if np.any(np.diff(z) <= 0.) or not np.array_equal(y, Curve(z)):
+    raise Exception("DepthGrid grid not increasing or values wrong!")
+if ErrAd > 1.E-3 or len(z) >= len(zU) // 2:
+    raise Exception("DepthGrid not more efficient than uniform grid!")
+if DensPeak < 3.*DensPlat:
+    raise Exception("DepthGrid not refined around r0!")
+
+##! Check integral and point budget:
+DepthGridTest += 1
+print()
+print("DepthGridTest:", DepthGridTest, " check integral and point budget.")
+IFine = np.sum(0.5*(yFine[1:] + yFine[:-1]) * np.diff(zFine))
+IAd   = iGrid.integrate(Curve, Breaks)
+print("     ---> integral, adaptive / fine - 1:", IAd/IFine - 1.)
+if abs(IAd/IFine - 1.) > 1.E-3:
+    raise Exception("DepthGrid integral wrong!")
+z, y = DepthGrid.DepthGrid(0., 30., 1.E-8, _nMax=500).getGrid(Curve, Breaks)
+print("     ---> rtol = 1E-8 with nMax = 500:", len(z), "points")
+if len(z) > 500:
+    raise Exception("DepthGrid exceeded point budget!")
+
+
+##! Complete:
+print()
+print("========  DepthGrid: tests complete  ========")
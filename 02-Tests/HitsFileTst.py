@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "HitsFile" class ... streaming hits.dat reader
+===========================
+
+  HitsFile.py -- set "relative" path to code
+
+"""
+
+import os
+import shutil
+import tempfile
+import numpy  as np
+import pandas as pnds
+
+import HitsFile as HitsFile
+
+
+##! Start:
+print("========  HitsFile: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, '81-Anthea/hits.dat')
+
+##! Check built-in methods:
+HitsFileTest = 1
+print()
+print("HitsFileTest:", HitsFileTest, " check built-in methods.")
+iHits = HitsFile.HitsFile(filename, 5000)
+print("    ----> __repr__:")
+print(repr(iHits))
+print("    ----> __str__:")
+print(iHits)
+
+##! Check only requested columns are parsed:
+HitsFileTest += 1
+print()
+print("HitsFileTest:", HitsFileTest, " check column selection.")
+nRows = 0
+for Chunk in iHits.readChunks(('Depth', 'Edep')):
+    if list(Chunk.columns) != ['Edep', 'Depth'] or len(Chunk) > 5000:
+        raise Exception("HitsFile.readChunks returned wrong chunk!")
+    nRows += len(Chunk)
+print("     ---> rows read:", nRows)
+
+##! Check streamed station sums against a full in-memory read:
+HitsFileTest += 1
+print()
+print("HitsFileTest:", HitsFileTest, " check streamed station sums.")
+Data = pnds.read_csv(filename, sep=r'\s+', names=HitsFile.HitsFile.Columns, \
+                     skiprows=1)
+if len(Data) != nRows:
+    raise Exception("HitsFile.readChunks lost rows!")
+Ref   = Data.groupby('Depth', sort=False)['Edep'].sum()
+Depth, Edep = iHits.getStationSums()
+print("     ---> Depth:", Depth)
+print("     --->  Edep:", Edep)
+if not (np.array_equal(Depth, Ref.index.to_numpy()) and \
+        np.allclose(Edep, Ref.to_numpy(), rtol=1.E-12)):
+    raise Exception("HitsFile.getStationSums disagrees with full read!")
+
+
+##! Check per-station aggregation on shuffled (unsorted) hits:
+HitsFileTest += 1
+print()
+print("HitsFileTest:", HitsFileTest, " check aggregation of unsorted hits.")
+Shuffled = Data.sample(frac=1., random_state=1)
+tmpdir   = tempfile.mkdtemp()
+tmpfile  = os.path.join(tmpdir, 'hits.dat')
+with open(tmpfile, 'w') as f:
+    f.write("header\n")
+    Shuffled.to_csv(f, sep='\t', header=False, index=False)
+nEvents  = 10000
+Stations = HitsFile.HitsFile(tmpfile, 7000).getStations('StN', nEvents)
+print(Stations)
+PerEvent = Data.groupby(['StN', 'EventN'])['Edep'].sum()
+for StN, Row in Stations.iterrows():
+    Sel  = Data[Data['StN'] == StN]
+    Evts = PerEvent.loc[StN].to_numpy()
+    Evts = np.concatenate([Evts, np.zeros(nEvents-len(Evts))])
+    if not (Row['Depth'] == Sel['Depth'].iloc[0] and \
+            Row['nHits'] == len(Sel) and \
+            Row['nEvents'] == Sel['EventN'].nunique() and \
+            np.isclose(Row['Edep'], Sel['Edep'].sum(), rtol=1.E-12) and \
+            np.isclose(Row['EdepMean'], Evts.mean(), rtol=1.E-12) and \
+            np.isclose(Row['EdepStd'], Evts.std(), rtol=1.E-9)):
+        raise Exception("HitsFile.getStations wrong for station " + StN)
+if list(Stations.index) != list(Shuffled['StN'].unique()):
+    raise Exception("HitsFile.getStations stations not in file order!")
+shutil.rmtree(tmpdir)
+
+
+##! Check binary columnar cache:
+HitsFileTest += 1
+print()
+print("HitsFileTest:", HitsFileTest, " check binary columnar cache.")
+tmpdir  = tempfile.mkdtemp()
+tmpfile = os.path.join(tmpdir, 'hits.dat')
+shutil.copy(filename, tmpfile)
+iCached = HitsFile.HitsFile(tmpfile, 7000, _cache=True)
+if iCached.isCacheValid():
+    raise Exception("HitsFile cache valid before it was written!")
+StCached = iCached.getStations('StN', nEvents)
+StText   = HitsFile.HitsFile(tmpfile, 7000).getStations('StN', nEvents)
+print(StCached)
+if not iCached.isCacheValid():
+    raise Exception("HitsFile cache not written!")
+Cache, Names = HitsFile.loadColumns(iCached.getCacheDir())
+for Col, dt in HitsFile.HitsFile.CacheColumns.items():
+    print("     --->", Col, Cache[Col].dtype, Cache[Col].shape, \
+          type(Cache[Col]).__name__)
+    if Cache[Col].dtype != dt or len(Cache[Col]) != len(Data) or \
+       not isinstance(Cache[Col], np.memmap):
+        raise Exception("HitsFile cache column " + Col + " is wrong!")
+if list(StCached.index) != list(StText.index) or \
+   not np.array_equal(StCached['nHits'], StText['nHits']) or \
+   not np.allclose(StCached[['Depth', 'Edep', 'EdepMean', 'EdepStd']], \
+                   StText[['Depth', 'Edep', 'EdepMean', 'EdepStd']], \
+                   rtol=1.E-6):
+    raise Exception("HitsFile cached and text stations disagree!")
+
+#.. Changing the hits file invalidates the cache:
+with open(tmpfile, 'a') as f:
+    f.write("St9_H\t0\t1\t1.0\t0.\t0.\t0.\t300.\t0.\n")
+if iCached.isCacheValid():
+    raise Exception("HitsFile cache still valid after file changed!")
+StCached = iCached.getStations('StN', nEvents)
+if 'St9_H' not in StCached.index or not iCached.isCacheValid():
+    raise Exception("HitsFile cache not rebuilt after file changed!")
+
+#.. A corrupt meta.json invalidates the cache:
+with open(os.path.join(iCached.getCacheDir(), 'meta.json'), 'w') as f:
+    f.write('{"Version": ')
+if iCached.isCacheValid():
+    raise Exception("HitsFile cache valid with corrupt meta.json!")
+StCached = iCached.getStations('StN', nEvents)
+print("     ---> corrupt meta.json: cache rebuilt")
+if 'St9_H' not in StCached.index or not iCached.isCacheValid():
+    raise Exception("HitsFile cache not rebuilt after corrupt meta.json!")
+shutil.rmtree(tmpdir)
+
+
+##! Complete:
+print()
+print("========  HitsFile: tests complete  ========")
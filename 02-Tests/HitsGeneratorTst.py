@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "HitsGenerator" class ... synthetic hits files
+===========================
+
+  HitsGenerator.py -- set "relative" path to code
+
+"""
+
+import os
+import shutil
+import tempfile
+import numpy  as np
+
+import HitsFile      as HitsFile
+import HitsGenerator as HitsGenerator
+
+
+##! Start:
+print("========  HitsGenerator: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+TmpDir    = tempfile.mkdtemp()
+nEvents   = 20000
+
+##! Check built-in methods:
+HitsGeneratorTest = 1
+print()
+print("HitsGeneratorTest:", HitsGeneratorTest, " check built-in methods.")
+iGen = HitsGenerator.HitsGenerator(filename, _Seed=1)
+print("    ----> __repr__:")
+print(repr(iGen))
+print("    ----> __str__:")
+print(iGen)
+try:
+    HitsGenerator.HitsGenerator(filename, _Efficiency=0.)
+except HitsGenerator.BadParameters:
+    print("     ---> zero efficiency: exception raised.")
+else:
+    raise Exception("HitsGenerator accepted zero efficiency!")
+
+##! Check text file is read by HitsFile and reproduces the Bortfeldt curve:
+HitsGeneratorTest += 1
+print()
+print("HitsGeneratorTest:", HitsGeneratorTest, " check text file.")
+TextFile = os.path.join(TmpDir, 'hits.dat')
+nRows    = iGen.writeText(TextFile, nEvents, 7000)
+Text     = HitsFile.HitsFile(TextFile).getStations('StN', nEvents)
+print(Text)
+Ratio = Text['Edep'].to_numpy() / (nEvents*iGen.getMeanChord()) \
+        / iGen.getExpected()
+print("     ---> rows:", nRows, " Edep / expected:", Ratio)
+if nRows != Text['nHits'].sum() or list(Text.index) != \
+   list(iGen.getStations()):
+    raise Exception("HitsGenerator text file read back wrong!")
+if np.any(np.abs(Ratio - 1.) > 0.02):
+    raise Exception("HitsGenerator Edep does not follow Bortfeldt curve!")
+if abs(iGen.getMeanChord() - np.pi*0.0125/2.) > 1.E-12:
+    raise Exception("HitsGenerator mean chord is not pi r/2!")
+Anthea = Text['Edep'].to_numpy() / (nEvents*4.*0.0125/np.pi) \
+         / iGen.getExpected()
+print("     ---> Edep / expected with the Data_Edep chord:", Anthea)
+if np.any(np.abs(Anthea/(np.pi**2/8.) - 1.) > 0.02):
+    raise Exception("HitsGenerator Data_Edep chord factor not pi^2/8!")
+
+##! Check binary cache matches the text file:
+HitsGeneratorTest += 1
+print()
+print("HitsGeneratorTest:", HitsGeneratorTest, " check binary cache.")
+BinFile = os.path.join(TmpDir, 'bin.dat')
+if iGen.writeBinary(BinFile, nEvents, 7000) != nRows:
+    raise Exception("HitsGenerator binary and text row counts differ!")
+iBin = HitsFile.HitsFile(BinFile)
+print("     ---> text file written:", os.path.exists(BinFile), \
+      " cache valid:", iBin.isCacheValid())
+Bin = iBin.getStations('StN', nEvents)
+if os.path.exists(BinFile) or not iBin.getCache() or \
+   not np.array_equal(Bin['nHits'], Text['nHits']) or \
+   not np.allclose(Bin['Edep'], Text['Edep'], rtol=1.E-5):
+    raise Exception("HitsGenerator binary cache differs from text file!")
+
+##! Check reproducibility:
+HitsGeneratorTest += 1
+print()
+print("HitsGeneratorTest:", HitsGeneratorTest, " check seeding.")
+First  = next(iGen.generateChunks(1000))
+Again  = next(HitsGenerator.HitsGenerator(filename, _Seed=1) \
+              .generateChunks(1000))
+Other  = next(HitsGenerator.HitsGenerator(filename, _Seed=2) \
+              .generateChunks(1000))
+print("     ---> same seed equal:", First.equals(Again), \
+      " other seed equal:", First.equals(Other))
+if not First.equals(Again) or First.equals(Other):
+    raise Exception("HitsGenerator seeding not reproducible!")
+
+shutil.rmtree(TmpDir)
+
+
+##! Complete:
+print()
+print("========  HitsGenerator: tests complete  ========")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for start-up cost of the 01-Code physics modules
+===========================
+
+  Imports MCS, dEdx and Bortfeldt, and builds one instance of each from the
+  parameter file, in a fresh interpreter.  Fails if pandas or scipy is
+  imported on the way, or if the best of nRuns start-ups takes longer than
+  ImportBudget seconds.
+
+"""
+
+import os
+import subprocess
+import sys
+
+ImportBudget = 0.3               #.. s; pandas alone takes longer than this
+nRuns        = 3
+
+Probe = """
+import sys, time
+t0 = time.perf_counter()
+import MCS, dEdx, Bortfeldt
+f = sys.argv[1]
+MCS.MCS(f); dEdx.dEdx(f); Bortfeldt.Bortfeldt(f)
+t1 = time.perf_counter()
+print("TIME", t1 - t0)
+print("HEAVY", *[m for m in ("pandas", "scipy") if m in sys.modules])
+"""
+
+
+##! Start:
+print("========  ImportTime: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+
+##! Time start-up in fresh interpreters:
+ImportTimeTest = 1
+print()
+print("ImportTimeTest:", ImportTimeTest, " time start-up.")
+Times = []
+for Run in range(nRuns):
+    Out = subprocess.run([sys.executable, "-c", Probe, filename], \
+                         capture_output=True, text=True, check=True).stdout
+    for Line in Out.splitlines():
+        if Line.startswith("TIME"):
+            Times.append(float(Line.split()[1]))
+        elif Line.startswith("HEAVY"):
+            Heavy = Line.split()[1:]
+print("     ---> start-up times (s):", Times)
+print("     ---> heavy modules imported:", Heavy)
+if Heavy:
+    raise Exception("Physics modules import " + ", ".join(Heavy) + "!")
+if min(Times) > ImportBudget:
+    raise Exception("Start-up exceeds budget of " + str(ImportBudget) + " s!")
+
+
+##! Complete:
+print()
+print("========  ImportTime: tests complete  ========")
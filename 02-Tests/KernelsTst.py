@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "Kernels" module ... compiled kernel backend
+===========================
+
+  Kernels.py -- set "relative" path to code
+
+  The numba checks are skipped if numba is not installed.
+
+"""
+
+import os
+import numpy as np
+
+import Bortfeldt as Bortfeldt
+import Kernels   as Kernels
+import MCS       as MCS
+import dEdx      as dEdx
+
+
+##! Start:
+print("========  Kernels: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+iBortfeldt = Bortfeldt.Bortfeldt(filename)
+iMCS       = MCS.MCS(filename)
+idEdx      = dEdx.dEdx(filename)
+
+##! Check backend selection:
+KernelsTest = 1
+print()
+print("KernelsTest:", KernelsTest, " check backend selection.")
+print("     ---> numba available:", Kernels.isAvailable(), \
+      " backend:", Kernels.getBackend())
+if os.getenv('BraggBACKEND') is None and Kernels.getBackend() != 'numpy':
+    raise Exception("Kernels default backend not numpy!")
+try:
+    Kernels.setBackend('fortran')
+except Kernels.BadParameters:
+    print("     ---> unknown backend: exception raised.")
+else:
+    raise Exception("Kernels accepted unknown backend!")
+Kernels.setBackend('numpy')
+if Kernels.getBackend() != 'numpy' or Kernels.get() is not None:
+    raise Exception("Kernels numpy backend not selected!")
+Kernels.setBackend('auto')
+if Kernels.getBackend() != ('numba' if Kernels.isAvailable() else 'numpy'):
+    raise Exception("Kernels auto backend wrong!")
+
+##! Check compiled kernels against numpy:
+KernelsTest += 1
+print()
+print("KernelsTest:", KernelsTest, " check compiled kernels against numpy.")
+Pars = (1., 0.1, 27.5, 0.012, 0.35)
+z    = np.linspace(0., 30., 3001)
+z2   = z[1:].reshape(3, -1)
+zPre = z[z < 24.]
+T    = np.concatenate((np.geomspace(0.01, 500., 200), [-1.]))
+x    = np.full(len(T)-1, 0.1)
+Cases = {'bragg_vec': lambda: iBortfeldt.bragg_vec(z, *Pars), \
+         'bragg_vec 2-d': lambda: iBortfeldt.bragg_vec(z2, *Pars), \
+         'prebragg' : lambda: iBortfeldt.prebragg(zPre, *Pars[:4]), \
+         'peak'     : lambda: iBortfeldt.peak(z[2300:2800], *Pars), \
+         'peak outside tables': lambda: iBortfeldt.peak(z[2350:2400], \
+                                                        *Pars), \
+         'getTheta0': lambda: iMCS.getTheta0(x, T[:-1]), \
+         'getdEdx'  : lambda: idEdx.getdEdx(T)}
+if not Kernels.isAvailable():
+    print("     ---> numba not installed, skipped.")
+else:
+    for Name, Case in Cases.items():
+        Kernels.setBackend('numpy')
+        Ref = Case()
+        Kernels.setBackend('numba')
+        Ans = Case()
+        Finite = np.isfinite(Ref)
+        RelErr = np.max(np.abs(Ans[Finite] - Ref[Finite]) / \
+                        np.maximum(np.abs(Ref[Finite]), 1.E-300))
+        print("     --->", Name, ": max relative difference", RelErr)
+        if Ans.shape != Ref.shape or \
+           not np.array_equal(Finite, np.isfinite(Ans)) or RelErr > 1.E-12:
+            raise Exception("Kernels compiled " + Name + \
+                            " disagrees with numpy!")
+    if not isinstance(iMCS.getTheta0(0.1, 100.), float):
+        raise Exception("Kernels scalar getTheta0 not a float!")
+Kernels.setBackend('numpy')
+
+
+##! Complete:
+print()
+print("========  Kernels: tests complete  ========")
@@ -9,6 +9,8 @@ Test script for "MCS" class ... initialisation and get methods
 """
 
 import os
+import pickle
+import numpy as np
 
 import MCS as MCS
 
@@ -16,19 +18,24 @@ import MCS as MCS
 ##! Start:
 print("========  MCS: tests start  ========")
 
-##! Test singleton class feature:
+##! Test that instances hold their own parameters:
 MCSTest = 1
 print()
-print("MCSTest:", MCSTest, " check if class is a singleton.")
+print("MCSTest:", MCSTest, " check instances are independent.")
 BraggPATH = os.getenv('BraggPATH')
 print(BraggPATH)
 filename  = os.path.join(BraggPATH, \
                          '11-BraggParameters/BraggParameters.csv')
+filePMMA  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters-PMMA.csv')
 iMCS  = MCS.MCS(filename)
-iMCS1 = MCS.MCS(filename)
-print("    iMCS singleton test -- OK if 0:", id(iMCS)-id(iMCS1))
-if iMCS != iMCS1:
-    raise Exception("MCS is not a singleton class!")
+iMCS1 = MCS.MCS(filePMMA)
+print("    ---> water, PMMA getrho:", iMCS.getrho(), iMCS1.getrho())
+if iMCS is iMCS1 or iMCS.getrho() == iMCS1.getrho():
+    raise Exception("MCS instances share parameters!")
+iMCS2 = pickle.loads(pickle.dumps(iMCS))
+if iMCS2.getrho() != iMCS.getrho():
+    raise Exception("MCS parameters lost on pickling!")
 
 
 ##! Check built-in methods:
@@ -61,6 +68,37 @@ Yplane = iMCS.getYplane(x, K)
 print("     ---> x =", x, " cm; K =", K, " MeV: Yplane =", Yplane)
 
 
+##! Check array evaluation of theta0 and Yplane:
+MCSTest += 1
+print()
+print("MCSTest:", MCSTest, " check array evaluation of theta0 and Yplane.")
+x = np.linspace(0.1, 10., 7)
+K = np.linspace(50., 250., 5)
+Theta0 = iMCS.getTheta0(x[:,None], K[None,:])
+Yplane = iMCS.getYplane(x[:,None], K[None,:])
+print("     ---> shape:", Theta0.shape, Yplane.shape)
+for i in range(len(x)):
+    for j in range(len(K)):
+        if not (np.isclose(Theta0[i,j], iMCS.getTheta0(x[i], K[j]), \
+                           rtol=1.E-14, atol=0.) and \
+                np.isclose(Yplane[i,j], iMCS.getYplane(x[i], K[j]), \
+                           rtol=1.E-14, atol=0.)):
+            raise Exception("MCS array evaluation disagrees with scalar!")
+if not isinstance(iMCS.getTheta0(10., 100.), float):
+    raise Exception("MCS.getTheta0 scalar call did not return a float!")
+try:
+    iMCS.getTheta0("10.", 100.)
+    raise Exception("MCS.getTheta0 accepted a string!")
+except MCS.BadParameters:
+    print("     ---> non-numeric argument rejected")
+for Bad in (10.+0.j, np.array([10., 20.], dtype=complex), True):
+    try:
+        iMCS.getTheta0(Bad, 100.)
+        raise Exception("MCS.getTheta0 accepted " + repr(Bad) + "!")
+    except MCS.BadParameters:
+        print("     --->", repr(Bad), "rejected")
+
+
 ##! Complete:
 print()
 print("========  MCS: tests complete  ========")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "ParabolicCylinderD" class ... tabulated D_v(x)
+===========================
+
+  ParabolicCylinderD.py -- set "relative" path to code
+
+"""
+
+import numpy as np
+from scipy import special
+
+import ParabolicCylinderD as PCD
+
+
+##! Start:
+print("========  ParabolicCylinderD: tests start  ========")
+
+v = -1./1.77
+
+##! Check built-in methods:
+PCDTest = 1
+print()
+print("PCDTest:", PCDTest, " check built-in methods.")
+iPCD = PCD.ParabolicCylinderD(v)
+print("    ----> __repr__:")
+print(repr(iPCD))
+print("    ----> __str__:")
+print(iPCD)
+try:
+    PCD.ParabolicCylinderD(v, 5., -10.)
+except PCD.BadParameters:
+    print("     ---> inverted grid: exception raised.")
+else:
+    raise Exception("ParabolicCylinderD accepted inverted grid!")
+
+##! Compare with scipy.special.pbdv:
+PCDTest += 1
+print()
+print("PCDTest:", PCDTest, " compare with scipy.special.pbdv.")
+x = np.linspace(-12., 7., 20001)
+for Order in (v, v-1.):
+    D,  Dd  = PCD.pbdv(Order, x)
+    De, Dde = special.pbdv(Order, x)
+    Scale   = np.maximum(np.abs(De), np.abs(Dde))
+    DevD    = np.max(np.abs(D  - De ) / Scale)
+    DevDd   = np.max(np.abs(Dd - Dde) / Scale)
+    print("     ---> v =", Order, ": max relative deviation D, D':", \
+          DevD, DevDd)
+    if DevD > 1.E-7 or DevDd > 1.E-7:
+        raise Exception("Tabulated D_v deviates from pbdv!")
+    Out = (x < -10.) | (x > 5.)
+    if not (np.array_equal(D[Out], De[Out]) and \
+            np.array_equal(Dd[Out], Dde[Out])):
+        raise Exception("Fallback outside table not exact!")
+
+##! Check scalar argument and cache bound:
+PCDTest += 1
+print()
+print("PCDTest:", PCDTest, " check scalar argument and cache.")
+D, Dd = PCD.pbdv(v, 1.)
+print("     ---> D_v(1), D_v'(1):", D, Dd)
+if np.ndim(D) != 0 or not np.isclose(D, special.pbdv(v, 1.)[0]):
+    raise Exception("Scalar evaluation wrong!")
+for i in range(PCD.ParabolicCylinderD.MaxTables + 4):
+    PCD.pbdv(-0.1*i, 0.)
+print("     ---> tables held:", len(PCD._Tables))
+if len(PCD._Tables) > PCD.ParabolicCylinderD.MaxTables:
+    raise Exception("Table cache not bounded!")
+
+
+##! Complete:
+print()
+print("========  ParabolicCylinderD: tests complete  ========")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "PencilBeam" class ... Monte Carlo pencil-beam transport
+===========================
+
+  PencilBeam.py -- set "relative" path to code
+
+"""
+
+import os
+import numpy as np
+
+import MCS         as MCS
+import dEdx        as dEdx
+import PencilBeam  as PencilBeam
+import RangeEnergy as RangeEnergy
+
+
+##! Start:
+print("========  PencilBeam: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+iMCS  = MCS.MCS(filename)
+idEdx = dEdx.dEdx(filename)
+T0    = 200.
+nProt = 4000
+
+##! Check built-in methods:
+PencilBeamTest = 1
+print()
+print("PencilBeamTest:", PencilBeamTest, " check built-in methods.")
+iPB = PencilBeam.PencilBeam(iMCS, idEdx)
+print("    ----> __repr__:")
+print(repr(iPB))
+print("    ----> __str__:")
+print(iPB)
+try:
+    PencilBeam.PencilBeam(iMCS, idEdx, _dx=0.)
+except PencilBeam.BadParameters:
+    print("     ---> zero step: exception raised.")
+else:
+    raise Exception("PencilBeam accepted zero step!")
+
+##! Check energy conservation and streams:
+PencilBeamTest += 1
+print()
+print("PencilBeamTest:", PencilBeamTest, " check energy and streams.")
+Res   = iPB.run(T0, nProt, _Seed=1, _nStreams=4)
+Total = Res['Edep'].sum() + Res['Outside'] + Res['Nuclear']
+print("     ---> deposited + outside + nuclear / incident - 1:", \
+      Total/(nProt*T0) - 1.)
+if abs(Total/(nProt*T0) - 1.) > 1.E-12:
+    raise Exception("PencilBeam does not conserve energy!")
+Par   = iPB.run(T0, nProt, _Seed=1, _nStreams=4, _nWorkers=2)
+print("     ---> 2 workers same as 1:", \
+      np.array_equal(Par['Edep'], Res['Edep']))
+if not np.array_equal(Par['Edep'], Res['Edep']) or \
+   not np.array_equal(Par['Range'], Res['Range'], equal_nan=True):
+    raise Exception("PencilBeam result depends on number of workers!")
+DepthDose = iPB.getDepthDose(Res)
+zBins     = iPB.getEdges()[2]
+print("     ---> Bragg peak at", zBins[np.argmax(DepthDose)], "cm")
+
+##! Check range and straggling against CSDA range:
+PencilBeamTest += 1
+print()
+print("PencilBeamTest:", PencilBeamTest, " check range.")
+iPB0  = PencilBeam.PencilBeam(iMCS, idEdx, _beta=0.)
+Range = iPB0.run(T0, nProt, _Seed=2)['Range']
+Rcsda = RangeEnergy.RangeEnergy(idEdx).getRange(T0)
+print("     ---> mean range, CSDA range, straggling:", np.mean(Range), \
+      Rcsda, np.std(Range))
+if abs(np.mean(Range)/Rcsda - 1.) > 0.005 or \
+   not 0.005 < np.std(Range)/Rcsda < 0.02:
+    raise Exception("PencilBeam range or straggling wrong!")
+
+##! Check lateral spread against Highland:
+PencilBeamTest += 1
+print()
+print("PencilBeamTest:", PencilBeamTest, " check lateral spread.")
+iFine = PencilBeam.PencilBeam(iMCS, idEdx, _beta=0., \
+            _Grid=((-0.1, 0.1, 80), (-0.1, 0.1, 80), (0., 5., 50)))
+Fine  = iFine.run(T0, nProt, _Seed=3)
+xBins = iFine.getEdges()[0]
+x     = 0.5*(xBins[1:] + xBins[:-1])
+Lat   = iFine.getLateral(Fine, 4.95)
+rms   = np.sqrt(np.sum(Lat*x**2) / np.sum(Lat))
+print("     ---> rms at 4.95 cm, Highland:", rms, \
+      iMCS.getYplane(4.95, T0))
+if abs(rms/iMCS.getYplane(4.95, T0) - 1.) > 0.1:
+    raise Exception("PencilBeam lateral spread disagrees with Highland!")
+
+
+##! Complete:
+print()
+print("========  PencilBeam: tests complete  ========")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "RangeEnergy" class ... CSDA range-energy tables
+===========================
+
+  RangeEnergy.py -- set "relative" path to code
+
+"""
+
+import os
+import numpy as np
+
+import MCS         as MCS
+import dEdx        as dEdx
+import Bortfeldt   as Bortfeldt
+import Transport   as Transport
+import RangeEnergy as RangeEnergy
+
+
+##! Start:
+print("========  RangeEnergy: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+idEdx = dEdx.dEdx(filename)
+iBrt  = Bortfeldt.Bortfeldt(filename)
+
+##! Check built-in methods:
+RangeEnergyTest = 1
+print()
+print("RangeEnergyTest:", RangeEnergyTest, " check built-in methods.")
+iRE = RangeEnergy.RangeEnergy(idEdx)
+print("    ----> __repr__:")
+print(repr(iRE))
+print("    ----> __str__:")
+print(iRE)
+try:
+    RangeEnergy.RangeEnergy()
+except RangeEnergy.BadParameters:
+    print("     ---> no dEdx or Bortfeldt instance: exception raised.")
+else:
+    raise Exception("RangeEnergy without parameters accepted!")
+
+##! Check table against a finer integration:
+RangeEnergyTest += 1
+print()
+print("RangeEnergyTest:", RangeEnergyTest, " check table convergence.")
+iREf = RangeEnergy.RangeEnergy(idEdx, _nT=20001)
+T    = np.array([2., 10., 70., 150., 230., 900.])
+Dev  = np.abs(iRE.getRange(T)/iREf.getRange(T) - 1.)
+print("     ---> max relative deviation from fine table:", Dev.max())
+if Dev.max() > 1.E-4:
+    raise Exception("RangeEnergy table not converged!")
+
+##! Check CSDA range against stepping:
+RangeEnergyTest += 1
+print()
+print("RangeEnergyTest:", RangeEnergyTest, " compare with Transport.")
+iTrns  = Transport.Transport(MCS.MCS(filename), idEdx)
+T0s    = np.array([70., 150., 230.])
+dx     = 0.01
+Trends = iTrns.getTrends(T0s, dx, dx/2.)
+nSteps = np.sum(~np.isnan(Trends['T']), axis=0)
+Depth  = nSteps * dx
+R      = iRE.getRange(T0s)
+for i in range(len(T0s)):
+    print("     ---> T0 =", T0s[i], " MeV: CSDA range =", R[i], \
+          " cm, stepped depth =", Depth[i], "cm")
+if not np.allclose(R, Depth, rtol=0.01):
+    raise Exception("CSDA range disagrees with stepping!")
+
+##! Check inverse lookup:
+RangeEnergyTest += 1
+print()
+print("RangeEnergyTest:", RangeEnergyTest, " check inverse lookup.")
+T = np.geomspace(0.1, 2000., 1001)
+Tback = iRE.getEnergy(iRE.getRange(T))
+print("     ---> max relative round-trip error:", \
+      np.max(np.abs(Tback/T - 1.)))
+if not np.allclose(Tback, T, rtol=1.E-10):
+    raise Exception("RangeEnergy inverse lookup wrong!")
+if np.any(np.diff(iRE.getRange(T)) <= 0.):
+    raise Exception("RangeEnergy range not monotonic!")
+
+##! Check scalar lookups below and above the table:
+RangeEnergyTest += 1
+print()
+print("RangeEnergyTest:", RangeEnergyTest, " check scalars off the table.")
+for Ts in (0.5, 2000.):
+    Rs = iRE.getRange(Ts)
+    print("     ---> T =", Ts, " MeV: range =", Rs, "cm")
+    if np.ndim(Rs) != 0 or not np.isclose(Rs, \
+       iRE.getRange(np.array([Ts]))[0], rtol=1.E-12):
+        raise Exception("RangeEnergy scalar range off table wrong!")
+    if not np.isclose(iRE.getEnergy(Rs), Ts, rtol=1.E-10):
+        raise Exception("RangeEnergy scalar inverse off table wrong!")
+Ts = iRE.getEnergy(1.E-6)
+print("     ---> R = 1E-6 cm: energy =", Ts, "MeV")
+if np.ndim(Ts) != 0 or not 0. < Ts < iRE.getTable()[0][0]:
+    raise Exception("RangeEnergy scalar energy below table wrong!")
+
+##! Check Bragg-Kleeman fallback:
+RangeEnergyTest += 1
+print()
+print("RangeEnergyTest:", RangeEnergyTest, " check Bragg-Kleeman mode.")
+iBK = RangeEnergy.RangeEnergy(_iBortfeldt=iBrt)
+print(iBK)
+R   = iBK.getRange(200.)
+print("     ---> T = 200 MeV: range =", R, "cm")
+if not np.isclose(R, iBrt.getalpha()*200.**iBrt.getRangeEnergy()):
+    raise Exception("Bragg-Kleeman range wrong!")
+if not np.allclose(iBK.getEnergy(iBK.getRange(T)), T):
+    raise Exception("Bragg-Kleeman inverse wrong!")
+if iBK.getTable() is not None:
+    raise Exception("Bragg-Kleeman mode returned a table!")
+
+
+##! Complete:
+print()
+print("========  RangeEnergy: tests complete  ========")
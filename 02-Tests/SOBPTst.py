@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "SOBP" class ... spread-out Bragg peak weights
+===========================
+
+  SOBP.py -- set "relative" path to code
+
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+
+import BraggLibrary as BraggLibrary
+import SOBP         as SOBP
+
+
+##! Start:
+print("========  SOBP: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+TmpDir    = tempfile.mkdtemp()
+iLibrary  = BraggLibrary.BraggLibrary(os.path.join(TmpDir, 'Library'), \
+                                      filename)
+
+##! Check built-in methods:
+SOBPTest = 1
+print()
+print("SOBPTest:", SOBPTest, " check built-in methods.")
+iSOBP = SOBP.SOBP(iLibrary, 10., 15.)
+print("    ----> __repr__:")
+print(repr(iSOBP))
+print("    ----> __str__:")
+print(iSOBP)
+try:
+    SOBP.SOBP(iLibrary, 10., 50.)
+except SOBP.BadParameters:
+    print("     ---> target beyond library: exception raised.")
+else:
+    raise Exception("SOBP accepted target beyond library!")
+
+##! Check flat dose with both solvers:
+SOBPTest += 1
+print()
+print("SOBPTest:", SOBPTest, " check flatness.")
+Residuals = {}
+for Method in SOBP.SOBP.Methods:
+    iSOBP.setMethod(Method)
+    Weights  = iSOBP.optimise()
+    Residual = np.linalg.norm(iSOBP.getMatrix() @ Weights - 1.)
+    Residuals[Method] = Residual
+    print("     --->", Method, ": flatness", iSOBP.getFlatness(), \
+          " residual", Residual, " iterations", iSOBP.getnIter())
+    if np.any(Weights < 0.) or iSOBP.getFlatness() > 0.01:
+        raise Exception("SOBP dose not flat!")
+if Residuals['pg'] > 1.5*Residuals['nnls']:
+    raise Exception("SOBP projected gradient not converged!")
+z = np.array([5., 12.5, 17.])
+Dose = iSOBP.getSOBPDose(z)
+print("     ---> dose at", z, "cm:", Dose)
+if not (Dose[0] < 0.9 and abs(Dose[1] - 1.) < 0.01 and Dose[2] < 0.1):
+    raise Exception("SOBP dose outside target wrong!")
+
+##! Check many layers:
+SOBPTest += 1
+print()
+print("SOBPTest:", SOBPTest, " check hundreds of layers.")
+iSOBP = SOBP.SOBP(iLibrary, 5., 30., _nLayers=300, _Dose=2., _Method='pg')
+t0    = time.perf_counter()
+iSOBP.optimise()
+Time  = time.perf_counter() - t0
+print("     --->", iSOBP.getnLayers(), "layers,", len(iSOBP.getDepths()), \
+      "depths: flatness", iSOBP.getFlatness(), " time", Time, "s")
+if iSOBP.getFlatness() > 0.01 or Time > 10.:
+    raise Exception("SOBP with many layers failed!")
+
+##! Check layers with no dose at the target depths:
+SOBPTest += 1
+print()
+print("SOBPTest:", SOBPTest, " check zero dose-influence columns.")
+A = iSOBP.getMatrix()
+A[:, ::2] = 0.
+Weights, nIter = SOBP._projectedGradient(A, np.full(A.shape[0], 2.), \
+                                         1.E-6, 20000)
+print("     ---> weights finite:", np.all(np.isfinite(Weights)), \
+      " zero-column weights:", np.abs(Weights[::2]).max())
+if not np.all(np.isfinite(Weights)) or np.any(Weights[::2] != 0.):
+    raise Exception("SOBP zero columns not skipped!")
+try:
+    SOBP._projectedGradient(np.zeros_like(A), np.ones(A.shape[0]), \
+                            1.E-6, 100)
+except SOBP.BadParameters:
+    print("     ---> all columns zero: exception raised.")
+else:
+    raise Exception("SOBP accepted a zero dose-influence matrix!")
+
+shutil.rmtree(TmpDir)
+
+
+##! Complete:
+print()
+print("========  SOBP: tests complete  ========")
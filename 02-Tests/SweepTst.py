@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "Sweep" class ... parallel sweep runner with result store
+===========================
+
+  Sweep.py -- set "relative" path to code
+
+"""
+
+import shutil
+import tempfile
+import numpy  as np
+import pandas as pnds
+
+import Sweep as Sweep
+
+
+##! Start:
+print("========  Sweep: tests start  ========")
+
+TmpDir = tempfile.mkdtemp()
+
+##! Check built-in methods:
+SweepTest = 1
+print()
+print("SweepTest:", SweepTest, " check built-in methods.")
+iSweep = Sweep.Sweep(TmpDir, 2, 3)
+print("    ----> __repr__:")
+print(repr(iSweep))
+print("    ----> __str__:")
+print(iSweep)
+try:
+    Sweep.grid(Energy=[100.])
+except Sweep.BadParameters:
+    print("     ---> unknown axis: exception raised.")
+else:
+    raise Exception("Sweep accepted unknown axis!")
+
+##! Check configuration keys:
+SweepTest += 1
+print()
+print("SweepTest:", SweepTest, " check configuration keys.")
+Key = Sweep.configKey({'T0': 150})
+print("     ---> key of T0=150:", Key)
+if Key != Sweep.configKey({'T0': 150., 'Material': 'water'}) or \
+   Key == Sweep.configKey({'T0': 150., 'Seed': 1}):
+    raise Exception("Sweep configuration keys wrong!")
+
+##! Run a sweep in parallel:
+SweepTest += 1
+print()
+print("SweepTest:", SweepTest, " run sweep.")
+Configs = Sweep.grid(T0=[70., 100.], Material=['water', 'PMMA'], \
+                     nProtons=[300])
+Results = iSweep.run(Configs)
+print(Results[['T0', 'Material', 'Rcsda', 'RMC', 'r0', 'sigma']])
+if iSweep.getnRun() != 4 or len(Results) != 4 or \
+   not np.array_equal(Results['T0'], [70., 70., 100., 100.]):
+    raise Exception("Sweep did not run all configurations!")
+if np.any(np.abs(Results['r0']/Results['RMC'] - 1.) > 0.02):
+    raise Exception("Sweep fitted range disagrees with Monte Carlo!")
+
+##! Resume, with one new point:
+SweepTest += 1
+print()
+print("SweepTest:", SweepTest, " resume sweep.")
+More    = Configs + Sweep.grid(T0=[85.], nProtons=[300])
+Resumed = iSweep.run(More)
+Store   = pnds.read_parquet(TmpDir)
+print("     ---> configurations run:", iSweep.getnRun(), \
+      " rows in store:", len(Store))
+if iSweep.getnRun() != 1 or len(Resumed) != 5 or len(Store) != 5 or \
+   not Resumed.loc[Results.index].equals(Results):
+    raise Exception("Sweep did not resume correctly!")
+
+##! A failing configuration does not stop the others:
+SweepTest += 1
+print()
+print("SweepTest:", SweepTest, " check failing configuration.")
+Bad     = Sweep.grid(T0=[60.], Material=['nosuch', 'water'], nProtons=[300])
+BadKey  = Sweep.configKey(Bad[0])
+for nWorkers in (2, 1):
+    iSweep.setnWorkers(nWorkers)
+    Partial = iSweep.run(Bad)
+    print("     ---> workers:", nWorkers, " failed:", \
+          list(iSweep.getFailed()), " rows returned:", len(Partial))
+    if list(iSweep.getFailed()) != [BadKey] or len(Partial) != 1 or \
+       BadKey in iSweep.getResults().index or \
+       Partial.index[0] != Sweep.configKey(Bad[1]):
+        raise Exception("Sweep failing configuration not handled!")
+
+shutil.rmtree(TmpDir)
+
+
+##! Complete:
+print()
+print("========  Sweep: tests complete  ========")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for "Transport" class ... vectorised stepping engine
+===========================
+
+  Transport.py -- set "relative" path to code
+
+"""
+
+import os
+import math as mth
+import numpy as np
+
+import MCS       as MCS
+import dEdx      as dEdx
+import Transport as Transport
+
+
+##! Start:
+print("========  Transport: tests start  ========")
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+iMCS  = MCS.MCS(filename)
+idEdx = dEdx.dEdx(filename)
+
+##! Check built-in methods:
+TransportTest = 1
+print()
+print("TransportTest:", TransportTest, " check built-in methods.")
+iTrns = Transport.Transport(iMCS, idEdx)
+print("    ----> __repr__:")
+print(repr(iTrns))
+print("    ----> __str__:")
+print(iTrns)
+
+##! Compare with scalar, one-proton-at-a-time stepping:
+TransportTest += 1
+print()
+print("TransportTest:", TransportTest, " compare with scalar stepping.")
+T0s    = np.array([60., 150., 220.])
+dx     = 0.1
+Trends = iTrns.getTrends(T0s, dx, 0.05)
+print("     ---> table shape:", Trends['T'].shape)
+for i, T0 in enumerate(T0s):
+    x = 0.05
+    T = T0
+    Step = 0
+    while T > 0.:
+        yPlane = iMCS.getYplane(x, T)
+        dE     = idEdx.getdEdx(T) * dx
+        if not np.allclose([Trends['x'][Step,i], Trends['T'][Step,i], \
+                            Trends['yPlane'][Step,i], Trends['dE'][Step,i]], \
+                           [x, T, yPlane, dE], rtol=1.E-10):
+            raise Exception("Transport disagrees with scalar stepping!")
+        x    += dx
+        T    -= dE
+        Step += 1
+    nSteps = np.sum(~np.isnan(Trends['T'][:,i]))
+    print("     ---> T0 =", T0, " MeV: steps =", nSteps, \
+          " depth reached =", x, "cm")
+    if nSteps != Step:
+        raise Exception("Transport stopped after wrong number of steps!")
+
+##! Check kinematics:
+TransportTest += 1
+print()
+print("TransportTest:", TransportTest, " check kinematics.")
+Mp = idEdx.getProjectileMass()
+T  = 100.
+bg = mth.sqrt((Mp+T)**2 - Mp**2) / Mp
+Trends = iTrns.getTrends(T, dx, 0.05)
+print("     ---> T = 100 MeV: betagamma =", Trends['betagamma'][0,0])
+if not np.isclose(Trends['betagamma'][0,0], bg) or \
+   not np.isclose(Trends['beta'][0,0]*Trends['gamma'][0,0], bg):
+    raise Exception("Transport kinematics wrong!")
+
+
+##! Complete:
+print()
+print("========  Transport: tests complete  ========")
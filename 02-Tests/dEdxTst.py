@@ -9,6 +9,9 @@ Test script for "dEdx" class ... initialisation and get methods
 """
 
 import os
+import logging
+import pickle
+import numpy as np
 
 import dEdx as dEdx
 
@@ -16,19 +19,24 @@ import dEdx as dEdx
 ##! Start:
 print("========  dEdx: tests start  ========")
 
-##! Test singleton class feature:
+##! Test that instances hold their own parameters:
 dEdxTest = 1
 print()
-print("dEdxTest:", dEdxTest, " check if class is a singleton.")
+print("dEdxTest:", dEdxTest, " check instances are independent.")
 BraggPATH = os.getenv('BraggPATH')
 print(BraggPATH)
 filename  = os.path.join(BraggPATH, \
                          '11-BraggParameters/BraggParameters.csv')
+filePMMA  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters-PMMA.csv')
 idEdx  = dEdx.dEdx(filename)
-idEdx1 = dEdx.dEdx(filename)
-print("    idEdx singleton test -- OK if 0:", id(idEdx)-id(idEdx1))
-if idEdx != idEdx1:
-    raise Exception("dEdx is not a singleton class!")
+idEdx1 = dEdx.dEdx(filePMMA)
+print("    ---> water, PMMA getrho:", idEdx.getrho(), idEdx1.getrho())
+if idEdx is idEdx1 or idEdx.getrho() == idEdx1.getrho():
+    raise Exception("dEdx instances share parameters!")
+idEdx2 = pickle.loads(pickle.dumps(idEdx))
+if idEdx2.getrho() != idEdx.getrho():
+    raise Exception("dEdx parameters lost on pickling!")
 
 
 ##! Check built-in methods:
@@ -50,6 +58,78 @@ Ans = idEdx.getdEdx(T)
 print("     ---> T =", T, " MeV: dEdx =", Ans)
 
 
+##! Check array evaluation of dEdx:
+dEdxTest += 1
+print()
+print("dEdxTest:", dEdxTest, " check array evaluation of dEdx.")
+T    = np.geomspace(0.5, 500., 25)
+dEdxArr = idEdx.getdEdx(T)
+dEdxScl = np.array([idEdx.getdEdx(Ti) for Ti in T])
+print("     ---> max relative difference:", \
+      np.max(np.abs(dEdxArr/dEdxScl - 1.)))
+if not np.allclose(dEdxArr, dEdxScl, rtol=1.E-14, atol=0.):
+    raise Exception("dEdx array evaluation disagrees with scalar!")
+
+for Bad in (100.+0.j, np.array([100.], dtype=complex), True, "100."):
+    try:
+        idEdx.getdEdx(Bad)
+        raise Exception("dEdx.getdEdx accepted " + repr(Bad) + "!")
+    except dEdx.BadParameters:
+        print("     --->", repr(Bad), "rejected")
+
+##! Check tabulated dEdx:
+dEdxTest += 1
+print()
+print("dEdxTest:", dEdxTest, " check tabulated dEdx.")
+idEdx.setdEdxTable(1., 1000., 4001)
+T       = np.geomspace(0.5, 2000., 1001)
+dEdxTab = idEdx.getdEdxInterp(T)
+RelErr  = np.max(np.abs(dEdxTab/idEdx.getdEdx(T) - 1.))
+print("     ---> max relative error:", RelErr)
+if RelErr > 1.E-5:
+    raise Exception("dEdx table interpolation not accurate enough!")
+if idEdx.getdEdxInterp(2000.) != idEdx.getdEdx(2000.):
+    raise Exception("dEdx table not exact outside tabulated range!")
+
+##! Check debug logging:
+dEdxTest += 1
+print()
+print("dEdxTest:", dEdxTest, " check debug logging.")
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.Records = []
+    def emit(self, Record):
+        self.Records.append(Record)
+Log     = logging.getLogger("dEdx")
+Handler = Records()
+Log.addHandler(Handler)
+idEdx.getdEdx(100.)
+nOff = len(Handler.Records)
+Log.setLevel(logging.DEBUG)
+idEdx.getdEdx(100.)
+Log.setLevel(logging.NOTSET)
+Log.removeHandler(Handler)
+print("     ---> records with debug off, on:", nOff, len(Handler.Records))
+if nOff != 0 or len(Handler.Records) != 1 or \
+   Handler.Records[0].getMessage() != "getdEdx; T: 100.0":
+    raise Exception("dEdx debug logging wrong!")
+
+##! Check Bohr straggling:
+dEdxTest += 1
+print()
+print("dEdxTest:", dEdxTest, " check Bohr straggling.")
+Ts     = np.array([10., 100., 200.])
+Omega2 = idEdx.getStraggling(Ts, 0.1)
+print("     ---> variance over 1 mm at T =", Ts, ":", Omega2)
+Ref    = idEdx.getK() * idEdx.getZ()/idEdx.getA() * idEdx.getrho() * \
+         idEdx.getElectronMass() * 0.1
+if not (np.all(np.diff(Omega2) > 0.) and abs(Omega2[0]/Ref - 1.) < 0.02 and \
+        idEdx.getStraggling(200., 0.1) == Omega2[2] and \
+        np.isclose(idEdx.getStraggling(200., 0.2), 2.*Omega2[2])):
+    raise Exception("dEdx Bohr straggling wrong!")
+
+
 ##! Complete:
 print()
 print("========  dEdx: tests complete  ========")
@@ -4,13 +4,19 @@
 Find trends in MCS, dEdx, and dose:
 ===================================
 
+  All initial energies are stepped together by the Transport engine; the
+  step-by-step table is printed for T0 and the depth reached for each
+  initial energy in T0s, alongside the CSDA range from RangeEnergy.
+
 """
 
 import os
-import math as mth
+import numpy as np
 
-import MCS  as mcs
-import dEdx as dedx
+import MCS         as mcs
+import dEdx        as dedx
+import Transport   as trnsprt
+import RangeEnergy as rngnrg
 
 BraggPATH = os.getenv('BraggPATH')
 filename  = os.path.join(BraggPATH, \
@@ -18,37 +24,39 @@ filename  = os.path.join(BraggPATH, \
 
 iMCS  = mcs.MCS(filename)
 idEdx = dedx.dEdx(filename)
+iTrns = trnsprt.Transport(iMCS, idEdx)
+iRE   = rngnrg.RangeEnergy(idEdx)
 
 ##! Start:
 print("========  Trend evaluation start  ========")
 
 ##! Trends as function of kinetic energy, T:
 
-T0 = 200.                #.. MeV
-x  =   0.05              #.. cm
-dx =   0.1               #.. cm
-r0 =   0.1               #.. cm
-
-T  = T0
+T0  = 200.                           #.. MeV
+T0s = np.arange(50., 251., 1.)       #.. MeV
+x   =   0.05                         #.. cm
+dx  =   0.1                          #.. cm
+r0  =   0.1                          #.. cm
 
-while T > 0.:
+Trends = iTrns.getTrends(T0s, dx, x)
 
-    #..  Calculate yplane, effective area, effective volume
-    yPlane = iMCS.getYplane(x, T)
-    dE     = idEdx.getdEdx(T) * dx
+#..  Output, T0:
+i0 = np.argmin(np.abs(T0s - T0))
+print("x, T, E, P, gamma, beta, yPlane, dE")
+for Step in range(Trends['T'].shape[0]):
+    if np.isnan(Trends['T'][Step, i0]):
+        break
+    print(*[Trends[Name][Step, i0] for Name in \
+            ('x', 'T', 'E', 'P', 'gamma', 'beta', 'yPlane', 'dE')])
 
-    E      = idEdx.getProjectileMass() + T
-    P      = mth.sqrt(E**2 - idEdx.getProjectileMass()*2)
-    gamma  = E/P
-    beta   = mth.sqrt(gamma**2 - 1.) / gamma
-    
-    #..  Output:
-    print(x, T, E, P, gamma, beta, yPlane, dE)
+#..  Output, depth reached as function of T0:
+print()
+print("T0, depth reached, number of steps, CSDA range")
+nSteps = np.sum(~np.isnan(Trends['T']), axis=0)
+Rcsda  = iRE.getRange(T0s)
+for i in range(len(T0s)):
+    print(T0s[i], Trends['x'][nSteps[i]-1, i] + dx, nSteps[i], Rcsda[i])
 
-    #..  Increment x and energy
-    x += dx
-    T -= dE
-    
 ##! Complete:
 print()
 print("========  Trend evaluation complete  ========")
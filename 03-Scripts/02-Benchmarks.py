@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the physics kernels and the fitting path:
+=======================================================
+
+  Times MCS.getTheta0/getYplane, dEdx.getdEdx, Bortfeldt.bragg/bragg_vec,
+  braggcurve_basic.bragg_vec1, hits-file aggregation (HitsFile.aggregate
+  and HitsFile.getStations on a synthetic hits file) and one BraggFit.fit,
+  each on synthetic input of increasing size.
+
+  For each case and size the best of nRepeat timings gives calls/s and
+  points/s; peak memory of a single call is measured with tracemalloc.
+
+  Usage:
+      python 02-Benchmarks.py [--save] [--quick] [--tolerance <f>]
+                              [--backend auto|numpy|numba]
+
+      --save     : write the results as the new baseline
+      --quick    : smallest two sizes only
+      --tolerance: report a regression where calls/s falls below
+                   baseline/tolerance (default 1.5)
+      --backend  : kernel backend (see Kernels.py; default from
+                   BraggBACKEND, else numpy)
+
+  The baseline is $REPORTPATH/Benchmarks-baseline.json (see startup.bash).
+  The machine, python and numpy versions and the kernel backend are
+  stored with it; timings are only comparable on the same machine and
+  backend.  Each case is called once before it is timed, so that
+  compilation by the numba backend is not counted.
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+import tracemalloc
+import numpy as np
+
+BraggPATH  = os.getenv('BraggPATH')
+REPORTPATH = os.getenv('REPORTPATH', os.path.join(BraggPATH, '99-Scratch'))
+sys.path.append(os.path.join(BraggPATH, '81-Anthea'))
+
+import Kernels          as krnls
+import MCS              as mcs
+import dEdx             as dedx
+import Bortfeldt        as brtfldt
+import HitsFile         as hts
+import BraggFit         as brggft
+import braggcurve_basic as bcb
+
+filename = os.path.join(BraggPATH, '11-BraggParameters/BraggParameters.csv')
+Baseline = os.path.join(REPORTPATH, 'Benchmarks-baseline.json')
+
+Sizes    = (100, 10000, 1000000)
+nRepeat  = 3
+Pars     = (1., 0.1, 27.5, 0.012, 0.35)     #.. phi0, epsilon, r0, beta, sigma
+Seed     = 20261018
+
+iMCS       = mcs.MCS(filename)
+idEdx      = dedx.dEdx(filename)
+iBortfeldt = brtfldt.Bortfeldt(filename)
+iBraggFit  = brggft.BraggFit(filename, 1)
+
+
+#--------  Synthetic inputs:
+def depths(n):
+    return np.linspace(0., 30., n)
+
+def energies(n):
+    return np.linspace(20., 250., n)
+
+def hits(n):
+    #.. 30 stations, n hits spread over n/10 events:
+    Rng    = np.random.default_rng(Seed)
+    Codes  = Rng.integers(0, 30, n)
+    EventN = Rng.integers(0, max(n//10, 1), n)
+    Edep   = Rng.exponential(0.1, n)
+    return Codes, EventN, Edep
+
+def hitsFile(Dir, n):
+    Codes, EventN, Edep = hits(n)
+    Path = os.path.join(Dir, 'hits-' + str(n) + '.dat')
+    with open(Path, 'w') as f:
+        f.write('\t'.join(hts.HitsFile.Columns) + '\n')
+        np.savetxt(f, np.column_stack((Codes, EventN, np.zeros(n), Edep, \
+                                       np.zeros(n), np.zeros(n), \
+                                       np.zeros(n), 12.*(Codes+1), \
+                                       np.zeros(n))), \
+                   fmt='St%d_H\t%d\t%d\t%g\t%g\t%g\t%g\t%g\t%g')
+    return Path
+
+def profile(n):
+    Rng = np.random.default_rng(Seed)
+    z   = depths(n)
+    y   = iBortfeldt.bragg_vec(z, *Pars)
+    return z, y * (1. + 0.01*Rng.standard_normal(n))
+
+
+#--------  Cases; each maker returns the function to be timed for size n:
+def makeTheta0(n):
+    x, T = np.full(n, 0.1), energies(n)
+    return lambda: iMCS.getTheta0(x, T)
+
+def makeYplane(n):
+    x, T = np.full(n, 0.1), energies(n)
+    return lambda: iMCS.getYplane(x, T)
+
+def makedEdx(n):
+    T = energies(n)
+    return lambda: idEdx.getdEdx(T)
+
+def makeBragg(n):
+    z = depths(n).tolist()
+    return lambda: [iBortfeldt.bragg(zi, *Pars) for zi in z]
+
+def makeBraggVec(n):
+    z = depths(n)
+    return lambda: iBortfeldt.bragg_vec(z, *Pars)
+
+def makeBraggVec1(n):
+    z = depths(n)
+    bcb.getMCS()
+    return lambda: bcb.bragg_vec1(z, *Pars)
+
+def makeAggregate(n):
+    Codes, EventN, Edep = hits(n)
+    return lambda: hts.aggregate(Codes, Edep, EventN, 30)
+
+def makeGetStations(n):
+    Path = hitsFile(TmpDir, n)
+    iHits = hts.HitsFile(Path)
+    return lambda: iHits.getStations()
+
+def makeFit(n):
+    z, y = profile(n)
+    return lambda: iBraggFit.fit(z, y, (0.9, 0.05, 27., 0.01, 0.3))
+
+#.. name: (maker, largest size; the scalar loop and the text-file and
+#          fitting cases are too slow for the largest size)
+Cases = {
+    'MCS.getTheta0'              : (makeTheta0,      1000000),
+    'MCS.getYplane'              : (makeYplane,      1000000),
+    'dEdx.getdEdx'               : (makedEdx,        1000000),
+    'Bortfeldt.bragg'            : (makeBragg,         10000),
+    'Bortfeldt.bragg_vec'        : (makeBraggVec,    1000000),
+    'braggcurve_basic.bragg_vec1': (makeBraggVec1,   1000000),
+    'HitsFile.aggregate'         : (makeAggregate,   1000000),
+    'HitsFile.getStations'       : (makeGetStations,   10000),
+    'BraggFit.fit'               : (makeFit,           10000),
+}
+
+
+#--------  Measurement:
+def measure(Fn):
+    Fn()
+    Timer = timeit.Timer(Fn)
+    nCalls, t = Timer.autorange()
+    Best = min([t] + Timer.repeat(nRepeat-1, nCalls)) / nCalls
+
+    tracemalloc.start()
+    Fn()
+    Peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return 1./Best, Peak
+
+def environment():
+    return {'machine': platform.machine(), 'node': platform.node(), \
+            'python': platform.python_version(), 'numpy': np.__version__, \
+            'backend': krnls.getBackend()}
+
+
+##! Start:
+Parser = argparse.ArgumentParser(description='Bragg benchmarks')
+Parser.add_argument('--save', action='store_true')
+Parser.add_argument('--quick', action='store_true')
+Parser.add_argument('--tolerance', type=float, default=1.5)
+Parser.add_argument('--backend', choices=krnls.Backends, default=None)
+Args = Parser.parse_args()
+if Args.backend != None:
+    krnls.setBackend(Args.backend)
+
+print("========  Benchmarks start  ========")
+
+Old = None
+if os.path.isfile(Baseline):
+    with open(Baseline) as f:
+        Old = json.load(f)
+    print("     Baseline:", Baseline)
+    if Old['environment'] != environment():
+        print("     ---> baseline from a different environment:", \
+              Old['environment'])
+
+TmpDir  = tempfile.mkdtemp()
+Results = {}
+Regress = []
+print()
+print("%-28s %8s %12s %12s %10s %8s" % \
+      ("Case", "Size", "calls/s", "points/s", "peak KiB", "vs base"))
+for Name, (Maker, nMax) in Cases.items():
+    for n in Sizes[:2] if Args.quick else Sizes:
+        if n > nMax:
+            continue
+        Rate, Peak = measure(Maker(n))
+        Key = Name + ':' + str(n)
+        Results[Key] = {'calls_per_s': Rate, 'peak_bytes': Peak}
+
+        Ratio = ""
+        if Old is not None and Key in Old['results']:
+            r = Rate / Old['results'][Key]['calls_per_s']
+            Ratio = "%.2f" % r
+            if r < 1./Args.tolerance:
+                Regress.append((Key, r))
+        print("%-28s %8d %12.4g %12.4g %10.1f %8s" % \
+              (Name, n, Rate, Rate*n, Peak/1024., Ratio))
+
+for Path in os.listdir(TmpDir):
+    os.remove(os.path.join(TmpDir, Path))
+os.rmdir(TmpDir)
+
+print()
+if Regress:
+    print("     ---> regressions (calls/s relative to baseline):")
+    for Key, r in Regress:
+        print("         ", Key, "%.2f" % r)
+elif Old is not None:
+    print("     ---> no regressions beyond tolerance", Args.tolerance)
+
+if Args.save:
+    os.makedirs(REPORTPATH, exist_ok=True)
+    with open(Baseline, 'w') as f:
+        json.dump({'environment': environment(), 'results': Results}, f, \
+                  indent=1)
+    print("     ---> baseline written:", Baseline)
+
+##! Complete:
+print()
+print("========  Benchmarks complete  ========")
+sys.exit(1 if Regress else 0)
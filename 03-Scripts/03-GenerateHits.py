@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generate a synthetic hits file:
+===============================
+
+  Writes <nEvents> events from HitsGenerator, as a text hits file or, with
+  --binary, as the HitsFile binary cache <output>.cache/ only.  Text is
+  limited by number formatting to a few 10^5 rows/s; use --binary for
+  files of 10^8 rows and more.
+
+  Usage:
+      python 03-GenerateHits.py <output> <nEvents> [--binary]
+             [--seed <n>] [--chunk <events>] [--efficiency <f>]
+             [--pars phi0 epsilon r0 beta sigma]
+
+"""
+
+import argparse
+import os
+import time
+
+import HitsGenerator as hg
+
+BraggPATH = os.getenv('BraggPATH')
+filename  = os.path.join(BraggPATH, \
+                         '11-BraggParameters/BraggParameters.csv')
+
+Parser = argparse.ArgumentParser(description='Synthetic hits file')
+Parser.add_argument('output')
+Parser.add_argument('nEvents', type=int)
+Parser.add_argument('--binary', action='store_true')
+Parser.add_argument('--seed', type=int, default=None)
+Parser.add_argument('--chunk', type=int, default=100000)
+Parser.add_argument('--efficiency', type=float, default=1.)
+Parser.add_argument('--pars', type=float, nargs=5, \
+                    default=(1., 0.1, 27.5, 0.012, 0.35))
+Args = Parser.parse_args()
+
+##! Start:
+print("========  GenerateHits start  ========")
+
+iGen = hg.HitsGenerator(filename, Args.pars, _Efficiency=Args.efficiency, \
+                        _Seed=Args.seed)
+print(iGen)
+
+t0 = time.perf_counter()
+if Args.binary:
+    nRows = iGen.writeBinary(Args.output, Args.nEvents, Args.chunk)
+    print("     ---> cache written:", Args.output + '.cache')
+else:
+    nRows = iGen.writeText(Args.output, Args.nEvents, Args.chunk)
+    print("     ---> text written:", Args.output)
+dt = time.perf_counter() - t0
+print("     --->", Args.nEvents, "events,", nRows, "hits in", \
+      "%.1f s (%.3g rows/s)" % (dt, nRows/dt))
+
+##! Complete:
+print()
+print("========  GenerateHits complete  ========")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Energy/material sweep:
+======================
+
+  Runs the Cartesian product of the energies, materials, step sizes and
+  fit bounds given on the command line through Sweep, in parallel, into
+  the Parquet store (default $REPORTPATH/Sweep).  Points already in the
+  store are skipped, so an interrupted sweep is resumed by repeating the
+  command.  The results for the requested points are printed.
+
+  Usage:
+      python 04-Sweep.py --energies 70 100 150 200 --materials water PMMA
+             [--dx 0.1 0.05] [--bounds lo1 .. lo5 hi1 .. hi5]
+             [--protons <n>] [--seeds <n> ..] [--workers <n>]
+             [--store <dir>]
+
+"""
+
+import argparse
+import os
+import pandas as pnds
+
+import Sweep as swp
+
+BraggPATH  = os.getenv('BraggPATH')
+REPORTPATH = os.getenv('REPORTPATH', os.path.join(BraggPATH, '99-Scratch'))
+
+Parser = argparse.ArgumentParser(description='Energy/material sweep')
+Parser.add_argument('--energies', type=float, nargs='+', default=[200.])
+Parser.add_argument('--materials', nargs='+', default=['water'])
+Parser.add_argument('--dx', type=float, nargs='+', default=[0.1])
+Parser.add_argument('--bounds', type=float, nargs=10, action='append', \
+                    help='fit bounds, multipliers of the starting point; '
+                         'may be repeated')
+Parser.add_argument('--protons', type=int, default=2000)
+Parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+Parser.add_argument('--workers', type=int, default=None)
+Parser.add_argument('--store', default=os.path.join(REPORTPATH, 'Sweep'))
+Args = Parser.parse_args()
+
+Bounds = [None]
+if Args.bounds:
+    Bounds = [(tuple(b[:5]), tuple(b[5:])) for b in Args.bounds]
+
+##! Start:
+print("========  Sweep start  ========")
+
+iSweep  = swp.Sweep(Args.store, Args.workers)
+print(iSweep)
+Configs = swp.grid(T0=Args.energies, Material=Args.materials, dx=Args.dx, \
+                   Bounds=Bounds, nProtons=[Args.protons], Seed=Args.seeds)
+Results = iSweep.run(Configs)
+
+with pnds.option_context('display.width', 200, 'display.max_columns', 40):
+    print(Results[['T0', 'Material', 'dx', 'Rcsda', 'RTransport', 'RMC', \
+                   'r0', 'r0Err', 'sigma', 'sigmaErr', 'Time']])
+
+##! Complete:
+print()
+print("========  Sweep complete  ========")
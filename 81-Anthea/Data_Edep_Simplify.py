@@ -10,14 +10,15 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from braggcurve_basic import bragg_vec
 from braggcurve_basic import bragg_vec1
+from braggcurve_basic import bragg_jac
 from scipy import optimize
+from HitsFile import HitsFile
 
 plt.style.use('default')
 
-## Process data file
+## Process data file; only the Depth and Edep columns are parsed
 def prePlot(filename):
-     data = pd.read_csv(filename, delim_whitespace=True, names=['StN','EventN','FibreHit','Edep','RealX','RealY','RealZ','Depth','Time'], low_memory=False, skiprows=1)
-     dataplot = data[['Depth','Edep']]
+     dataplot = pd.concat(HitsFile(filename).readChunks(('Depth','Edep')), ignore_index=True)
      dataplot=dataplot.astype(float)
      return dataplot
 
@@ -45,19 +46,11 @@ def plotEdepFit(nEvents,data='hits.dat'):
                                   # Formula of average chord = 4*radius/pi, where fibre diameter is 250 micron
     numEvents = int(nEvents)
     
-    data = prePlot('hits.dat')    # Data file
-    depthList=[]
-    eDepList=[]
-
-    ## Processing Data File ##
-    for entry in np.arange(0,len(data)):
-        depthEntry = data['Depth'][entry]/10 ## Conversion from mm->cm 
-        eDepEntry = data['Edep'][entry]/(numEvents*averageChord) ## Conversion from MeV->MeV/cm/particle    
-        if depthEntry not in depthList: ## Find the depth values of stations
-            depthList.append(depthEntry)
-            eDepList.append(eDepEntry) ## If first entry for station add to eDepList 
-        else:
-            eDepList[-1] += eDepEntry ## If same station add to energy deposition
+    ## Processing Data File, streamed in chunks (binary cache after first read) and aggregated per station ##
+    stations = HitsFile(data, _cache=True).getStations('StN', numEvents)
+    depthList = stations['Depth'].to_numpy()/10 ## Conversion from mm->cm 
+    eDepList = stations['Edep'].to_numpy()/(numEvents*averageChord) ## Conversion from MeV->MeV/cm/particle    
+    eDepErr = stations['EdepStd'].to_numpy()*np.sqrt(numEvents)/(numEvents*averageChord) ## Error on eDepList from event-by-event spread
     
     ## Fitting Parameters (may need manual tweaking) ##
     #####
@@ -81,17 +74,17 @@ def plotEdepFit(nEvents,data='hits.dat'):
     sigma_lower = sigma*0.9
     sigma_upper = sigma*1.1
 
-    # Fitting Bortfeld equation
-    popt, pcov = optimize.curve_fit(lambda z, phi0, epsilon, r0, beta, sigma: bragg_vec(z, phi0, epsilon, r0, beta, sigma), depthList, eDepList,
+    # Fitting Bortfeld equation, with analytic derivatives
+    popt, pcov = optimize.curve_fit(bragg_vec, depthList, eDepList, jac=bragg_jac,
                                         p0=(1,0.1,r0,beta,sigma), bounds=((0,0,r0_lower,0,sigma_lower),(100,0.2,r0_upper,0.1,sigma_upper)))
 
     # Plotting data and fit
     colorlist = ['red','red','orange','orange','yellow','yellow','lime','lime']
     print(" ******** KL:  <--------")
     print("     ----> depthList:", depthList)
-    print("     ----> eDepList:", depthList)
+    print("     ----> eDepList:", eDepList)
     for i in np.arange(0,int(len(depthList))):
-        plt.errorbar(depthList[i],eDepList[i],fmt='o', color=colorlist[i],zorder=1)            
+        plt.errorbar(depthList[i],eDepList[i],yerr=eDepErr[i],fmt='o', color=colorlist[i],zorder=1)            
 
     xd = np.linspace(0,30,num=1000)
     plt.plot(xd, bragg_vec1(xd,*popt),color='black',linestyle='--',lw=2.0,zorder=0,label='Fitted Bragg Peak')
@@ -6,11 +6,24 @@ Created on Wed Mar 27 11:58:21 2019
 @author: htl17
 """
 
+import logging
 import math  as mth
+import os
 import numpy as np
-from scipy import special
 
+import Bortfeldt as Bortfeldt
 import MCS as mcs
+import ParabolicCylinderD as PCD
+
+#.. Per-point table from bragg_vec1 at DEBUG level; enable with
+#   logging.getLogger("braggcurve_basic").setLevel(logging.DEBUG)
+Log = logging.getLogger("braggcurve_basic")
+
+#.. MCS instance used by bragg_vec1, built on first use by getMCS
+iMCS = None
+
+#.. Bortfeldt instance used by bragg_jac, built on first use by getBortfeldt
+iBortfeldt = None
 
 ################
 ## Parameters ##
@@ -29,6 +42,9 @@ alpha = 0.0022
 # Density of water [g/cm^3]
 rho = 1.0
 
+# Factorial component (1/p -1)! = Gamma(1/p)
+factorial = mth.gamma(1/p)
+
 ########################################
 ## Components of Bragg Analytic Curve ##
 ########################################
@@ -38,11 +54,10 @@ def prebragg(z, phi0, epsilon, r0, beta):
 
 def peak(z, phi0, epsilon, r0, beta, sigma):
     xi = (r0-z)/sigma
-    factorial = 1.57539 # Factorial component (1/p -1)! calculated in Mathematica
     prefactor = phi0*((np.exp(-(xi**2/4))*sigma**(1/p)*factorial)
     /(np.sqrt(2*np.pi)*rho*p*alpha**(1/p)*(1+beta*r0)))
-    return prefactor*(1/sigma * special.pbdv(-1/p, -xi)[0] 
-                      + (beta/p + gamma*beta + epsilon/r0)*special.pbdv((-1/p)-1,-xi)[0])
+    return prefactor*(1/sigma * PCD.pbdv(-1/p, -xi)[0] 
+                      + (beta/p + gamma*beta + epsilon/r0)*PCD.pbdv((-1/p)-1,-xi)[0])
     
 def bragg(z, phi0, epsilon, r0, beta, sigma):
     if z < (r0-10*sigma):
@@ -53,42 +68,75 @@ def bragg(z, phi0, epsilon, r0, beta, sigma):
         return 0  
     
 def bragg_vec(z, phi0, epsilon, r0, beta, sigma):
+    # Same branches as bragg(), evaluated over the whole array at once
+    z = np.asarray(z, dtype=float)
     y = np.zeros(z.shape)
-    for i in range(len(y)):
-        y[i]=bragg(z[i], phi0, epsilon, r0, beta, sigma)
-            
+    iPre  = z < (r0-10*sigma)
+    iPeak = np.logical_and(z >= (r0-10*sigma), z <= (r0+5*sigma))
+    y[iPre]  = prebragg(z[iPre], phi0, epsilon, r0, beta)
+    y[iPeak] = peak(z[iPeak], phi0, epsilon, r0, beta, sigma)
     return y
 
+def bragg_jac(z, phi0, epsilon, r0, beta, sigma):
+    # Analytic Jacobian w.r.t. (phi0, epsilon, r0, beta, sigma), from the
+    # single implementation in Bortfeldt
+    return getBortfeldt().bragg_jac(z, phi0, epsilon, r0, beta, sigma)
+
+def getBortfeldt():
+    # Bortfeldt parameters, read once; path relative to this file
+    global iBortfeldt
+    if iBortfeldt is None:
+        iBortfeldt = Bortfeldt.Bortfeldt(getParameterFile())
+    return iBortfeldt
+
+def getParameterFile():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', '11-BraggParameters', 'BraggParameters.csv')
+
+def getMCS():
+    # MCS parameters, read once; path relative to this file
+    global iMCS
+    if iMCS is None:
+        iMCS = mcs.MCS(getParameterFile())
+    return iMCS
+
+def ffill(Mask, Values, Initial):
+    # Values where Mask, else the last Values[Mask] before (Initial if none)
+    Idx = np.where(Mask, np.arange(len(Mask)), -1)
+    np.maximum.accumulate(Idx, out=Idx)
+    return np.where(Idx >= 0, Values[np.maximum(Idx, 0)], Initial)
+
 def bragg_vec1(z, phi0, epsilon, r0, beta, sigma):
-    y = np.zeros(z.shape)
-    iMCS = mcs.MCS('../11-BraggParameters/BraggParameters.csv')
-    zi = -0.03003003003003
-    yPlni = 0.
-    print("z, dz, T, yPln, dV, yi, y, E, p, relbeta, relgamma, ", \
-          "relgamma*relbeta")
-    for i in range(len(y)):
-        y[i]=bragg(z[i], phi0, epsilon, r0, beta, sigma)
-        if (r0-z[i]) > 0.:
-            T  = ( (r0-z[i]) / alpha )**(1./p)
-            Ti = T
-        T = Ti
-        dz   = (z[i]-zi)
-        if dz != 0. and T > 115.:
-            yPln  = iMCS.getYplane(dz, T)
-            yPlni = yPln
-        dz   = (z[i]-zi)
-        yPln = yPlni
-        dV    = np.pi*(0.1 + yPln)**2 * dz
-        yi   = y[i]
-        y[i] = y[i] / dV
+    # Dose per volume, y/dV, with dV = pi*(0.1 + yPln)^2*dz the volume of
+    # the beam (radius 0.1 cm plus MCS broadening) in the step dz to z.
+    # Beyond r0 the residual energy T holds its last value; yPln is only
+    # recomputed where dz != 0 and T > 115 MeV and otherwise holds too.
+    z = np.asarray(z, dtype=float)
+    y = bragg_vec(z, phi0, epsilon, r0, beta, sigma)
+    iMCS = getMCS()
+
+    dz = np.diff(z, prepend=-0.03003003003003)
+    Before = (r0-z) > 0.
+    T = ffill(Before, (np.where(Before, r0-z, 0.) / alpha)**(1./p), np.nan)
+    Step = (dz != 0.) & (T > 115.)
+    yPln = np.zeros(z.shape)
+    yPln[Step] = iMCS.getYplane(dz[Step], T[Step])
+    yPln = ffill(Step, yPln, 0.)
+    dV   = np.pi*(0.1 + yPln)**2 * dz
+    yi   = y
+    y    = y / dV
+
+    if Log.isEnabledFor(logging.DEBUG):
         Energy   = iMCS.getProjectileMass() + T
-        mmtm     = mth.sqrt(Energy**2 - iMCS.getProjectileMass()**2)
+        mmtm     = np.sqrt(Energy**2 - iMCS.getProjectileMass()**2)
         relbeta  = mmtm/Energy
-        relgamma = 1./mth.sqrt(1.-relbeta**2)
-        print(z[i], dz, T, yPln, dV, yi, y[i], Energy, mmtm, \
-              relbeta, relgamma, relgamma*relbeta)
-        zi   = z[i]
-            
+        relgamma = 1./np.sqrt(1.-relbeta**2)
+        Log.debug("z, dz, T, yPln, dV, yi, y, E, p, relbeta, relgamma, "
+                  "relgamma*relbeta")
+        for Row in zip(z, dz, T, yPln, dV, yi, y, Energy, mmtm,
+                       relbeta, relgamma, relgamma*relbeta):
+            Log.debug("%s %s %s %s %s %s %s %s %s %s %s %s", *Row)
+
     return y
 
 def zeta(r0, sigma, z):
@@ -98,7 +146,9 @@ def xi(r0,R0,sigma,z):
     return (z-r0-R0)/sigma
 
 def tParabolicCylinderD(r0,R0,sigma,v,z):
+    from scipy import special
     return np.exp(-(xi(r0,R0,sigma,z)**2)/4)*special.pbdv(v,xi(r0,R0,sigma,z))[0]-np.exp(-(zeta(r0,sigma,z)**2)/4)*special.pbdv(v,zeta(r0,sigma,z))[0]
 
 def fluence(phi,sigma,r0,z):
+    from scipy import special
     return phi/np.sqrt(2*np.pi)*np.exp(-(zeta(r0,sigma,z))**2/4)*special.pbdv(-1,zeta(r0,sigma,z))[0]